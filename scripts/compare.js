@@ -3,29 +3,27 @@
 // - One metric per feature (NDVI / LST)
 // - Reacts to gridLayerChanged + wardHover events from genericMap.js
 
+import { loadCityWards } from "./intercitySummary.js";
+
 // -------------------------------------------------------------
 // City configs – extend later if needed
 // -------------------------------------------------------------
 const CITY_COMPARE_CONFIGS = [
   {
     id: "tokyo",
-    name: "Tokyo",
-    wardStatsPath: "data/tokyo/tokyo_wards.json"
+    name: "Tokyo"
   },
   {
     id: "london",
-    name: "London",
-    wardStatsPath: "data/london/london_boroughs.json"
+    name: "London"
   },
   {
     id: "nyc",
-    name: "New York City",
-    wardStatsPath: "data/nyc/nyc_boroughs.json"
+    name: "New York City"
   },
   {
     id: "san-diego",
-    name: "San Diego County",
-    wardStatsPath: "data/san-diego/sandiego_boroughs.json"
+    name: "San Diego County"
   }
 ];
 
@@ -357,12 +355,10 @@ function updateChart() {
 // Init: load ward stats, build shell, hook into map events
 // -------------------------------------------------------------
 (async function initWardCompareSimple() {
-  // 1) Load ward stats for each city
+  // 1) Load ward stats for each city (one shared summary fetch)
   await Promise.all(
     CITY_COMPARE_CONFIGS.map(async (config) => {
-      const resp = await fetch(config.wardStatsPath);
-      const json = await resp.json();
-      wardsByCity.set(config.id, json.wards || []);
+      wardsByCity.set(config.id, await loadCityWards(config.id));
     })
   );
 
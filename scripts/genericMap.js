@@ -36,6 +36,10 @@ const landCoverGroups = {
 // ------------------------------------------------------------------
 
 let ndviLstModels = null;  // loaded JSON from Python
+let ndviLstWhatIf = null;  // precomputed ΔLST tables (greenness_model_experiments.py)
+let ndviLstModelsPromise = null;
+const NDVI_LST_MODELS_PATH = "data/models/ndvi_lst_response_curves.json";
+const NDVI_LST_WHATIF_PATH = "data/models/ndvi_lst_whatif_tables.json";
 const CORR_THRESHOLD = 0.4; // decide city-curve vs pooled
 const ndviPaintSimStore = {};
 
@@ -92,6 +96,99 @@ function blendColors(color1Hex, color2Hex) {
   return rgbToHex(blendedR, blendedG, blendedB);
 }
 
+// ------------------------------------------------------------------
+// Ward outlines from the preprocessed TopoJSON (topology.py)
+// ------------------------------------------------------------------
+
+// Absolute [lon, lat] points of every arc (delta-decoded, then transformed)
+function decodeTopoArcs(topo) {
+  const [sx, sy] = topo.transform.scale;
+  const [tx, ty] = topo.transform.translate;
+  return topo.arcs.map(arc => {
+    let x = 0, y = 0;
+    return arc.map(([dx, dy]) => {
+      x += dx;
+      y += dy;
+      return [x * sx + tx, y * sy + ty];
+    });
+  });
+}
+
+// Map ward id -> rings, each ring a list of [lon, lat] points; shared arcs
+// are stored once, negative indices (~i) walk arc i backwards
+function topoWardRings(topo) {
+  const arcs = decodeTopoArcs(topo);
+  const ringPoints = (ringArcs) => {
+    const pts = [];
+    ringArcs.forEach(i => {
+      const arc = i < 0 ? arcs[~i].slice().reverse() : arcs[i];
+      pts.push(...(pts.length ? arc.slice(1) : arc));
+    });
+    return pts;
+  };
+
+  const rings = new Map();
+  topo.objects.wards.geometries.forEach(geom => {
+    if (!geom.type) return;
+    const polys = geom.type === "Polygon" ? [geom.arcs] : geom.arcs;
+    rings.set(geom.properties.id, polys.flat().map(ringPoints));
+  });
+  return rings;
+}
+
+// ------------------------------------------------------------------
+// Ward run index from the preprocessed grid (grid_index.py)
+// ------------------------------------------------------------------
+
+// Little-endian int32 buffer stored as base64 -> Int32Array
+function decodeInt32Base64(b64) {
+  const bin = atob(b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  return new Int32Array(bytes.buffer);
+}
+
+// Map ward id -> Int32Array of flat pixel indices, from the grid's
+// ward_runs ([row, col, len] triples in stored ward_ids rows); flipRows
+// maps the stored rows onto the drawn ones. Null if there is no index.
+function wardPixelsFromRuns(wardRuns, width, height, flipRows) {
+  if (!wardRuns || wardRuns.encoding !== "base64") return null;
+  const ids = decodeInt32Base64(wardRuns.ids);
+  const offsets = decodeInt32Base64(wardRuns.offsets);
+  const runs = decodeInt32Base64(wardRuns.runs);
+
+  const wardPixels = new Map();
+  for (let k = 0; k < ids.length; k++) {
+    let n = 0;
+    for (let j = offsets[k]; j < offsets[k + 1]; j++) n += runs[3 * j + 2];
+
+    const pix = new Int32Array(n);
+    let p = 0;
+    for (let j = offsets[k]; j < offsets[k + 1]; j++) {
+      const row = flipRows ? height - 1 - runs[3 * j] : runs[3 * j];
+      const start = row * width + runs[3 * j + 1];
+      for (let i = 0; i < runs[3 * j + 2]; i++) pix[p++] = start + i;
+    }
+    wardPixels.set(ids[k], pix);
+  }
+  return wardPixels;
+}
+
+// Same map from one scan of the (already flipped) pixel ward ids, for
+// grids written without a run index
+function wardPixelsFromScan(pixels) {
+  const lists = new Map();
+  for (let i = 0; i < pixels.length; i++) {
+    const wardId = pixels[i].wardId;
+    if (!wardId) continue;
+    if (!lists.has(wardId)) lists.set(wardId, []);
+    lists.get(wardId).push(i);
+  }
+  const wardPixels = new Map();
+  lists.forEach((list, wardId) => wardPixels.set(wardId, Int32Array.from(list)));
+  return wardPixels;
+}
+
 // Map various city names → model keys
 function modelCityKeyFromName(name) {
   const s = (name || "").toLowerCase();
@@ -124,6 +221,54 @@ function interp1D(xs, ys, x) {
   return y0 + t * (y1 - y0);
 }
 
+// Load the response curves and what-if tables once; the simulator falls back
+// on the pooled linear model if either file is missing
+function loadNdviLstModels() {
+  if (!ndviLstModelsPromise) {
+    const load = (path) => fetch(path)
+      .then(resp => (resp.ok ? resp.json() : null))
+      .catch(() => null);
+    ndviLstModelsPromise = Promise.all([load(NDVI_LST_MODELS_PATH), load(NDVI_LST_WHATIF_PATH)])
+      .then(([models, whatIf]) => {
+        ndviLstModels = models;
+        ndviLstWhatIf = whatIf;
+      });
+  }
+  return ndviLstModelsPromise;
+}
+
+// Fractional position of x on an evenly spaced axis, null outside it
+function tablePosition(axis, x) {
+  const n = axis.length;
+  if (n < 2) return null;
+  const step = (axis[n - 1] - axis[0]) / (n - 1);
+  const pos = (x - axis[0]) / step;
+  if (pos < -1e-9 || pos > n - 1 + 1e-9) return null;
+  return Math.min(Math.max(pos, 0), n - 1);
+}
+
+// ΔLST for one city from the what-if table [start_ndvi][increment],
+// bilinear between table entries; null if outside the table
+function lookupWhatIfDelta(cityKey, baseNdvi, newNdvi, target) {
+  if (!ndviLstWhatIf || !ndviLstWhatIf.cities) return null;
+  const cityTables = ndviLstWhatIf.cities[cityKey];
+  const table = cityTables && cityTables[target];
+  if (!table) return null;
+
+  const si = tablePosition(ndviLstWhatIf.start_ndvi, baseNdvi);
+  const ii = tablePosition(ndviLstWhatIf.increments, newNdvi - baseNdvi);
+  if (si == null || ii == null) return null;
+
+  const s0 = Math.floor(si), i0 = Math.floor(ii);
+  const s1 = Math.min(s0 + 1, table.length - 1);
+  const i1 = Math.min(i0 + 1, table[0].length - 1);
+  const ts = si - s0, ti = ii - i0;
+
+  const top = table[s0][i0] * (1 - ti) + table[s0][i1] * ti;
+  const bottom = table[s1][i0] * (1 - ti) + table[s1][i1] * ti;
+  return top * (1 - ts) + bottom * ts;
+}
+
 // Decide whether to trust the city-specific curve or fall back on pooled model
 function shouldUseCityCurve(cityModel, target) {
   if (!cityModel) return false;
@@ -143,7 +288,8 @@ function shouldUseCityCurve(cityModel, target) {
  *   target: "day" | "night"
  *
  * @returns {Object|null}
- *   { basePred, newPred, delta, source: "city-curve" | "pooled-linear" }
+ *   { basePred, newPred, delta, source: "whatif-table" | "city-curve" | "pooled-linear" }
+ *   (basePred / newPred are null for table lookups, which only store Δ)
  */
 function estimateLstChangeFromNdvi(opts) {
   const { cityName, baseNdvi, newNdvi, target } = opts;
@@ -163,8 +309,19 @@ function estimateLstChangeFromNdvi(opts) {
     cityModel = models[cityKey];
   }
 
-  // 1) Try city-specific response curve if correlation strong enough
+  // 1) Try city-specific response curve if correlation strong enough:
+  // the precomputed what-if table first, the curve itself outside the table
   if (cityModel && shouldUseCityCurve(cityModel, target)) {
+    const tableDelta = lookupWhatIfDelta(cityKey, baseNdvi, newNdvi, target);
+    if (tableDelta != null) {
+      return {
+        basePred: null,
+        newPred: null,
+        delta: tableDelta,
+        source: "whatif-table"
+      };
+    }
+
     const curve = (target === "day")
       ? cityModel.ndvi_to_lst.day
       : cityModel.ndvi_to_lst.night;
@@ -344,6 +501,7 @@ async function createCityGridMap(config) {
     containerId,
     gridPath,
     wardStatsPath = null,
+    topoPath = null,         // optional *_topo.json ward outlines
     cityName = "City",
     subunit,
 
@@ -396,6 +554,14 @@ async function createCityGridMap(config) {
     wardMeta = await wardResp.json();
   }
 
+  // Simplified ward outlines; pixel-aligned borders are drawn without them
+  let wardTopo = null;
+  if (topoPath) {
+    wardTopo = await fetch(topoPath)
+      .then(resp => (resp.ok ? resp.json() : null))
+      .catch(() => null);
+  }
+
   const rasterWidth  = meta.width;
   const rasterHeight = meta.height;
   const bbox         = meta.bbox;
@@ -412,6 +578,7 @@ async function createCityGridMap(config) {
   let simState = null;
 
   if (enableNdviPainting && simCityKey && meta.ndvi) {
+    await loadNdviLstModels();
     const nPixels = rasterWidth * rasterHeight;
     let store = ndviPaintSimStore[simCityKey];
 
@@ -696,32 +863,28 @@ async function createCityGridMap(config) {
     }
   }
 
-  // Throttled ward-mean recomputation
+  // Ward id -> map pixel indices: from the grid's run index when present,
+  // else one scan of the pixels
+  const wardPixels =
+    wardPixelsFromRuns(meta.ward_runs, rasterWidth, rasterHeight, isTokyo || needsFullVerticalFlip) ||
+    wardPixelsFromScan(pixels);
+
+  // Throttled ward-mean recomputation; only wards touched by painting
+  // since the last broadcast are re-summed, the rest reuse their means
   let wardStatsNeedsUpdate = false;
   let wardStatsUpdateScheduled = false;
+  const metricsByWardId = {};
+  const dirtyWards = new Set(wardPixels.keys());
+
+  function wardMetrics(pix) {
+    const b = {
+      ndvi_sum: 0, ndvi_count: 0,
+      lst_day_sum: 0, lst_day_count: 0,
+      lst_night_sum: 0, lst_night_count: 0
+    };
 
-  function broadcastWardStats() {
-    if (!pixels || !pixels.length || !wardInfoMap.size) return;
-
-    const metricsByWardId = {};
-
-    function getWardBucket(id) {
-      if (!metricsByWardId[id]) {
-        metricsByWardId[id] = {
-          ndvi_sum: 0, ndvi_count: 0,
-          lst_day_sum: 0, lst_day_count: 0,
-          lst_night_sum: 0, lst_night_count: 0
-        };
-      }
-      return metricsByWardId[id];
-    }
-
-    const n = pixels.length;
-    for (let i = 0; i < n; i++) {
-      const wardId = pixels[i].wardId;
-      if (!wardId) continue;
-
-      const bucket = getWardBucket(wardId);
+    for (let j = 0; j < pix.length; j++) {
+      const i = pix[j];
 
       const ndvi = simState && simState.currNdvi
         ? simState.currNdvi[i]
@@ -736,31 +899,39 @@ async function createCityGridMap(config) {
         : meta.lst_night_C && meta.lst_night_C[i];
 
       if (Number.isFinite(ndvi)) {
-        bucket.ndvi_sum += ndvi;
-        bucket.ndvi_count += 1;
+        b.ndvi_sum += ndvi;
+        b.ndvi_count += 1;
       }
       if (Number.isFinite(lstDay)) {
-        bucket.lst_day_sum += lstDay;
-        bucket.lst_day_count += 1;
+        b.lst_day_sum += lstDay;
+        b.lst_day_count += 1;
       }
       if (Number.isFinite(lstNight)) {
-        bucket.lst_night_sum += lstNight;
-        bucket.lst_night_count += 1;
+        b.lst_night_sum += lstNight;
+        b.lst_night_count += 1;
       }
     }
 
     // Convert to means
-    Object.keys(metricsByWardId).forEach(id => {
-      const b = metricsByWardId[id];
-      b.ndvi_mean = b.ndvi_count ? b.ndvi_sum / b.ndvi_count : null;
-      b.lst_day_mean = b.lst_day_count ? b.lst_day_sum / b.lst_day_count : null;
-      b.lst_night_mean = b.lst_night_count ? b.lst_night_sum / b.lst_night_count : null;
+    b.ndvi_mean = b.ndvi_count ? b.ndvi_sum / b.ndvi_count : null;
+    b.lst_day_mean = b.lst_day_count ? b.lst_day_sum / b.lst_day_count : null;
+    b.lst_night_mean = b.lst_night_count ? b.lst_night_sum / b.lst_night_count : null;
+    return b;
+  }
+
+  function broadcastWardStats() {
+    if (!pixels || !pixels.length || !wardInfoMap.size) return;
+
+    dirtyWards.forEach(wardId => {
+      const pix = wardPixels.get(wardId);
+      if (pix && pix.length) metricsByWardId[wardId] = wardMetrics(pix);
     });
+    dirtyWards.clear();
 
     document.dispatchEvent(new CustomEvent("wardStatsUpdated", {
       detail: {
         cityName,
-        metricsByWardId
+        metricsByWardId: { ...metricsByWardId }
       }
     }));
   }
@@ -895,6 +1066,33 @@ async function createCityGridMap(config) {
         .style("opacity", opacity);
   }
 
+  // Ward outlines from the city's TopoJSON, placed on the pixel grid (rows
+  // run north -> south, like the data layers) and clipped to the raster
+  const drawTopoBorders = Boolean(wardTopo) && !lcUnit;
+  if (drawTopoBorders) {
+    const xOf = lon => xOffset + (lon - minLon) / (maxLon - minLon) * rasterWidth * cellWidth;
+    const yOf = lat => yOffset + (maxLat - lat) / (maxLat - minLat) * rasterHeight * cellHeight;
+
+    const clipId = containerId.replace(/[^a-zA-Z0-9_-]/g, "") + "-ward-clip";
+    defs.append("clipPath")
+      .attr("id", clipId)
+      .append("rect")
+      .attr("x", xOffset)
+      .attr("y", yOffset)
+      .attr("width", rasterWidth * cellWidth)
+      .attr("height", rasterHeight * cellHeight);
+    borderG.attr("clip-path", `url(#${clipId})`);
+
+    topoWardRings(wardTopo).forEach((rings, wardId) => {
+      const d = rings
+        .map(ring => "M" + ring.map(([lon, lat]) => `${xOf(lon)},${yOf(lat)}`).join("L") + "Z")
+        .join("");
+      borderG.append("path")
+        .attr("d", d)
+        .attr("data-ward", wardId);
+    });
+  }
+
   // Generate borders based on the pixels' assigned wardIds
   // For flipped cities, pixels have already been assigned flipped wardIds
   // So we compare neighbors in the normal grid and draw at normal positions
@@ -978,7 +1176,7 @@ async function createCityGridMap(config) {
         }
       }
 
-      if (!wId) continue;
+      if (!wId || drawTopoBorders) continue;
       // right edge - compare with neighbor to the right
       if (!lcUnit && col < rasterWidth - 1) {
         const wRight = pixels[idx + 1].wardId;
@@ -2286,6 +2484,7 @@ async function createCityGridMap(config) {
     if (newNdvi <= oldNdvi + 1e-6) return;
 
     simState.currNdvi[idx] = newNdvi;
+    dirtyWards.add(pixel.wardId);
 
     const nPixels = simState.baseNdvi.length;
 
@@ -2308,9 +2507,9 @@ async function createCityGridMap(config) {
       });
       if (resDay) {
         const oldDelta = simState.deltaDay[idx] || 0;
-        const newDelta = resDay.newPred - simState.baseLstDay[idx];
+        const newDelta = resDay.delta;
 
-        simState.currLstDay[idx] = resDay.newPred;
+        simState.currLstDay[idx] = simState.baseLstDay[idx] + newDelta;
         simState.totalDeltaDay += (newDelta - oldDelta);
         simState.deltaDay[idx] = newDelta;
       }
@@ -2326,9 +2525,9 @@ async function createCityGridMap(config) {
       });
       if (resNight) {
         const oldDelta = simState.deltaNight[idx] || 0;
-        const newDelta = resNight.newPred - simState.baseLstNight[idx];
+        const newDelta = resNight.delta;
 
-        simState.currLstNight[idx] = resNight.newPred;
+        simState.currLstNight[idx] = simState.baseLstNight[idx] + newDelta;
         simState.totalDeltaNight += (newDelta - oldDelta);
         simState.deltaNight[idx] = newDelta;
       }
@@ -2436,7 +2635,8 @@ async function createCityGridMap(config) {
           detail: {
             city: cityName,
             wardId: d.wardId,
-            ward
+            ward,
+            source: "gridMap"
           }
         }));
       }
@@ -2463,11 +2663,44 @@ async function createCityGridMap(config) {
         detail: {
           city: cityName,
           wardId: null,
-          ward: null
+          ward: null,
+          source: "gridMap"
         }
       }));
     });
 
+  // ---------- 12b. Ward highlight from other views (e.g. compare bars) ----------
+  // Outline every pixel of the hovered ward, looked up from the ward
+  // pixel index instead of scanning all rects
+  const rectByIdx = new Array(pixels.length);
+  rects.each(function (d) { rectByIdx[d.idx] = this; });
+  let highlightedWardId = null;
+
+  function highlightWard(wardId) {
+    if (wardId === highlightedWardId) return;
+    if (highlightedWardId) {
+      (wardPixels.get(highlightedWardId) || []).forEach(i => {
+        if (rectByIdx[i]) rectByIdx[i].removeAttribute("stroke");
+      });
+    }
+    highlightedWardId = wardId || null;
+    if (highlightedWardId) {
+      (wardPixels.get(highlightedWardId) || []).forEach(i => {
+        if (!rectByIdx[i]) return;
+        rectByIdx[i].setAttribute("stroke", "#000");
+        rectByIdx[i].setAttribute("stroke-width", 0.5);
+      });
+    }
+  }
+
+  function onWardHover(evt) {
+    const detail = evt.detail || {};
+    if (detail.source === "gridMap") return;  // our own pixel hover
+    if ((detail.city || "").toLowerCase() !== cityName.toLowerCase()) return;
+    highlightWard(detail.wardId);
+  }
+  document.addEventListener("wardHover", onWardHover);
+
   // Title on the SVG for context (optional, small)
   // svg.append("text")
   //   .attr("x", width / 2)
@@ -2574,6 +2807,7 @@ async function createCityGridMap(config) {
      * Tear down this map (used when switching bivariate mode or fully destroying).
      */
     destroy() {
+      document.removeEventListener("wardHover", onWardHover);
       tooltip.remove();
       container.selectAll("*").remove();
     }
@@ -2782,6 +3016,7 @@ export async function createMultiCityGridMap(config) {
       containerId: innerSelector,
       gridPath: cityConf.gridPath,
       wardStatsPath: cityConf.wardStatsPath,
+      topoPath: cityConf.topoPath,
       cityName: cityConf.cityName || cityConf.label || cityConf.id,
       subunit: cityConf.subunit,
       layers: cityConf.layers,
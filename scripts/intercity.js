@@ -1,3 +1,5 @@
+import { loadCityWards } from "./intercitySummary.js";
+
 const container = d3.select("#cityCompare .panel-body");
 container.selectAll("*").remove();
 const node = container.node();
@@ -214,10 +216,10 @@ async function renderPlot(x, y) {
         .text(y);
 
     let places = [
-        {place: 'Tokyo', path:'data/tokyo/tokyo_wards.json', subunit:'Ward'},
-        {place: 'London', path:'data/london/london_boroughs.json', subunit: 'Borough'},
-        {place: 'New York City', path:'data/nyc/nyc_boroughs.json', subunit: 'Borough'},
-        {place: 'San Diego County', path:'data/san-diego/sandiego_boroughs.json', subunit: 'Neighborhood'}
+        {place: 'Tokyo', id:'tokyo', subunit:'Ward'},
+        {place: 'London', id:'london', subunit: 'Borough'},
+        {place: 'New York City', id:'nyc', subunit: 'Borough'},
+        {place: 'San Diego County', id:'san-diego', subunit: 'Neighborhood'}
     ];
     const defaultTooltipFormatter = ({ place, ward, ndvi, dlst, nlst, lc, subunit}) => {
         const wardLine = `${subunit}: ${ward}<br>`;
@@ -268,12 +270,8 @@ async function renderPlot(x, y) {
         .text(d => d.place);
 
     for (const placePath of places) {
-        let path = placePath.path;
-        let wardMeta = null;
-        if (path) {
-            const wardResp = await fetch(path);
-            wardMeta = await wardResp.json();
-        }
+        // every city's wards come from the one shared summary file
+        const wardMeta = { wards: await loadCityWards(placePath.id) };
 
         // override medians if we have live stats from the map
         const dynStatsAll = dynamicWardStatsByCity[placePath.place.toLowerCase()]
@@ -0,0 +1,31 @@
+// Shared loader for data/intercity_summary.json (written by
+// scripts/preprocessing/intercity_summary.py): one fetch for every city's
+// ward stats, stored as columns plus a city-offset table.
+
+const SUMMARY_PATH = "data/intercity_summary.json";
+
+let summaryPromise = null;
+
+export function loadIntercitySummary() {
+  if (!summaryPromise) {
+    summaryPromise = fetch(SUMMARY_PATH).then(resp => resp.json());
+  }
+  return summaryPromise;
+}
+
+// Plain ward objects ({id, name, ndvi_median, ...}) for one city id
+export async function loadCityWards(cityId) {
+  const summary = await loadIntercitySummary();
+  const c = summary.cities.indexOf(cityId);
+  if (c < 0) return [];
+
+  const wards = [];
+  for (let i = summary.offsets[c]; i < summary.offsets[c + 1]; i++) {
+    const ward = {};
+    for (const key of summary.keys) {
+      ward[key] = summary.columns[key][i];
+    }
+    wards.push(ward);
+  }
+  return wards;
+}
@@ -0,0 +1,221 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+# Parsed boundaries are cached here (relative to the repo root, like the
+# data paths passed to preprocess())
+BOUNDARY_CACHE_DIR = "data/.cache/boundaries"
+BOUNDARY_CACHE_VERSION = 1
+
+# ---------------------------------------------------------
+# 1. Source files and cache key
+# ---------------------------------------------------------
+
+def boundary_sources(BOUND_PATH, mult_json):
+    """
+    List of boundary files for a city: every *.geo.json in BOUND_PATH
+    (skipping temp_ files) if mult_json, else just BOUND_PATH.
+    """
+    if not mult_json:
+        return [BOUND_PATH]
+
+    pattern = os.path.join(BOUND_PATH, "*.geo.json")
+    return [
+        path for path in sorted(glob.glob(pattern))
+        if not os.path.basename(path).startswith("temp_")
+    ]
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_sources(paths, max_workers=8):
+    """Raw bytes of every boundary file, in order (read concurrently)."""
+    if len(paths) <= 1:
+        return [_read_bytes(p) for p in paths]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        return list(pool.map(_read_bytes, paths))
+
+
+def boundary_cache_key(paths, contents, ward_prop):
+    """Content hash of the boundary sources + the name-resolution settings."""
+    h = hashlib.sha256()
+    h.update(f"v{BOUNDARY_CACHE_VERSION}|{ward_prop}".encode("utf-8"))
+    for path, data in zip(paths, contents):
+        h.update(os.path.basename(path).encode("utf-8"))
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+# ---------------------------------------------------------
+# 2. Parsing (GeoJSON -> geometries + resolved names)
+# ---------------------------------------------------------
+
+def parse_ward_files(paths, contents):
+    """
+    One or more features per *.geo.json file. Names come from common
+    property names and fall back to the file name.
+    """
+    geoms, names = [], []
+
+    for path, data in zip(paths, contents):
+        base = os.path.basename(path)
+        gj = json.loads(data)
+
+        # Handle either FeatureCollection or single Feature
+        if gj.get("type") == "FeatureCollection":
+            feats = gj.get("features", [])
+        elif gj.get("type") == "Feature":
+            feats = [gj]
+        else:
+            continue
+
+        for feat in feats:
+            props = feat.get("properties", {}) or {}
+
+            # Try a few common property names, fall back to filename
+            raw_name = (
+                props.get("name")
+                or props.get("NAME")
+                or props.get("ward")
+                or props.get("WardName")
+                or props.get("NAMELATIN")
+                or os.path.splitext(base)[0].replace(".geo", "")
+            )
+
+            # Clean up filename-based names: "adachi-ku" -> "Adachi-Ku"
+            geoms.append(shape(feat["geometry"]))
+            names.append(raw_name.replace("_", " ").replace("-", " ").title())
+
+    return geoms, names
+
+
+def parse_feature_collection(data, ward_prop):
+    """Every feature of a single GeoJSON FeatureCollection is one ward."""
+    features = json.loads(data)["features"]
+    geoms, names = [], []
+
+    for idx, feat in enumerate(features, start=1):
+        props = feat.get("properties", {})
+        name = (
+            props.get(ward_prop)
+            or props.get("name")
+            or props.get("ward")
+            or props.get("NAME")
+            or props.get("WardName")
+            or props.get("BoroName")
+            or f"Ward {idx}"
+        )
+        geoms.append(shape(feat["geometry"]))
+        names.append(name.replace("_", " ").replace("-", " ").title())
+
+    return geoms, names
+
+
+def repair_invalid(geoms):
+    """
+    Run make_valid only on the geometries that fail a vectorized
+    is_valid check. Returns (geoms array, number repaired).
+    """
+    arr = np.empty(len(geoms), dtype=object)
+    arr[:] = geoms
+    invalid = ~shapely.is_valid(arr)
+    if invalid.any():
+        arr[invalid] = shapely.make_valid(arr[invalid])
+    return arr, int(invalid.sum())
+
+# ---------------------------------------------------------
+# 3. Binary cache (WKB + names, no JSON parsing on load)
+# ---------------------------------------------------------
+
+def save_boundary_cache(path, geoms, names, key):
+    """Store geometries as WKB plus their names in one .npz file."""
+    wkb = shapely.to_wkb(np.asarray(geoms, dtype=object))
+    lengths = np.array([len(b) for b in wkb], dtype=np.int64)
+    offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    buf = np.frombuffer(b"".join(wkb), dtype=np.uint8)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            key=np.array(key),
+            wkb=buf,
+            offsets=offsets,
+            names=np.array(names, dtype=str),
+        )
+    os.replace(tmp, path)
+
+
+def load_boundary_cache(path, key=None):
+    """
+    Load geometries + names from a boundary cache file.
+    Returns (geoms array, names list), or None if missing / stale.
+    """
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as z:
+        if key is not None and str(z["key"]) != key:
+            return None
+        buf = z["wkb"].tobytes()
+        offsets = z["offsets"]
+        names = [str(n) for n in z["names"]]
+
+    wkb = [buf[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    geoms = shapely.from_wkb(np.array(wkb, dtype=object))
+    return geoms, names
+
+
+def load_boundaries(BOUND_PATH, mult_json, ward_prop="name", cache_dir=BOUNDARY_CACHE_DIR):
+    """
+    Parse a city's boundary source once, repair invalid geometries and
+    cache the result; later calls with unchanged sources load the cache.
+
+    Parameters:
+        BOUND_PATH - Folder of *.geo.json files if mult_json, else a GeoJSON file
+        mult_json - See preprocess()
+        ward_prop - Property holding subdivision names (single-file sources)
+        cache_dir - Folder for cache files, None disables caching
+
+    Returns:
+        geoms - list of shapely geometries, ward id i + 1 is geoms[i]
+        ward_names - dict ward id -> name
+    """
+    paths = boundary_sources(BOUND_PATH, mult_json)
+    contents = read_sources(paths)
+
+    cache_path = None
+    key = None
+    if cache_dir is not None:
+        key = boundary_cache_key(paths, contents, ward_prop if not mult_json else None)
+        cache_path = os.path.join(cache_dir, f"boundaries-{key[:16]}.npz")
+        cached = load_boundary_cache(cache_path, key)
+        if cached is not None:
+            geoms, names = cached
+            return list(geoms), {i: n for i, n in enumerate(names, start=1)}
+
+    if mult_json:
+        geoms, names = parse_ward_files(paths, contents)
+    else:
+        geoms, names = parse_feature_collection(contents[0], ward_prop)
+
+    geoms, n_repaired = repair_invalid(geoms)
+    if n_repaired:
+        print(f"Repaired {n_repaired} invalid ward geometries")
+
+    if cache_path is not None:
+        save_boundary_cache(cache_path, geoms, names, key)
+
+    return list(geoms), {i: n for i, n in enumerate(names, start=1)}
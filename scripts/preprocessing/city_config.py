@@ -0,0 +1,26 @@
+from pathlib import Path
+
+# ---------------------------------------------------------
+# Cities with preprocessed grids, shared by the experiments, tiles and
+# query server (paths relative to the repo root)
+# ---------------------------------------------------------
+
+# Adjust these if your folder structure changes
+CITY_CONFIGS = {
+    "tokyo": {
+        "label": "Tokyo",
+        "grid_path": Path("data/tokyo/tokyo_grid.json"),
+    },
+    "london": {
+        "label": "London",
+        "grid_path": Path("data/london/london_grid.json"),
+    },
+    "nyc": {
+        "label": "New York City",
+        "grid_path": Path("data/nyc/nyc_grid.json"),
+    },
+    "sandiego": {
+        "label": "San Diego County",
+        "grid_path": Path("data/san-diego/sandiego_grid.json"),
+    },
+}
@@ -0,0 +1,186 @@
+import json
+
+import numpy as np
+
+# layer -> fixed levels (list) or spacing between levels (number)
+CONTOUR_LEVELS = {
+    "ndvi": [0.2, 0.4, 0.6],
+    "lst_day_C": 1.0,
+    "lst_night_C": 1.0,
+}
+CONTOUR_DECIMALS = 5   # ~1 m in lon/lat
+
+# ---------------------------------------------------------
+# 1. Marching squares (all cells of one level at once)
+# ---------------------------------------------------------
+
+# Cell corners a (top-left), b (top-right), c (bottom-right), d (bottom-left);
+# case = 8a + 4b + 2c + d for corners above the level.
+# Edges: 0 top (a-b), 1 right (b-c), 2 bottom (d-c), 3 left (a-d).
+# Saddles (5, 10) use the first pair when the cell centre is above the level.
+_SEGMENTS = np.full((16, 2, 2), -1, dtype=np.int64)
+for case, segs in {
+    1: [(3, 2)], 2: [(2, 1)], 3: [(3, 1)], 4: [(0, 1)], 6: [(0, 2)], 7: [(3, 0)],
+    8: [(3, 0)], 9: [(0, 2)], 11: [(0, 1)], 12: [(3, 1)], 13: [(2, 1)], 14: [(3, 2)],
+}.items():
+    _SEGMENTS[case, :len(segs)] = segs
+_SADDLE = {
+    5: ([(3, 0), (2, 1)], [(0, 1), (3, 2)]),
+    10: ([(0, 1), (3, 2)], [(3, 0), (2, 1)]),
+}
+
+
+def level_segments(values, level, cell_mask):
+    """
+    Contour segments of one level as pairs of grid-edge ids, for every
+    cell (2x2 block of pixel centres) where cell_mask is True.
+    Horizontal edge (r, c)-(r, c+1) has id r * (W - 1) + c, vertical edge
+    (r, c)-(r+1, c) has id H * (W - 1) + r * W + c.
+    """
+    H, W = values.shape
+    above = values > level
+    case = (8 * above[:-1, :-1] + 4 * above[:-1, 1:] + 2 * above[1:, 1:] + above[1:, :-1])
+    case[~cell_mask] = 0
+
+    segs = _SEGMENTS[case]   # (H-1, W-1, 2, 2)
+    for saddle, (if_above, if_below) in _SADDLE.items():
+        where = case == saddle
+        if where.any():
+            centre = (values[:-1, :-1] + values[:-1, 1:] + values[1:, 1:] + values[1:, :-1])[where] / 4
+            segs[where] = np.where((centre > level)[:, None, None], if_above, if_below)
+
+    r, c = np.mgrid[0:H - 1, 0:W - 1]
+    n_h = H * (W - 1)
+    edge_ids = np.stack([
+        r * (W - 1) + c,            # top
+        n_h + r * W + c + 1,        # right
+        (r + 1) * (W - 1) + c,      # bottom
+        n_h + r * W + c,            # left
+    ], axis=-1)   # (H-1, W-1, 4)
+
+    has = segs[..., 0] >= 0   # (H-1, W-1, 2)
+    cell_edges = np.broadcast_to(edge_ids[:, :, None, :], has.shape + (4,))[has]
+    which = segs[has]
+    return np.take_along_axis(cell_edges, which, axis=1)   # (n, 2)
+
+
+def edge_points(values, level, ids):
+    """Fractional (row, col) where the level crosses each grid edge."""
+    H, W = values.shape
+    n_h = H * (W - 1)
+    flat = values.reshape(-1)
+
+    horizontal = ids < n_h
+    r = np.where(horizontal, ids // (W - 1), (ids - n_h) // W)
+    c = np.where(horizontal, ids % (W - 1), (ids - n_h) % W)
+    v0 = flat[r * W + c]
+    v1 = np.where(horizontal, flat[r * W + np.minimum(c + 1, W - 1)], flat[np.minimum(r + 1, H - 1) * W + c])
+    t = (level - v0) / (v1 - v0)
+    return np.where(horizontal, r, r + t), np.where(horizontal, c + t, c)
+
+# ---------------------------------------------------------
+# 2. Segments -> polylines
+# ---------------------------------------------------------
+
+def stitch(segments):
+    """
+    Join segments sharing an edge id into polylines (lists of edge ids);
+    closed rings repeat their first id. Every edge id is shared by at most
+    two segments, so this is one linear walk.
+    """
+    ends = {}
+    for i, (a, b) in enumerate(segments.tolist()):
+        ends.setdefault(a, []).append(i)
+        ends.setdefault(b, []).append(i)
+
+    used = np.zeros(len(segments), dtype=bool)
+    seg_list = segments.tolist()
+
+    def walk(start_seg, start_id):
+        line = [start_id]
+        seg, cur = start_seg, start_id
+        while seg is not None and not used[seg]:
+            used[seg] = True
+            a, b = seg_list[seg]
+            cur = b if a == cur else a
+            line.append(cur)
+            seg = next((s for s in ends[cur] if not used[s]), None)
+        return line
+
+    lines = []
+    # open chains start at an edge used by one segment (mask / grid border)
+    for eid, segs in ends.items():
+        if len(segs) == 1 and not used[segs[0]]:
+            lines.append(walk(segs[0], eid))
+    for i in range(len(seg_list)):
+        if not used[i]:
+            lines.append(walk(i, seg_list[i][0]))
+    return lines
+
+# ---------------------------------------------------------
+# 3. Contours of a grid layer in lon / lat
+# ---------------------------------------------------------
+
+def contour_levels(values, mask, spec):
+    """Fixed levels, or every `spec` units across the in-mask value range."""
+    if isinstance(spec, (list, tuple)):
+        return [float(v) for v in spec]
+    vals = values[mask & np.isfinite(values)]
+    if vals.size == 0:
+        return []
+    lo = np.ceil(vals.min() / spec) * spec
+    return [float(v) for v in np.round(np.arange(lo, vals.max(), spec), 6)]
+
+
+def grid_contours(values, mask, bbox, levels):
+    """
+    Contour polylines of a north-up (H, W) layer at pixel centres.
+    Only cells whose four pixels are inside mask are traced, so lines are
+    clipped to the mask. Returns [{"level", "lines": [[lon, lat, lon, lat, ...]]}].
+    """
+    values = np.asarray(values, dtype=float)
+    mask = np.asarray(mask, dtype=bool) & np.isfinite(values)
+    H, W = values.shape
+    min_lon, min_lat, max_lon, max_lat = bbox
+    dx = (max_lon - min_lon) / W
+    dy = (max_lat - min_lat) / H
+
+    out = []
+    if H < 2 or W < 2:
+        return out
+    cell_mask = mask[:-1, :-1] & mask[:-1, 1:] & mask[1:, 1:] & mask[1:, :-1]
+
+    for level in levels:
+        segments = level_segments(values, level, cell_mask)
+        if len(segments) == 0:
+            continue
+
+        ids = np.unique(segments)
+        rows, cols = edge_points(values, level, ids)
+        lon = np.round(min_lon + (cols + 0.5) * dx, CONTOUR_DECIMALS)
+        lat = np.round(max_lat - (rows + 0.5) * dy, CONTOUR_DECIMALS)
+
+        lines = []
+        for line in stitch(segments):
+            k = np.searchsorted(ids, line)
+            lines.append(np.stack([lon[k], lat[k]], axis=1).reshape(-1).tolist())
+        out.append({"level": level, "lines": lines})
+    return out
+
+
+def export_contours(CONTOURS_OUT, city, layers, mask, bbox, levels=CONTOUR_LEVELS):
+    """Write contours of every configured layer present in `layers` (north-up arrays)."""
+    result = {"city": city, "crs": "EPSG:4326", "layers": {}}
+    for key, spec in levels.items():
+        if key not in layers:
+            continue
+        lv = contour_levels(layers[key], mask, spec)
+        result["layers"][key] = {
+            "levels": lv,
+            "contours": grid_contours(layers[key], mask, bbox, lv),
+        }
+
+    with open(CONTOURS_OUT, "w", encoding="utf-8") as f:
+        json.dump(result, f, separators=(",", ":"))
+    print("Wrote", CONTOURS_OUT)
+    return result
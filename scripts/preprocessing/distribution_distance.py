@@ -0,0 +1,98 @@
+import numpy as np
+
+DISTANCE_BANDS = ["ndvi", "lst_day", "lst_night"]
+DISTANCE_DECIMALS = 4
+
+# ---------------------------------------------------------
+# 1. Distances between two pre-sorted samples
+# ---------------------------------------------------------
+
+def merged_cdfs(a, b):
+    """
+    Merge two sorted 1-D samples. Returns the merged values and both
+    empirical CDFs evaluated after each merged value. A stable sort of two
+    concatenated sorted runs is a single linear merge (timsort).
+    """
+    x = np.concatenate([a, b])
+    order = np.argsort(x, kind="stable")
+    from_a = order < len(a)
+    return x[order], np.cumsum(from_a) / len(a), np.cumsum(~from_a) / len(b)
+
+
+def wasserstein_1(a, b):
+    """W1 = integral of |F_a - F_b| between consecutive merged values (sorted inputs)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.nan
+    x, fa, fb = merged_cdfs(a, b)
+    return float(np.sum(np.abs(fa - fb)[:-1] * np.diff(x)))
+
+
+def ks_statistic(a, b):
+    """Two-sample Kolmogorov-Smirnov D = max |F_a - F_b| (sorted inputs)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.nan
+    x, fa, fb = merged_cdfs(a, b)
+    # only compare the CDFs after the last copy of tied values
+    last = np.append(x[1:] != x[:-1], True)
+    return float(np.max(np.abs(fa - fb)[last]))
+
+# ---------------------------------------------------------
+# 2. Pairwise matrices
+# ---------------------------------------------------------
+
+def distance_matrices(samples):
+    """
+    Symmetric (n, n) Wasserstein-1 and KS matrices between n samples.
+    Every sample is sorted once; each pair is then one merge.
+    """
+    sorted_samples = [np.sort(np.asarray(s, dtype=float)) for s in samples]
+    n = len(sorted_samples)
+    w1 = np.zeros((n, n))
+    ks = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            w1[i, j] = w1[j, i] = wasserstein_1(sorted_samples[i], sorted_samples[j])
+            ks[i, j] = ks[j, i] = ks_statistic(sorted_samples[i], sorted_samples[j])
+    return w1, ks
+
+
+def _rounded(m):
+    # NaN (empty samples) -> null in JSON
+    return [[None if not np.isfinite(v) else round(float(v), DISTANCE_DECIMALS) for v in row] for row in m]
+
+
+def build_distance_matrices(city_pixel_data, labels, bands=DISTANCE_BANDS):
+    """
+    City x city and ward x ward (all cities pooled) distance matrices per band.
+    city_pixel_data maps city id -> {band: 1-D pixels, "ward_ids": 1-D ids},
+    as loaded by greenness_model_experiments.load_city_grid.
+    """
+    cids = list(city_pixel_data)
+    ward_city, ward_ids, ward_pix = [], [], []
+    for cid in cids:
+        # one stable argsort groups every ward's pixels (O(pixels log pixels),
+        # not one full-city mask per ward)
+        wids = np.asarray(city_pixel_data[cid]["ward_ids"])
+        order = np.argsort(wids, kind="stable")
+        ids, counts = np.unique(wids[order], return_counts=True)
+        if not ids.size:
+            continue
+        ward_city += [cid] * len(ids)
+        ward_ids += [int(wid) for wid in ids]
+        ward_pix += np.split(order, np.cumsum(counts)[:-1])
+
+    out = {
+        "bands": list(bands),
+        "cities": {"ids": cids, "labels": [labels[cid] for cid in cids]},
+        "wards": {"city": ward_city, "ids": ward_ids},
+    }
+    for band in bands:
+        w1, ks = distance_matrices([city_pixel_data[cid][band] for cid in cids])
+        out["cities"][band] = {"wasserstein": _rounded(w1), "ks": _rounded(ks)}
+
+        ward_samples = [
+            city_pixel_data[cid][band][pix] for cid, pix in zip(ward_city, ward_pix)
+        ]
+        w1, ks = distance_matrices(ward_samples)
+        out["wards"][band] = {"wasserstein": _rounded(w1), "ks": _rounded(ks)}
+    return out
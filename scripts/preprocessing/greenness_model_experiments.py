@@ -2,47 +2,58 @@ import json
 import numpy as np
 from pathlib import Path
 
+from city_config import CITY_CONFIGS
+from distribution_distance import build_distance_matrices
+from grid_io import (
+    read_grid, decode_layer, grid_inside_mask, grid_lc_sensor, load_grid, write_json_stream,
+)
+from sensors import LC_GROUPS, class_groups
+
 # ---------------------------------------------------------
-# 1. CONFIG: where your preprocessed grid JSONs live
+# 1. CONFIG: outputs and model settings (city grids: city_config.py)
 # ---------------------------------------------------------
 
-# Adjust these if your folder structure changes
-CITY_CONFIGS = {
-    "tokyo": {
-        "label": "Tokyo",
-        "grid_path": Path("data/tokyo/tokyo_grid.json"),
-    },
-    "london": {
-        "label": "London",
-        "grid_path": Path("data/london/london_grid.json"),
-    },
-    "nyc": {
-        "label": "New York City",
-        "grid_path": Path("data/nyc/nyc_grid.json"),
-    },
-    "sandiego": {
-        "label": "San Diego County",
-        "grid_path": Path("data/san-diego/sandiego_grid.json"),
-    },
-}
-
 # Where to store response curves for later use in JS
 MODELS_OUT_PATH = Path("data/models/ndvi_lst_response_curves.json")
 
+# Pixel-level model: NDVI spline knots, land-cover groups (sensors.LC_GROUPS,
+# mapped from each grid's LC sensor classes) and the number of pixels scored
+# per batch when fitting / predicting
+PIXEL_MODEL_KNOTS = [0.2, 0.4, 0.6]
+PIXEL_MODEL_LC_GROUPS = [g for g in LC_GROUPS if g != "no_data"]
+# Group left out of the dummies: the city fixed effects already act as
+# per-city intercepts, so the other groups are effects relative to urban.
+# Pixels in no model group (no data, or a class the sensor does not group)
+# are left out of the fit.
+PIXEL_MODEL_LC_REFERENCE = "urban"
+PIXEL_MODEL_BATCH = 65536
+
+# Predicted / residual LST layers of the pixel model, one file per city on
+# the city grid's raster; the preprocess grids are left untouched
+MODEL_LAYERS_DIR = Path("data/models/pixel_model_layers")
+
+# Dense what-if tables (ΔLST per NDVI increment) for the greenness simulator
+WHATIF_OUT_PATH = Path("data/models/ndvi_lst_whatif_tables.json")
+WHATIF_INCREMENTS = np.round(np.arange(0.0, 0.501, 0.02), 2)
+WHATIF_START_NDVI = np.round(np.arange(-0.2, 1.001, 0.02), 2)
+
+# Wasserstein-1 / KS distance matrices between city and ward distributions
+DISTANCES_OUT_PATH = Path("data/models/distribution_distances.json")
+
 # ---------------------------------------------------------
 # 2. Utilities: loading & basic stats
 # ---------------------------------------------------------
 
 def load_city_grid(grid_path):
     """
-    Load flattened pixel-level arrays from one *_grid.json.
+    Load flattened pixel-level arrays from one *_grid.json (dense or sparse).
     Returns: ndvi, lst_day, lst_night, ward_ids (all 1D np arrays).
     """
-    with open(grid_path, "r", encoding="utf-8") as f:
-        g = json.load(f)
+    g = read_grid(grid_path)
+    inside = grid_inside_mask(g)
 
     def arr(key, dtype=float):
-        return np.array(g[key], dtype=dtype)
+        return np.asarray(decode_layer(g, key, inside), dtype=dtype)
 
     ndvi = arr("ndvi", dtype=float)
     lst_day = arr("lst_day_C", dtype=float)
@@ -60,8 +71,29 @@ def load_city_grid(grid_path):
     ndvi = ndvi[mask]
     lst_day = lst_day[mask]
     lst_night = lst_night[mask]
+    ward_ids = ward_ids[mask]
 
-    return ndvi, lst_day, lst_night
+    return ndvi, lst_day, lst_night, ward_ids
+
+
+def load_grid_layers(grid_path):
+    """
+    Load one *_grid.json (dense or sparse) and reshape its pixel layers to (H, W).
+    Returns: (g, layers) where g is the raw JSON dict and layers maps
+    ndvi, lst_day, lst_night, ward_ids, lc and lc_group (index into
+    sensors.LC_GROUPS, from the grid's LC sensor) to 2D np arrays.
+    """
+    g, dense = load_grid(grid_path)
+    shape = (int(g["height"]), int(g["width"]))
+    layers = {
+        "ndvi": dense["ndvi"].astype(float),
+        "lst_day": dense["lst_day_C"].astype(float),
+        "lst_night": dense["lst_night_C"].astype(float),
+        "ward_ids": dense["ward_ids"].astype(int),
+        "lc": dense["lc"].astype(int) if "lc" in dense else np.zeros(shape, dtype=int),
+    }
+    layers["lc_group"] = class_groups(grid_lc_sensor(g), layers["lc"])
+    return g, layers
 
 
 def corr_safe(x, y):
@@ -132,7 +164,56 @@ def moving_average(values, window=3):
     return out
 
 # ---------------------------------------------------------
-# 4. Optional: pooled linear / ridge model
+# 4. Dense what-if tables
+# ---------------------------------------------------------
+
+def build_whatif_table(xs, ys, start_ndvi, increments):
+    """
+    Tabulate predicted ΔLST on a response curve for every
+    (starting NDVI, NDVI increment) pair.
+
+    Returns:
+        table: (len(start_ndvi), len(increments)) array of ΔLST
+    """
+    start = np.asarray(start_ndvi, dtype=float)[:, None]
+    target = start + np.asarray(increments, dtype=float)[None, :]
+    return np.interp(target, xs, ys) - np.interp(start, xs, ys)
+
+
+def build_ward_whatif_table(xs, ys, ndvi, ward_ids, increments):
+    """
+    Mean predicted ΔLST per ward when every pixel in the ward gains the
+    same NDVI increment. All pixels and increments are interpolated in one
+    np.interp call and reduced per ward with a single bincount.
+
+    Returns:
+        wids: sorted ward ids
+        table: (len(wids), len(increments)) array of ΔLST
+    """
+    ndvi = np.asarray(ndvi, dtype=float)
+    increments = np.asarray(increments, dtype=float)
+    wids, ward_pos = np.unique(ward_ids, return_inverse=True)
+    n_inc = len(increments)
+
+    delta = (
+        np.interp(ndvi[:, None] + increments[None, :], xs, ys)
+        - np.interp(ndvi, xs, ys)[:, None]
+    )
+
+    idx = ward_pos[:, None] * n_inc + np.arange(n_inc)[None, :]
+    sums = np.bincount(idx.ravel(), weights=delta.ravel(), minlength=len(wids) * n_inc)
+    counts = np.bincount(ward_pos, minlength=len(wids))
+
+    table = sums.reshape(len(wids), n_inc) / counts[:, None]
+    return wids, table
+
+
+def round_table(table, decimals=4):
+    """Round a 2D array and convert it to nested lists for JSON."""
+    return np.round(np.asarray(table, dtype=float), decimals).tolist()
+
+# ---------------------------------------------------------
+# 5. Optional: pooled linear / ridge model
 # ---------------------------------------------------------
 
 def make_city_dummy_matrix(city_ids, all_city_keys):
@@ -221,7 +302,217 @@ def fit_pooled_linear_model(city_pixel_data, target="day"):
     return coeffs
 
 # ---------------------------------------------------------
-# 5. Main experiment routine
+# 6. Pixel-level LST model (spline + land cover + neighbourhood)
+# ---------------------------------------------------------
+
+def neighbourhood_mean(arr, radius=1):
+    """
+    Mean of arr over a (2r+1)x(2r+1) window; edges and non-finite pixels
+    (e.g. outside-ward pixels of a sparse grid) are left out.
+    """
+    h, w = arr.shape
+    k = 2 * radius + 1
+    finite = np.isfinite(arr)
+    padded = np.pad(np.where(finite, arr, 0.0), radius, mode="constant")
+    ones = np.pad(finite.astype(float), radius, mode="constant")
+
+    csum = np.zeros((h + k, w + k))
+    ccnt = np.zeros((h + k, w + k))
+    csum[1:, 1:] = padded.cumsum(0).cumsum(1)
+    ccnt[1:, 1:] = ones.cumsum(0).cumsum(1)
+
+    def window(c):
+        return c[k:, k:] - c[:-k, k:] - c[k:, :-k] + c[:-k, :-k]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return window(csum) / window(ccnt)
+
+
+def pixel_lc_groups():
+    """Land-cover groups with a dummy column (all but the reference group)."""
+    return [g for g in PIXEL_MODEL_LC_GROUPS if g != PIXEL_MODEL_LC_REFERENCE]
+
+
+def pixel_lc_modelled(lc_group):
+    """True where the land-cover group (sensors.LC_GROUPS index) is one of the model's groups."""
+    return np.isin(lc_group, [LC_GROUPS.index(g) for g in PIXEL_MODEL_LC_GROUPS])
+
+
+def pixel_feature_names(all_city_keys):
+    """Column names of the pixel model design matrix, in order."""
+    names = ["ndvi"]
+    names += [f"ndvi_hinge_{k:.2f}" for k in PIXEL_MODEL_KNOTS]
+    names += [f"lc_{g}" for g in pixel_lc_groups()]
+    names += ["ndvi_neigh_mean", "urban_neigh_frac"]
+    names += [f"city_{cid}" for cid in all_city_keys]
+    return names
+
+
+def pixel_features(ndvi, lc_group, ndvi_neigh, urban_neigh, city_col, n_cities):
+    """
+    Build a design matrix for a batch of pixels (all 1D inputs; lc_group
+    indexes sensors.LC_GROUPS).
+    City fixed effects replace the global intercept, and the reference
+    land-cover group has no dummy, so the columns are not collinear.
+    """
+    n = len(ndvi)
+    cols = [ndvi]
+    cols += [np.maximum(ndvi - k, 0.0) for k in PIXEL_MODEL_KNOTS]
+    cols += [(lc_group == LC_GROUPS.index(g)).astype(float) for g in pixel_lc_groups()]
+    cols += [ndvi_neigh, urban_neigh]
+
+    X = np.empty((n, len(cols) + n_cities), dtype=float)
+    for j, col in enumerate(cols):
+        X[:, j] = col
+
+    X[:, len(cols):] = 0.0
+    X[:, len(cols) + city_col] = 1.0
+    return X
+
+
+def city_feature_inputs(layers):
+    """Per-pixel (flattened) inputs for pixel_features from one city's layers."""
+    ndvi = layers["ndvi"]
+    urban = (layers["lc_group"] == LC_GROUPS.index("urban")).astype(float)
+    return {
+        "ndvi": ndvi.reshape(-1),
+        "lc_group": layers["lc_group"].reshape(-1),
+        "ndvi_neigh": neighbourhood_mean(ndvi).reshape(-1),
+        "urban_neigh": neighbourhood_mean(urban).reshape(-1),
+    }
+
+
+def fit_pixel_model(city_layers, ridge=1e-3, batch=PIXEL_MODEL_BATCH):
+    """
+    Fit day and night LST jointly on every in-ward pixel of every city
+    whose land cover is in a model group.
+
+    The design matrix is never materialised for all pixels: X^T X and X^T y
+    are accumulated batch by batch and the normal equations are solved once
+    (with a small ridge on the non-fixed-effect columns).
+
+    city_layers: dict city_id -> layers dict from load_grid_layers()
+
+    Returns:
+        model: dict with feature names, coefficients and fit stats
+    """
+    all_city_keys = list(city_layers.keys())
+    names = pixel_feature_names(all_city_keys)
+    p = len(names)
+
+    xtx = np.zeros((p, p))
+    xty = np.zeros((p, 2))
+    yty = np.zeros(2)
+    ysum = np.zeros(2)
+    n_total = 0
+
+    for ci, cid in enumerate(all_city_keys):
+        layers = city_layers[cid]
+        inputs = city_feature_inputs(layers)
+        y_all = np.stack(
+            [layers["lst_day"].reshape(-1), layers["lst_night"].reshape(-1)], axis=1
+        )
+        keep = np.flatnonzero(
+            (layers["ward_ids"].reshape(-1) > 0)
+            & pixel_lc_modelled(inputs["lc_group"])
+            & np.isfinite(inputs["ndvi"])
+            & np.isfinite(y_all).all(axis=1)
+        )
+
+        for b0 in range(0, len(keep), batch):
+            idx = keep[b0:b0 + batch]
+            X = pixel_features(
+                inputs["ndvi"][idx], inputs["lc_group"][idx],
+                inputs["ndvi_neigh"][idx], inputs["urban_neigh"][idx],
+                ci, len(all_city_keys),
+            )
+            y = y_all[idx]
+            xtx += X.T @ X
+            xty += X.T @ y
+            yty += (y * y).sum(axis=0)
+            ysum += y.sum(axis=0)
+            n_total += len(idx)
+
+    penalty = np.full(p, ridge)
+    penalty[-len(all_city_keys):] = 0.0
+    beta = np.linalg.solve(xtx + np.diag(penalty), xty)
+
+    # R^2 from the same sufficient statistics
+    sse = yty - 2 * (beta * xty).sum(axis=0) + np.einsum("ij,ik,kj->j", beta, xtx, beta)
+    sst = yty - ysum ** 2 / max(n_total, 1)
+    r2 = 1.0 - sse / sst
+
+    return {
+        "features": names,
+        "cities_order": all_city_keys,
+        "knots": PIXEL_MODEL_KNOTS,
+        "lc_groups": PIXEL_MODEL_LC_GROUPS,
+        "lc_reference": PIXEL_MODEL_LC_REFERENCE,
+        "coef_day": beta[:, 0].tolist(),
+        "coef_night": beta[:, 1].tolist(),
+        "r2_day": float(r2[0]),
+        "r2_night": float(r2[1]),
+        "n_pixels": int(n_total),
+    }
+
+
+def predict_pixel_model(model, cid, layers, batch=PIXEL_MODEL_BATCH):
+    """
+    Batched prediction of day/night LST for every pixel of one city
+    (NaN where the land cover is in no model group).
+    Returns: (pred_day, pred_night) as 2D arrays shaped like the city grid.
+    """
+    ci = model["cities_order"].index(cid)
+    beta = np.stack([model["coef_day"], model["coef_night"]], axis=1)
+    inputs = city_feature_inputs(layers)
+    n = len(inputs["ndvi"])
+    pred = np.empty((n, 2))
+
+    for b0 in range(0, n, batch):
+        sl = slice(b0, b0 + batch)
+        X = pixel_features(
+            inputs["ndvi"][sl], inputs["lc_group"][sl],
+            inputs["ndvi_neigh"][sl], inputs["urban_neigh"][sl],
+            ci, len(model["cities_order"]),
+        )
+        pred[sl] = X @ beta
+    pred[~pixel_lc_modelled(inputs["lc_group"])] = np.nan
+
+    shape = layers["ndvi"].shape
+    return pred[:, 0].reshape(shape), pred[:, 1].reshape(shape)
+
+
+def model_layers_path(cid):
+    return MODEL_LAYERS_DIR / f"{cid}_model_layers.json"
+
+
+def _layer_list(arr, decimals=3):
+    """Flat rounded values for JSON, NaN -> null."""
+    flat = np.round(np.asarray(arr, dtype=float).reshape(-1), decimals)
+    return [None if not np.isfinite(v) else v for v in flat.tolist()]
+
+
+def write_model_layers(out_path, g, layers, pred_day, pred_night):
+    """
+    Write predicted and residual LST layers for one city, row-major on the
+    city grid's raster (same width / height / bbox as its *_grid.json).
+    """
+    out = {
+        "city": g.get("city"),
+        "width": int(g["width"]),
+        "height": int(g["height"]),
+        "bbox": g["bbox"],
+        "lst_day_pred_C": _layer_list(pred_day),
+        "lst_night_pred_C": _layer_list(pred_night),
+        "lst_day_resid_C": _layer_list(layers["lst_day"] - pred_day),
+        "lst_night_resid_C": _layer_list(layers["lst_night"] - pred_night),
+    }
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_stream(out_path, out)
+
+# ---------------------------------------------------------
+# 7. Main experiment routine
 # ---------------------------------------------------------
 
 def run_experiments():
@@ -234,11 +525,12 @@ def run_experiments():
             print(f"[WARN] Grid file not found for {cid}: {path}")
             continue
 
-        ndvi, lst_day, lst_night = load_city_grid(path)
+        ndvi, lst_day, lst_night, ward_ids = load_city_grid(path)
         city_pixel_data[cid] = {
             "ndvi": ndvi,
             "lst_day": lst_day,
             "lst_night": lst_night,
+            "ward_ids": ward_ids,
         }
 
         print(f"Loaded {cid} ({cfg['label']}): {len(ndvi)} pixels inside wards")
@@ -246,6 +538,7 @@ def run_experiments():
     # 2) Per-city summary stats + response curves
     bins = np.arange(-0.2, 1.05, 0.05)  # NDVI ~ [-0.2, 1.0] from your preprocessing
     per_city_models = {}
+    whatif_tables = {}
 
     print("\n=== Per-city NDVI–LST stats ===")
     for cid, data in city_pixel_data.items():
@@ -280,30 +573,45 @@ def run_experiments():
             ndvi_target = max(xs_day[0], min(xs_day[-1], ndvi_target))
 
             # simple linear interpolation on the smoothed curve
-            def interp(xs, ys, x):
-                xs_arr = np.array(xs)
-                ys_arr = np.array(ys)
-                if x <= xs_arr[0]: return float(ys_arr[0])
-                if x >= xs_arr[-1]: return float(ys_arr[-1])
-                j = np.searchsorted(xs_arr, x) - 1
-                j = max(0, min(j, len(xs_arr) - 2))
-                x0, x1 = xs_arr[j], xs_arr[j+1]
-                y0, y1 = ys_arr[j], ys_arr[j+1]
-                t = (x - x0) / (x1 - x0)
-                return float(y0 + t * (y1 - y0))
-
-            lst_day_ref = interp(xs_day, ys_day_smooth, ndvi_ref)
-            lst_day_new = interp(xs_day, ys_day_smooth, ndvi_target)
-            delta_day = lst_day_new - lst_day_ref
-
-            lst_night_ref = interp(xs_night, ys_night_smooth, ndvi_ref)
-            lst_night_new = interp(xs_night, ys_night_smooth, ndvi_target)
-            delta_night = lst_night_new - lst_night_ref
+            delta_day = float(np.interp(ndvi_target, xs_day, ys_day_smooth)
+                              - np.interp(ndvi_ref, xs_day, ys_day_smooth))
+            delta_night = float(np.interp(ndvi_target, xs_night, ys_night_smooth)
+                                - np.interp(ndvi_ref, xs_night, ys_night_smooth))
 
             print(f"  Example Δ for +0.10 NDVI at NDVI≈{ndvi_ref:.2f}:")
             print(f"    Daytime LST:   {delta_day:+.2f} °C")
             print(f"    Nighttime LST: {delta_night:+.2f} °C")
 
+        # dense ΔLST tables so the simulator only has to look values up
+        if xs_day and xs_night:
+            ward_ids = data["ward_ids"]
+            wids, ward_day = build_ward_whatif_table(
+                xs_day, ys_day_smooth, ndvi, ward_ids, WHATIF_INCREMENTS
+            )
+            _, ward_night = build_ward_whatif_table(
+                xs_night, ys_night_smooth, ndvi, ward_ids, WHATIF_INCREMENTS
+            )
+            ward_pos = np.searchsorted(wids, ward_ids)
+            ward_ndvi_mean = (
+                np.bincount(ward_pos, weights=ndvi) / np.bincount(ward_pos)
+            )
+
+            whatif_tables[cid] = {
+                "city": CITY_CONFIGS[cid]["label"],
+                "day": round_table(build_whatif_table(
+                    xs_day, ys_day_smooth, WHATIF_START_NDVI, WHATIF_INCREMENTS
+                )),
+                "night": round_table(build_whatif_table(
+                    xs_night, ys_night_smooth, WHATIF_START_NDVI, WHATIF_INCREMENTS
+                )),
+                "wards": {
+                    "ids": [int(w) for w in wids],
+                    "ndvi_mean": np.round(ward_ndvi_mean, 4).tolist(),
+                    "day": round_table(ward_day),
+                    "night": round_table(ward_night),
+                },
+            }
+
         per_city_models[cid] = {
             "city": CITY_CONFIGS[cid]["label"],
             "ndvi_corr_day": r_day,
@@ -336,9 +644,30 @@ def run_experiments():
         for cid, intercept in pooled_night["city_intercepts"].items():
             print(f"  City intercept ({CITY_CONFIGS[cid]['label']}): {intercept:.2f} °C")
 
-    # 4) Save per-city response curves to JSON for the front-end
+    # 4) Pixel-level model: fit once, then write predicted / residual layers
+    # to their own files (the preprocess grids are not rewritten)
+    pixel_model = None
+    if city_pixel_data:
+        print("\n=== Pixel-level model (NDVI spline + land cover + neighbourhood) ===")
+        city_grids = {
+            cid: load_grid_layers(CITY_CONFIGS[cid]["grid_path"])
+            for cid in city_pixel_data
+        }
+        pixel_model = fit_pixel_model({cid: lyr for cid, (_, lyr) in city_grids.items()})
+        print(f"  Pixels used: {pixel_model['n_pixels']}")
+        print(f"  R^2 day:   {pixel_model['r2_day']:.3f}")
+        print(f"  R^2 night: {pixel_model['r2_night']:.3f}")
+
+        for cid, (g, layers) in city_grids.items():
+            pred_day, pred_night = predict_pixel_model(pixel_model, cid, layers)
+            out_path = model_layers_path(cid)
+            write_model_layers(out_path, g, layers, pred_day, pred_night)
+            print(f"  Wrote predicted / residual LST layers to {out_path}")
+
+    # 5) Save per-city response curves to JSON for the front-end
     models_out = {
         "per_city_response_curves": per_city_models,
+        "pixel_model": pixel_model,
         "note": (
             "Curves are NDVI-binned & smoothed LST averages per city. "
             "Use these for the what-if greenness simulator."
@@ -351,6 +680,39 @@ def run_experiments():
 
     print(f"\nWrote response curve models to {MODELS_OUT_PATH.resolve()}")
 
+    # 6) Save dense what-if tables (rows: starting NDVI, columns: increment)
+    whatif_out = {
+        "start_ndvi": WHATIF_START_NDVI.tolist(),
+        "increments": WHATIF_INCREMENTS.tolist(),
+        "cities": whatif_tables,
+        "note": (
+            "Predicted ΔLST (°C) from the smoothed per-city response curves. "
+            "City tables are indexed [start_ndvi][increment]; ward tables are "
+            "indexed [ward][increment] and average the Δ over the ward's pixels."
+        ),
+    }
+
+    with open(WHATIF_OUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(whatif_out, f)
+
+    print(f"Wrote what-if lookup tables to {WHATIF_OUT_PATH.resolve()}")
+
+    # 7) Full-distribution distances (NDVI, day / night LST) between every
+    # pair of cities and of wards, for the similarity views
+    distances_out = build_distance_matrices(
+        city_pixel_data, {cid: CITY_CONFIGS[cid]["label"] for cid in city_pixel_data}
+    )
+    distances_out["note"] = (
+        "Wasserstein-1 (same units as the band) and two-sample KS statistic "
+        "between pixel distributions inside wards. Ward matrices are indexed "
+        "by the pooled ward list (city id, ward id)."
+    )
+
+    with open(DISTANCES_OUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(distances_out, f)
+
+    print(f"Wrote distribution distance matrices to {DISTANCES_OUT_PATH.resolve()}")
+
 
 if __name__ == "__main__":
     run_experiments()
@@ -0,0 +1,100 @@
+import base64
+
+import numpy as np
+
+# ---------------------------------------------------------
+# Ward -> pixel run-length index
+# ---------------------------------------------------------
+
+def ward_run_index(ward_ids):
+    """
+    Index every ward's pixels as horizontal runs (row, col_start, length),
+    computed in one vectorized pass over ward_ids.
+
+    Runs are grouped by ward (row-major within a ward) in one shared
+    buffer; ward ids[k] owns runs[offsets[k]:offsets[k + 1]].
+
+    Returns a dict:
+        ids     - sorted ward ids (> 0)
+        offsets - int64, len(ids) + 1
+        runs    - int32 (n_runs, 3) array of (row, col_start, length)
+    """
+    ward_ids = np.asarray(ward_ids)
+    H, W = ward_ids.shape
+    flat = ward_ids.ravel()
+
+    # a run starts at every label change and at the start of every row
+    is_start = np.ones(flat.size, dtype=bool)
+    is_start[1:] = flat[1:] != flat[:-1]
+    is_start[::W] = True
+
+    starts = np.flatnonzero(is_start)
+    lengths = np.diff(np.append(starts, flat.size))
+    labels = flat[starts]
+
+    keep = labels > 0
+    starts, lengths, labels = starts[keep], lengths[keep], labels[keep]
+
+    order = np.argsort(labels, kind="stable")
+    starts, lengths, labels = starts[order], lengths[order], labels[order]
+
+    ids, counts = np.unique(labels, return_counts=True)
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(counts)
+
+    runs = np.stack([starts // W, starts % W, lengths], axis=1).astype(np.int32)
+    return {"ids": ids, "offsets": offsets, "runs": runs}
+
+
+def ward_pixel_indices(index, ward_id, width):
+    """Flat (row-major) pixel indices of one ward, in O(ward pixels)."""
+    k = np.searchsorted(index["ids"], ward_id)
+    if k >= len(index["ids"]) or index["ids"][k] != ward_id:
+        return np.zeros(0, dtype=np.int64)
+
+    runs = index["runs"][index["offsets"][k]:index["offsets"][k + 1]].astype(np.int64)
+    run_starts = runs[:, 0] * width + runs[:, 1]
+    lengths = runs[:, 2]
+
+    # start of each pixel's run + its position within the run
+    first = np.cumsum(lengths) - lengths
+    within = np.arange(lengths.sum()) - np.repeat(first, lengths)
+    return np.repeat(run_starts, lengths) + within
+
+
+def ward_pixels(values, index, ward_id):
+    """Values of one ward's pixels from a 2D layer, in row-major order."""
+    values = np.asarray(values)
+    return values.reshape(-1)[ward_pixel_indices(index, ward_id, values.shape[1])]
+
+
+def _b64_int32(values):
+    return base64.b64encode(np.asarray(values).astype("<i4").tobytes()).decode("ascii")
+
+
+def _int32_b64(text):
+    return np.frombuffer(base64.b64decode(text), dtype="<i4")
+
+
+def run_index_to_json(index):
+    """
+    JSON-ready form: ids, offsets and the flat [row, col, len, row, col,
+    len, ...] runs buffer as base64 little-endian int32, so a reader can
+    view each one as an Int32Array without parsing number lists.
+    """
+    return {
+        "dtype": "int32",
+        "encoding": "base64",
+        "ids": _b64_int32(index["ids"]),
+        "offsets": _b64_int32(index["offsets"]),
+        "runs": _b64_int32(index["runs"].reshape(-1)),
+    }
+
+
+def run_index_from_json(obj):
+    """Inverse of run_index_to_json."""
+    return {
+        "ids": _int32_b64(obj["ids"]),
+        "offsets": _int32_b64(obj["offsets"]).astype(np.int64),
+        "runs": _int32_b64(obj["runs"]).reshape(-1, 3),
+    }
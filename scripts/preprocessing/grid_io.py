@@ -0,0 +1,209 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Pixels formatted per write when streaming arrays to JSON
+STREAM_CHUNK = 65536
+
+# LC decoder of grids written before the "lc_sensor" field (all MODIS)
+LEGACY_LC_SENSOR = "modis_lc"
+
+# ---------------------------------------------------------
+# 1. Run-length encoding of the in-ward mask
+# ---------------------------------------------------------
+
+def mask_to_runs(mask):
+    """
+    Alternating run lengths of a flattened bool mask, starting with an
+    outside (False) run, which may be 0.
+    """
+    flat = np.asarray(mask, dtype=bool).reshape(-1)
+    change = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    bounds = np.concatenate([[0], change, [flat.size]])
+    runs = np.diff(bounds)
+    if flat.size and flat[0]:
+        runs = np.concatenate([[0], runs])
+    return runs.astype(np.int64)
+
+
+def runs_to_mask(runs, size):
+    """Inverse of mask_to_runs."""
+    runs = np.asarray(runs, dtype=np.int64)
+    values = np.arange(len(runs)) % 2 == 1
+    mask = np.repeat(values, runs)
+    if mask.size != size:
+        raise ValueError(f"Run lengths cover {mask.size} pixels, expected {size}")
+    return mask
+
+# ---------------------------------------------------------
+# 2. Sparse grid encoding / decoding
+# ---------------------------------------------------------
+
+def grid_layer_keys(g):
+    """Keys of per-pixel layers in a dense grid dict (lists of H*W values)."""
+    n = int(g["width"]) * int(g["height"])
+    return [
+        k for k, v in g.items()
+        if isinstance(v, (list, np.ndarray)) and len(v) == n and k != "bbox"
+    ]
+
+
+def _map_rows(g, flat):
+    """
+    ward_ids rows run south -> north (as rasterized) while the data layers
+    and the map are north-up: flip a flat ward_ids array between the two.
+    """
+    H, W = int(g["height"]), int(g["width"])
+    return np.asarray(flat).reshape(H, W)[::-1].reshape(-1)
+
+
+def encode_sparse_grid(grid_out, map_mask):
+    """
+    Switch a dense grid dict to the sparse format (in place): the in-ward
+    mask, as drawn on the map (north-up), is stored as run lengths and
+    every layer keeps only its values under it, in row-major order.
+    ward_ids is selected in map order too and flipped back on decode.
+    """
+    flat_mask = np.asarray(map_mask, dtype=bool).reshape(-1)
+    keys = grid_layer_keys(grid_out)
+
+    for k in keys:
+        flat = np.asarray(grid_out[k]).reshape(-1)
+        if k == "ward_ids":
+            flat = _map_rows(grid_out, flat)
+        grid_out[k] = flat[flat_mask]
+
+    grid_out["encoding"] = "sparse"
+    grid_out["inside_runs"] = mask_to_runs(flat_mask)
+    grid_out["sparse_layers"] = keys
+    return grid_out
+
+
+def is_sparse(g):
+    return g.get("encoding") == "sparse"
+
+
+def grid_lc_sensor(g):
+    """Name of the sensors.SENSORS decoder of the grid's "lc" classes."""
+    return g.get("lc_sensor", LEGACY_LC_SENSOR)
+
+
+def grid_inside_mask(g):
+    """Flat in-ward mask of a grid dict (dense or sparse), north-up like the map."""
+    n = int(g["width"]) * int(g["height"])
+    if is_sparse(g):
+        return runs_to_mask(g["inside_runs"], n)
+    return _map_rows(g, g["ward_ids"]) > 0
+
+
+def decode_layer(g, key, mask=None, fill=np.nan):
+    """
+    Dense flat numpy array for one layer. Outside-ward pixels of a sparse
+    grid get `fill` (0 for integer layers such as ward_ids / lc). ward_ids
+    comes back in its stored (south -> north) row order for both encodings.
+    """
+    vals = np.asarray(g[key])
+    if not is_sparse(g) or key not in g["sparse_layers"]:
+        return vals
+
+    if mask is None:
+        mask = grid_inside_mask(g)
+    if np.issubdtype(vals.dtype, np.integer):
+        out = np.zeros(mask.size, dtype=vals.dtype)
+    else:
+        out = np.full(mask.size, fill, dtype=float)
+    out[mask] = vals
+    if key == "ward_ids":
+        out = _map_rows(g, out)
+    return out
+
+
+def decode_sparse_grid(g, fill=np.nan):
+    """Dict of every layer as a dense flat numpy array."""
+    keys = g["sparse_layers"] if is_sparse(g) else grid_layer_keys(g)
+    mask = grid_inside_mask(g)
+    return {k: decode_layer(g, k, mask, fill) for k in keys}
+
+
+def set_layer(g, key, values):
+    """Add / replace a dense layer in a grid dict, respecting its encoding."""
+    flat = np.asarray(values).reshape(-1)
+    if is_sparse(g):
+        if key == "ward_ids":
+            flat = _map_rows(g, flat)
+        flat = flat[grid_inside_mask(g)]
+        if key not in g["sparse_layers"]:
+            g["sparse_layers"].append(key)
+    g[key] = flat
+
+# ---------------------------------------------------------
+# 3. Streaming, atomic JSON writer
+# ---------------------------------------------------------
+
+def _write_value(f, value, chunk_size):
+    if isinstance(value, np.ndarray):
+        # same text json.dump would produce, formatted a chunk at a time
+        flat = value.reshape(-1)
+        f.write("[")
+        for i in range(0, flat.size, chunk_size):
+            if i:
+                f.write(", ")
+            f.write(json.dumps(flat[i:i + chunk_size].tolist())[1:-1])
+        f.write("]")
+    elif isinstance(value, dict):
+        f.write("{")
+        for j, (k, v) in enumerate(value.items()):
+            if j:
+                f.write(", ")
+            f.write(json.dumps(str(k)))
+            f.write(": ")
+            _write_value(f, v, chunk_size)
+        f.write("}")
+    else:
+        f.write(json.dumps(value))
+
+
+def write_json_stream(path, obj, chunk_size=STREAM_CHUNK):
+    """
+    Write obj as JSON without building Python lists for numpy arrays:
+    header fields are dumped as usual and arrays are formatted in
+    fixed-size chunks, so peak memory stays bounded. The output matches
+    json.dump(obj) with arrays converted to lists.
+
+    The file is written to a temp file in the same folder and renamed
+    over `path`, so readers never see a partial file.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            _write_value(f, obj, chunk_size)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+# ---------------------------------------------------------
+# 4. Reading
+# ---------------------------------------------------------
+
+def read_grid(grid_path):
+    """Raw *_grid.json dict (layers left in their stored encoding)."""
+    with open(grid_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_grid(grid_path, fill=np.nan):
+    """
+    Load a *_grid.json of either encoding.
+    Returns: (g, layers) with layers mapping each per-pixel key to a
+    dense (H, W) numpy array.
+    """
+    g = read_grid(grid_path)
+    shape = (int(g["height"]), int(g["width"]))
+    layers = {k: v.reshape(shape) for k, v in decode_sparse_grid(g, fill).items()}
+    return g, layers
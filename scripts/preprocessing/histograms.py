@@ -0,0 +1,45 @@
+import numpy as np
+
+# Fixed bin edges shared by every city, so histograms compare directly.
+# Values beyond the outer edges are counted in the first / last bin.
+HIST_EDGES = {
+    "ndvi": np.round(np.arange(-0.2, 1.0001, 0.05), 2),
+    "lst_day": np.arange(-10.0, 60.0001, 2.0),
+    "lst_night": np.arange(-20.0, 40.0001, 2.0),
+}
+
+# ---------------------------------------------------------
+# Fixed-edge histograms from one bincount
+# ---------------------------------------------------------
+
+def bin_index(values, edges):
+    """Bin of every value for the given edges, clipped to [0, len(edges) - 2]."""
+    idx = np.searchsorted(edges, values, side="right") - 1
+    return np.clip(idx, 0, len(edges) - 2)
+
+
+def ward_histograms(values, ward_ids, ids, edges):
+    """
+    Per-ward counts of one band, shape (len(ids), n_bins), from a single
+    np.bincount over combined (ward, bin) indices. Non-finite values and
+    pixels outside the wards are skipped.
+    """
+    values = np.asarray(values).reshape(-1)
+    ward_ids = np.asarray(ward_ids).reshape(-1)
+    n_bins = len(edges) - 1
+
+    keep = (ward_ids > 0) & np.isfinite(values)
+    ward_pos = np.searchsorted(ids, ward_ids[keep])
+    key = ward_pos * n_bins + bin_index(values[keep], edges)
+    return np.bincount(key, minlength=len(ids) * n_bins).reshape(len(ids), n_bins)
+
+
+def joint_histogram(x, y, x_edges, y_edges, mask):
+    """2-D counts, shape (x bins, y bins), of the finite pixel pairs in mask."""
+    x = np.asarray(x).reshape(-1)
+    y = np.asarray(y).reshape(-1)
+    keep = np.asarray(mask).reshape(-1) & np.isfinite(x) & np.isfinite(y)
+
+    ny = len(y_edges) - 1
+    key = bin_index(x[keep], x_edges) * ny + bin_index(y[keep], y_edges)
+    return np.bincount(key, minlength=(len(x_edges) - 1) * ny).reshape(-1, ny)
@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+
+from grid_io import write_json_stream
+
+# ---------------------------------------------------------
+# 1. CONFIG: per-city ward stats files (ids match scripts/compare.js)
+# ---------------------------------------------------------
+
+SUMMARY_CITIES = {
+    "tokyo": {
+        "label": "Tokyo",
+        "wards_path": Path("data/tokyo/tokyo_wards.json"),
+    },
+    "london": {
+        "label": "London",
+        "wards_path": Path("data/london/london_boroughs.json"),
+    },
+    "nyc": {
+        "label": "New York City",
+        "wards_path": Path("data/nyc/nyc_boroughs.json"),
+    },
+    "san-diego": {
+        "label": "San Diego County",
+        "wards_path": Path("data/san-diego/sandiego_boroughs.json"),
+    },
+}
+
+SUMMARY_OUT_PATH = Path("data/intercity_summary.json")
+
+# Ward fields used by the inter-city views, stored once as column names
+SUMMARY_KEYS = ["id", "name", "pixel_count", "lc_mode"] + [
+    f"{band}_{stat}"
+    for band in ("ndvi", "lst_day", "lst_night")
+    for stat in ("min", "q1", "median", "q3", "max", "mean", "std")
+]
+SUMMARY_DECIMALS = 4
+
+# ---------------------------------------------------------
+# 2. Columnar summary
+# ---------------------------------------------------------
+
+def _compact(value):
+    if isinstance(value, float):
+        return round(value, SUMMARY_DECIMALS)
+    return value
+
+
+def build_summary(cities=SUMMARY_CITIES, keys=SUMMARY_KEYS):
+    """
+    Merge every city's ward stats into one columnar table: one list per
+    key, rows grouped by city, and city c owning rows
+    offsets[c]:offsets[c + 1].
+    """
+    ids, labels, offsets = [], [], [0]
+    columns = {key: [] for key in keys}
+
+    for cid, cfg in cities.items():
+        path = cfg["wards_path"]
+        if not path.exists():
+            print(f"[WARN] Ward stats not found for {cid}: {path}")
+            continue
+
+        with open(path, "r", encoding="utf-8") as f:
+            wards = json.load(f)["wards"]
+
+        for key in keys:
+            columns[key].extend(_compact(w.get(key)) for w in wards)
+
+        ids.append(cid)
+        labels.append(cfg["label"])
+        offsets.append(offsets[-1] + len(wards))
+
+    return {
+        "cities": ids,
+        "labels": labels,
+        "offsets": offsets,
+        "keys": list(keys),
+        "columns": columns,
+    }
+
+
+def write_summary(out_path=SUMMARY_OUT_PATH, cities=SUMMARY_CITIES):
+    summary = build_summary(cities)
+    write_json_stream(out_path, summary)
+    print(f"Wrote {out_path} ({summary['offsets'][-1]} wards, {len(summary['cities'])} cities)")
+    return summary
+
+
+if __name__ == "__main__":
+    write_summary()
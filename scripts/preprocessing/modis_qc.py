@@ -0,0 +1,98 @@
+import numpy as np
+
+# ---------------------------------------------------------
+# 1. Lookup tables: QC word -> accept / reject
+# ---------------------------------------------------------
+
+# MOD11A2 QC_Day / QC_Night (8 bit)
+#   bits 0-1  mandatory QA: 0 good, 1 other quality, 2 cloud, 3 not produced
+#   bits 2-3  data quality: 0 good, 1 other, 2-3 TBD
+#   bits 4-5  emissivity error: 0 <= 0.01, 1 <= 0.02, 2 <= 0.04, 3 > 0.04
+#   bits 6-7  LST error: 0 <= 1 K, 1 <= 2 K, 2 <= 3 K, 3 > 3 K
+LST_ERROR_LEVELS_K = [1.0, 2.0, 3.0, np.inf]
+EMIS_ERROR_LEVELS = [0.01, 0.02, 0.04, np.inf]
+
+# Defaults used by preprocess() when a QC band is given
+LST_QC_DEFAULTS = {
+    "max_lst_error_k": 2.0,
+    "max_emis_error": 0.04,
+    "accept_other_quality": True,
+}
+NDVI_QC_DEFAULTS = {
+    "max_usefulness": 11,
+    "reject_adjacent_cloud": True,
+    "reject_mixed_clouds": True,
+    "reject_snow": True,
+    "reject_shadow": True,
+}
+
+
+def lst_qc_lut(max_lst_error_k=2.0, max_emis_error=0.04, accept_other_quality=True):
+    """
+    256-entry accept table for MOD11A2 LST QC words.
+    A word passes if the LST was produced and its error bounds are within
+    the thresholds (bits are only checked when "other quality").
+    """
+    qc = np.arange(256)
+    mandatory = qc & 0b11
+    emis_err = np.array(EMIS_ERROR_LEVELS)[(qc >> 4) & 0b11]
+    lst_err = np.array(LST_ERROR_LEVELS_K)[(qc >> 6) & 0b11]
+
+    good = mandatory == 0
+    other = (mandatory == 1) & accept_other_quality
+    within = (lst_err <= max_lst_error_k) & (emis_err <= max_emis_error)
+    return good | (other & within)
+
+
+# MOD13 VI Quality (16 bit)
+#   bits 0-1   MODLAND QA: 0 good, 1 check other QA, 2 cloudy, 3 not produced
+#   bits 2-5   VI usefulness: 0 highest ... 12 lowest, 13-15 unusable
+#   bit  8     adjacent cloud detected
+#   bit  10    mixed clouds
+#   bit  14    possible snow / ice
+#   bit  15    possible shadow
+def vi_qc_lut(max_usefulness=11, reject_adjacent_cloud=True, reject_mixed_clouds=True,
+              reject_snow=True, reject_shadow=True):
+    """65536-entry accept table for MOD13 VI Quality words."""
+    qc = np.arange(65536)
+    modland = qc & 0b11
+    usefulness = (qc >> 2) & 0b1111
+
+    ok = (modland <= 1) & (usefulness <= max_usefulness)
+    if reject_adjacent_cloud:
+        ok &= ((qc >> 8) & 1) == 0
+    if reject_mixed_clouds:
+        ok &= ((qc >> 10) & 1) == 0
+    if reject_snow:
+        ok &= ((qc >> 14) & 1) == 0
+    if reject_shadow:
+        ok &= ((qc >> 15) & 1) == 0
+    return ok
+
+# ---------------------------------------------------------
+# 2. Decoding
+# ---------------------------------------------------------
+
+def decode_qc(qc, lut):
+    """
+    Accept mask for a QC band via one table lookup per pixel.
+    Non-finite / out-of-range QC values (e.g. float exports with NaN
+    nodata) are rejected.
+    """
+    qc = np.asarray(qc)
+    if np.issubdtype(qc.dtype, np.integer):
+        idx = qc.astype(np.int64)
+        valid = (idx >= 0) & (idx < lut.size)
+    else:
+        valid = np.isfinite(qc) & (qc >= 0) & (qc < lut.size)
+        idx = np.where(valid, qc, 0).astype(np.int64)
+
+    return lut[np.where(valid, idx, 0)] & valid
+
+
+def apply_qc(values, accept, label):
+    """Set rejected pixels to NaN (in place) and report how many were dropped."""
+    newly = ~accept & np.isfinite(values)
+    values[newly] = np.nan
+    print(f"QC rejected {int(newly.sum())} {label} pixels")
+    return values
@@ -0,0 +1,73 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Defaults used by preprocess(): a pixel is rejected when it lies more than
+# k robust standard deviations (1.4826 * MAD) from the median of its
+# window x window neighbourhood. min_sigma keeps flat areas (MAD ~ 0) from
+# rejecting ordinary noise.
+OUTLIER_DEFAULTS = {
+    "ndvi": {"window": 5, "k": 4.0, "min_sigma": 0.03},
+    "lst": {"window": 5, "k": 4.0, "min_sigma": 0.5},
+}
+MAD_TO_SIGMA = 1.4826
+
+# ---------------------------------------------------------
+# 1. Rolling median / MAD over sliding windows
+# ---------------------------------------------------------
+
+def rolling_median_mad(values, mask, window=5):
+    """
+    Median, MAD and finite count of the window x window neighbourhood
+    (NaN-padded at the borders, centre included) of every pixel in mask.
+    Returns three 1-D arrays in the order of values[mask].
+    """
+    if window < 3 or window % 2 == 0:
+        raise ValueError(f"Outlier window must be an odd size >= 3, got {window}")
+    half = window // 2
+    padded = np.pad(np.asarray(values, dtype=float), half, constant_values=np.nan)
+
+    # (n, window * window) view of the in-mask neighbourhoods, one copy
+    windows = sliding_window_view(padded, (window, window))[mask].reshape(-1, window * window)
+    count = np.isfinite(windows).sum(axis=1)
+
+    median = np.full(len(windows), np.nan)
+    mad = np.full(len(windows), np.nan)
+    has = count > 0
+    if has.any():
+        median[has] = np.nanmedian(windows[has], axis=1)
+        mad[has] = np.nanmedian(np.abs(windows[has] - median[has, None]), axis=1)
+    return median, mad, count
+
+# ---------------------------------------------------------
+# 2. Screening
+# ---------------------------------------------------------
+
+def outlier_mask(values, mask, window=5, k=4.0, min_sigma=0.0, min_valid=None):
+    """
+    (H, W) bool, True where an in-mask pixel is a local outlier:
+    |value - median| > k * max(1.4826 * MAD, min_sigma).
+    Pixels with fewer than min_valid finite neighbours (default: half the
+    window) are never rejected.
+    """
+    values = np.asarray(values, dtype=float)
+    mask = np.asarray(mask, dtype=bool) & np.isfinite(values)
+    if min_valid is None:
+        min_valid = window * window // 2 + 1
+
+    median, mad, count = rolling_median_mad(values, mask, window)
+    sigma = np.maximum(MAD_TO_SIGMA * mad, min_sigma)
+    reject = (count >= min_valid) & (np.abs(values[mask] - median) > k * sigma)
+
+    out = np.zeros(values.shape, dtype=bool)
+    out[mask] = reject
+    return out
+
+
+def screen_outliers(values, mask, label, window=5, k=4.0, min_sigma=0.0, min_valid=None):
+    """Copy of values with local outliers inside mask set to NaN, and the number rejected."""
+    reject = outlier_mask(values, mask, window, k, min_sigma, min_valid)
+    out = np.array(values)
+    out[reject] = np.nan
+    n = int(reject.sum())
+    print(f"Outlier screening rejected {n} {label} pixels")
+    return out, n
@@ -4,11 +4,18 @@ import tifffile
 import shapely
 from shapely.geometry import shape, Point
 
+from intercity_summary import write_summary
+from sensors import decode
+
 NDVI_TIF = "data/san-diego/sandiego_NDVI.tif"
 LST_TIF  = "data/san-diego/sandiego_LST.tif"   # exported with LST_Day & LST_Night
 NYC_JSON = "data/san-diego/boundaries/Council_Districts.geojson"
 MIN_LON, MIN_LAT, MAX_LON, MAX_LAT = -117.6, 32.53, -116.08, 33.49
 
+# Raster decoders (see sensors.SENSORS)
+NDVI_SENSOR = "modis_ndvi"
+LST_SENSOR = "modis_lst"
+
 GRID_OUT   = "data/san-diego/sandiego_grid.json"
 BOROUGHS_OUT  = "data/san-diego/sandiego_boroughs.json"
 
@@ -50,52 +57,18 @@ def fill_remaining(arr, inside_mask):
 
 
 # 1. Load NDVI (single-band)
-ndvi_raw = tifffile.imread(NDVI_TIF)  # (H,W) or (1,H,W)
-if ndvi_raw.ndim == 3:
-    ndvi_raw = ndvi_raw[0]
-
-H, W = ndvi_raw.shape
-
-ndvi = ndvi_raw.astype("float32")
-ndvi_nodata = (ndvi <= -2000) | (ndvi == 0)
-ndvi = ndvi * 0.0001        # now about [-0.2, 1.0]
-ndvi[ndvi_nodata] = np.nan
-
-
-# 2. Load LST (day + night)
-lst_raw = tifffile.imread(LST_TIF)
-
-if lst_raw.ndim == 3:
-    if lst_raw.shape == (H, W, 2):
-        # (H, W, bands)
-        lst_day_raw = lst_raw[:, :, 0].astype("float32")
-        lst_night_raw = lst_raw[:, :, 1].astype("float32")
-    elif lst_raw.shape[0] == 2 and lst_raw.shape[1] == H and lst_raw.shape[2] == W:
-        # (bands, H, W)
-        lst_day_raw = lst_raw[0].astype("float32")
-        lst_night_raw = lst_raw[1].astype("float32")
-    else:
-        raise ValueError(
-            f"Unexpected LST shape {lst_raw.shape}; "
-            f"cannot align with NDVI shape {(H, W)}"
-        )
-else:
-    raise ValueError(f"Expected 3D LST GeoTIFF with 2 bands; got shape {lst_raw.shape}")
-
-# MOD11A2: scale 0.02, Kelvin
-scale_LST = 0.02
-lst_day_K = lst_day_raw * scale_LST
-lst_night_K = lst_night_raw * scale_LST
-
-mask_invalid_day = (lst_day_raw <= 0)
-mask_invalid_night = (lst_night_raw <= 0)
-
-lst_day_K[mask_invalid_day] = np.nan
-lst_night_K[mask_invalid_night] = np.nan
-
-# Convert to °C
-lst_day = lst_day_K - 273.15
-lst_night = lst_night_K - 273.15
+ndvi = decode(NDVI_SENSOR, tifffile.imread(NDVI_TIF), "NDVI")["value"]
+H, W = ndvi.shape
+
+
+# 2. Load LST (day + night, °C)
+lst = decode(LST_SENSOR, tifffile.imread(LST_TIF), "LST")
+lst_day, lst_night = lst["day"], lst["night"]
+if lst_day.shape != (H, W):
+    raise ValueError(
+        f"Unexpected LST shape {lst_day.shape}; "
+        f"cannot align with NDVI shape {(H, W)}"
+    )
 
 
 # 3. Rasterize wards → ward_ids grid
@@ -274,4 +247,8 @@ boroughs_out = {
 
 with open(BOROUGHS_OUT, "w", encoding="utf-8") as f:
     json.dump(boroughs_out, f)
-print("Wrote", BOROUGHS_OUT)
\ No newline at end of file
+print("Wrote", BOROUGHS_OUT)
+
+
+# refresh the merged ward stats read by the inter-city views
+write_summary()
@@ -1,12 +1,38 @@
-import json
-import os
-import glob
 import numpy as np
-import tifffile
 import shapely
-from shapely.geometry import shape, Point
-
-def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT, WARDS_OUT, LAT_LONG, ward_prop = "name"):
+from shapely.geometry import Point
+
+from boundaries import load_boundaries
+from contours import CONTOUR_LEVELS, export_contours
+from grid_io import encode_sparse_grid, grid_layer_keys, write_json_stream
+from grid_index import ward_run_index, ward_pixel_indices, run_index_to_json
+from histograms import HIST_EDGES, ward_histograms, joint_histogram
+from intercity_summary import write_summary
+from outliers import OUTLIER_DEFAULTS, screen_outliers
+from modis_qc import (
+    LST_QC_DEFAULTS, NDVI_QC_DEFAULTS, lst_qc_lut, vi_qc_lut, decode_qc, apply_qc,
+)
+from ranks import RANK_LAYERS, RANK_SCALE, percentile_ranks, quantize_ranks
+from raster_io import (
+    geotiff_bbox, load_inputs, ward_union_bounds, aoi_window, crop,
+)
+from sensors import get_sensor, decode, class_range, split_bands
+from tiles import render_grid_tiles
+from topology import export_topology
+from zonal import lc_mode, ward_stats
+from spatial_stats import add_ward_autocorrelation, getis_ord_gi_star
+from summed_area import SAT_LAYERS, summed_area_tables, save_sat_sidecar
+from resample import target_grid, same_grid, align_band
+from suhi import SUHI_RING_KM, RURAL_EXCLUDE_LC, pixel_size_km, rural_ring_mask, rural_reference
+
+def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT, WARDS_OUT, LAT_LONG, ward_prop = "name",
+               gi_radius = 2, gi_z = 1.96, aoi_crop = True, aoi_margin = 2, TOPO_OUT = None,
+               sparse = False, LST_QC_TIF = None, NDVI_QC_TIF = None, qc_options = None,
+               suhi_ring_km = SUHI_RING_KM, suhi_exclude_lc = None, SAT_OUT = None,
+               align_to = "ndvi", preview_scale = 1, resample_methods = None,
+               ndvi_sensor = "modis_ndvi", lst_sensor = "modis_lst", lc_sensor = "modis_lc",
+               TILES_OUT = None, CONTOURS_OUT = None, contour_levels = None,
+               outlier_screen = False, outlier_options = None):
     """
     Generic preprocessing script
     Parameters:
@@ -21,10 +47,56 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
         GRID_OUT - Output file path for grid file
         WARDS_OUT - Output file path for ward level stats file
         LAT_LONG - List in format of [Minimum longitude, minimum latitude, maximum longitude,
-                    maximum latitude] for the city
+                    maximum latitude] for the city. Only used for GeoTIFFs with no
+                    georeferencing tags
         ward_prop - If provided, gives the property to access subdivision names in the
                     .geojson files. Should try to provide this because default
                     checks can return wrong value instead of an error
+        gi_radius - Half-width (pixels) of the box window for the Getis-Ord Gi*
+                    hot-spot layers
+        gi_z - Gi* z-score beyond which a pixel counts as a hot (or cold) spot
+        aoi_crop - If True, crop every band to the union bbox of the wards before
+                   rasterizing, gap-filling and writing
+        aoi_margin - Pixels kept around the wards' union bbox when cropping
+        TOPO_OUT - If provided, output file path for the simplified ward boundaries
+                   (TopoJSON, simplified relative to the grid's pixel size)
+        sparse - If True, write the grid in the sparse format: the in-ward mask as
+                 run lengths and only in-ward values for every layer
+                 (see grid_io.decode_sparse_grid)
+        LST_QC_TIF - Optional path to the MOD11A2 QC_Day / QC_Night GeoTIFF (same
+                     layout as LST_TIF); rejected retrievals become gaps before filling
+        NDVI_QC_TIF - Optional path to the MOD13 VI Quality GeoTIFF
+        qc_options - Optional dict {"lst": {...}, "ndvi": {...}} overriding the
+                     thresholds in modis_qc.LST_QC_DEFAULTS / NDVI_QC_DEFAULTS
+        suhi_ring_km - (inner, outer) distance in km from the wards of the rural
+                       reference ring for surface urban heat island intensity,
+                       None to skip SUHI
+        suhi_exclude_lc - Land cover classes never used as rural reference (default:
+                          the LC sensor's "rural_exclude" classes)
+        SAT_OUT - If provided, output path (.npz) for summed-area tables (sum, sum of
+                  squares, count) of the NDVI / LST / SUHI layers over the in-ward
+                  mask, for O(1) window stats (see summed_area.window_stats)
+        align_to - Grid every band is resampled onto: "ndvi", "lst" or "lc" for that
+                   band's own grid, or (bbox, (H, W)) for an explicit grid
+        preview_scale - Coarsening factor of the target grid for fast previews
+                        (1 = full resolution)
+        resample_methods - Optional dict {"ndvi" / "lst" / "lc": method} with method one
+                           of "mean", "bilinear", "nearest", "mode" or "auto" (block mean /
+                           mode when downsampling, bilinear / nearest when upsampling)
+        ndvi_sensor, lst_sensor, lc_sensor - Decoders from sensors.SENSORS giving each
+                           product's scale, offset, nodata rules, band layout and
+                           class table (defaults: MODIS NDVI / MOD11A2 / MCD12Q1)
+        TILES_OUT - If provided, folder for colour-mapped 8-bit PNG tiles of the NDVI,
+                    LST and LC layers (see tiles.render_grid_tiles)
+        CONTOURS_OUT - If provided, output path (.json) for lon/lat contour polylines
+                       of the filled NDVI / LST layers, clipped to the wards
+        contour_levels - Optional dict {layer: [levels] or spacing} replacing
+                         contours.CONTOUR_LEVELS (NDVI 0.2 / 0.4 / 0.6, LST every 1 °C)
+        outlier_screen - If True, set in-ward pixels far from their rolling median
+                         (k * MAD) to NaN before gap filling. Off by default, so
+                         grids match the plain gap-filled output
+        outlier_options - Optional dict {"ndvi": {...}, "lst": {...}} overriding
+                          window / k / min_sigma in outliers.OUTLIER_DEFAULTS
     """
     
     MIN_LON, MIN_LAT, MAX_LON, MAX_LAT = LAT_LONG
@@ -65,132 +137,103 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
         out[np.isnan(out)] = global_mean
         return out
     
-    def common_lc(arr):
-        comm_lc = {}
-        for elem in arr:
-            if elem in comm_lc:
-                comm_lc[elem] += 1
-            else:
-                comm_lc[elem] = 0
-        return max(comm_lc, key=comm_lc.get)
-
-    # 1. Load NDVI (single-band)
-    ndvi_raw = tifffile.imread(NDVI_TIF)  # (H,W) or (1,H,W)
-    if ndvi_raw.ndim == 3:
-        ndvi_raw = ndvi_raw[0]
-
-    H, W = ndvi_raw.shape
-
-    ndvi = ndvi_raw.astype("float32")
-    ndvi_nodata = (ndvi <= -2000) | (ndvi == 0)
-    ndvi = ndvi * 0.0001        # now about [-0.2, 1.0]
-    ndvi[ndvi_nodata] = np.nan
-
-
-    # 2. Load LST (day + night)
-    lst_raw = tifffile.imread(LST_TIF)
-
-    if lst_raw.ndim == 3:
-        if lst_raw.shape == (H, W, 2):
-            # (H, W, bands)
-            lst_day_raw = lst_raw[:, :, 0].astype("float32")
-            lst_night_raw = lst_raw[:, :, 1].astype("float32")
-        elif lst_raw.shape[0] == 2 and lst_raw.shape[1] == H and lst_raw.shape[2] == W:
-            # (bands, H, W)
-            lst_day_raw = lst_raw[0].astype("float32")
-            lst_night_raw = lst_raw[1].astype("float32")
-        else:
-            raise ValueError(
-                f"Unexpected LST shape {lst_raw.shape} "
-                f"cannot align with NDVI shape {(H, W)}"
-            )
-    else:
-        raise ValueError(f"Expected 3D LST GeoTIFF with 2 bands got shape {lst_raw.shape}")
-
-    # MOD11A2: scale 0.02, Kelvin
-    scale_LST = 0.02
-    lst_day_K = lst_day_raw * scale_LST
-    lst_night_K = lst_night_raw * scale_LST
-
-    mask_invalid_day = (lst_day_raw <= 0)
-    mask_invalid_night = (lst_night_raw <= 0)
-
-    lst_day_K[mask_invalid_day] = np.nan
-    lst_night_K[mask_invalid_night] = np.nan
-
-    # Convert to °C
-    lst_day = lst_day_K - 273.15
-    lst_night = lst_night_K - 273.15
-
-    # 1. Load LC (single-band)
-    lc = tifffile.imread(LC_TIF)  # (H,W) or (1,H,W)
-    if lc.ndim == 3:
-        lc = lc[0]
-
-    geoms = []
-    ward_ids = np.zeros((H, W), dtype="int32")
-    ward_names = {}
-
-    if mult_json:
-        pattern = os.path.join(BOUND_PATH, "*.geo.json")
-        ward_index = 1
-        for path in sorted(glob.glob(pattern)):
-            base = os.path.basename(path)
-            # skip obvious temp files if present
-            if base.startswith("temp_"):
-                continue
-
-            with open(path, "r", encoding="utf-8") as f:
-                gj = json.load(f)
-
-            # Handle either FeatureCollection or single Feature
-            if gj.get("type") == "FeatureCollection":
-                feats = gj.get("features", [])
-            elif gj.get("type") == "Feature":
-                feats = [gj]
-            else:
-                continue
-
-            for feat in feats:
-                geom = shape(feat["geometry"])
-                props = feat.get("properties", {}) or {}
-
-                # Try a few common property names, fall back to filename
-                raw_name = (
-                    props.get("name")
-                    or props.get("NAME")
-                    or props.get("ward")
-                    or props.get("WardName")
-                    or props.get("NAMELATIN")
-                    or os.path.splitext(base)[0].replace(".geo", "")
-                )
-
-                # Clean up filename-based names: "adachi-ku" -> "Adachi-Ku"
-                name = raw_name.replace("_", " ").replace("-", " ").title()
-
-                geoms.append(geom)
-                ward_names[ward_index] = name
-                ward_index += 1
+    # 0. Decode all rasters and load / prepare ward geometries concurrently
+    def prepare_wards():
+        geoms, ward_names = load_boundaries(BOUND_PATH, mult_json, ward_prop)
+        shapely.prepare(np.asarray(geoms, dtype=object))
+        return geoms, ward_names
+
+    tif_paths = {"ndvi": NDVI_TIF, "lst": LST_TIF, "lc": LC_TIF}
+    if LST_QC_TIF:
+        tif_paths["lst_qc"] = LST_QC_TIF
+    if NDVI_QC_TIF:
+        tif_paths["ndvi_qc"] = NDVI_QC_TIF
+
+    rasters, (geoms, ward_names) = load_inputs(tif_paths, prepare_wards)
+
+    # 1. Decode NDVI, LST (day + night) and LC with their sensor decoders:
+    # scale / offset / nodata -> calibrated float32 (NDVI, °C), NaN = missing
+    ndvi = decode(ndvi_sensor, rasters["ndvi"], "NDVI")["value"]
+
+    if get_sensor(lst_sensor)["layout"] != "day_night":
+        raise ValueError(f"LST sensor {lst_sensor!r} must provide day and night bands")
+    lst = decode(lst_sensor, rasters["lst"], "LST")
+    lst_day, lst_night = lst["day"], lst["night"]
+
+    # Optional MODIS QC screening: one table lookup per pixel
+    qc_options = qc_options or {}
+    if "lst_qc" in rasters:
+        lut = lst_qc_lut(**{**LST_QC_DEFAULTS, **qc_options.get("lst", {})})
+        qc_day, qc_night = split_bands(rasters["lst_qc"], 2, "LST QC")
+        apply_qc(lst_day, decode_qc(qc_day, lut), "day LST")
+        apply_qc(lst_night, decode_qc(qc_night, lut), "night LST")
+
+    if "ndvi_qc" in rasters:
+        lut = vi_qc_lut(**{**NDVI_QC_DEFAULTS, **qc_options.get("ndvi", {})})
+        ndvi_qc = rasters["ndvi_qc"]
+        if ndvi_qc.ndim == 3:
+            ndvi_qc = ndvi_qc[0]
+        apply_qc(ndvi, decode_qc(ndvi_qc, lut), "NDVI")
+
+    lc = decode(lc_sensor, rasters["lc"], "LC")["value"]
+    lc_min, lc_max = class_range(lc_sensor)
+    if suhi_exclude_lc is None:
+        suhi_exclude_lc = get_sensor(lc_sensor).get("rural_exclude", RURAL_EXCLUDE_LC)
+
+    # 3. Align every band onto one target grid, each from its own
+    # georeferencing (GeoTIFF tags, else LAT_LONG)
+    band_bbox = {}
+    band_shape = {"ndvi": ndvi.shape, "lst": lst_day.shape, "lc": lc.shape}
+    for key, path in (("ndvi", NDVI_TIF), ("lst", LST_TIF), ("lc", LC_TIF)):
+        tif_bbox, _ = geotiff_bbox(path)
+        band_bbox[key] = tif_bbox if tif_bbox is not None else list(LAT_LONG)
+
+    if isinstance(align_to, str):
+        grid_bbox, grid_shape = band_bbox[align_to], band_shape[align_to]
     else:
-        with open(BOUND_PATH, "r", encoding="utf-8") as f:
-            gj = json.load(f)
-            features = gj["features"]
-            geoms = [shapely.make_valid(shape(feat["geometry"])) for feat in features]
-            for idx, feat in enumerate(features, start=1):
-                props = feat.get("properties", {})
-                name = (
-                    props.get(ward_prop)
-                    or props.get("name")
-                    or props.get("ward")
-                    or props.get("NAME")
-                    or props.get("WardName")
-                    or props.get("BoroName")
-                    or f"Ward {idx}"
-                )
-                name = name.replace("_", " ").replace("-", " ").title()
-                ward_names[idx] = name
+        grid_bbox, grid_shape = align_to
+    grid_bbox, (H, W) = target_grid(grid_bbox, grid_shape, preview_scale)
+
+    methods = {"ndvi": "auto", "lst": "auto", "lc": "auto", **(resample_methods or {})}
+
+    def align(key, *arrays, categorical=False):
+        h, w = band_shape[key]
+        if not same_grid(band_bbox[key], (h, w), grid_bbox, (H, W)):
+            print(f"Resampling {key}: {h}x{w} -> {H}x{W} ({methods[key]})")
+        out = [align_band(arr, band_bbox[key], grid_bbox, (H, W), methods[key], categorical)
+               for arr in arrays]
+        return out if len(out) > 1 else out[0]
+
+    ndvi = align("ndvi", ndvi)
+    lst_day, lst_night = align("lst", lst_day, lst_night)
+    lc = align("lc", lc, categorical=True)
+    MIN_LON, MIN_LAT, MAX_LON, MAX_LAT = grid_bbox
+
+    # Area of interest: crop every band to the wards' union bbox before any
+    # heavy stage
+
+    # uncropped bands, kept for the rural reference ring (which lies outside the AOI)
+    full_shape = (H, W)
+    full_bbox = [MIN_LON, MIN_LAT, MAX_LON, MAX_LAT]
+    full_lst_day, full_lst_night, full_lc = lst_day, lst_night, lc
+    window = (0, H, 0, W)
+
+    if aoi_crop and geoms:
+        window, window_bbox = aoi_window(
+            [MIN_LON, MIN_LAT, MAX_LON, MAX_LAT], (H, W),
+            ward_union_bounds(geoms), margin=aoi_margin,
+        )
+        ndvi = crop(ndvi, window)
+        lst_day = crop(lst_day, window)
+        lst_night = crop(lst_night, window)
+        lc = crop(lc, window)
+
+        print(f"AOI crop: {H}x{W} -> {ndvi.shape[0]}x{ndvi.shape[1]} pixels")
+        H, W = ndvi.shape
+        MIN_LON, MIN_LAT, MAX_LON, MAX_LAT = window_bbox
 
     # assign each pixel to a ward by its centre point
+    ward_ids = np.zeros((H, W), dtype="int32")
     for r in range(H):
         lat = MIN_LAT + (r + 0.5) * (MAX_LAT - MIN_LAT) / H
         for c in range(W):
@@ -202,6 +245,20 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
                     break
 
     inside_mask = ward_ids > 0
+    # ward_ids rows run south -> north; the data layers (and the map) are north-up
+    map_mask = inside_mask[::-1]
+
+    # Robust outlier screening: spikes (cloud edges, water mixing) become
+    # gaps for the gap filler instead of skewing the ward stats
+    outliers_rejected = None
+    if outlier_screen:
+        outlier_options = outlier_options or {}
+        opts = {band: {**OUTLIER_DEFAULTS[band], **outlier_options.get(band, {})}
+                for band in OUTLIER_DEFAULTS}
+        ndvi, n_ndvi = screen_outliers(ndvi, inside_mask, "NDVI", **opts["ndvi"])
+        lst_day, n_day = screen_outliers(lst_day, inside_mask, "day LST", **opts["lst"])
+        lst_night, n_night = screen_outliers(lst_night, inside_mask, "night LST", **opts["lst"])
+        outliers_rejected = {"ndvi": n_ndvi, "lst_day": n_day, "lst_night": n_night}
 
 
     # 4. Gap-fill NDVI & LST *inside wards*
@@ -229,48 +286,83 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
     lst_day_max = float(np.max(lst_day_filled[inside_mask]))
     lst_night_min = float(np.min(lst_night_filled[inside_mask]))
     lst_night_max = float(np.max(lst_night_filled[inside_mask]))
-    lc_max = common_lc(lc[inside_mask])
 
+    # Getis-Ord Gi* hot-spot z-scores (in-ward pixels only)
+    lst_day_gi = getis_ord_gi_star(lst_day_filled, map_mask, radius=gi_radius)
+    lst_night_gi = getis_ord_gi_star(lst_night_filled, map_mask, radius=gi_radius)
 
-    # 5. Ward-level stats
-    def ward_stats(values, ward_ids, ward_id):
-        mask = (ward_ids == ward_id)
-        pix_vals = values[mask]
-        pix_vals = pix_vals[np.isfinite(pix_vals)]
-
-        if pix_vals.size == 0:
-            return {
-                "pixel_count": 0,
-                "min": None,
-                "q1": None,
-                "median": None,
-                "q3": None,
-                "max": None,
-                "mean": None,
-                "std": None,
-            }
-
-        q1, med, q3 = np.percentile(pix_vals, [25, 50, 75])
-        return {
-            "pixel_count": int(pix_vals.size),
-            "min": float(np.min(pix_vals)),
-            "q1": float(q1),
-            "median": float(med),
-            "q3": float(q3),
-            "max": float(np.max(pix_vals)),
-            "mean": float(np.mean(pix_vals)),
-            "std": float(np.std(pix_vals)),
+    # Percentile rank of every in-ward pixel within the city (one argsort per band)
+    rank_inputs = {"ndvi": ndvi_filled, "lst_day_C": lst_day_filled, "lst_night_C": lst_night_filled}
+    pct_ranks = {
+        RANK_LAYERS[key]: percentile_ranks(vals, map_mask) for key, vals in rank_inputs.items()
+    }
+
+    # Surface urban heat island: LST minus the mean of a rural ring around the
+    # wards, found with a distance transform on the full (uncropped) raster
+    rural_day = rural_night = None
+    suhi_reference = None
+    if suhi_ring_km is not None:
+        r0, r1, c0, c1 = window
+        urban_mask = np.zeros(full_shape, dtype=bool)
+        urban_mask[r0:r1, c0:c1] = map_mask
+
+        ring = rural_ring_mask(
+            urban_mask, full_lc, pixel_size_km(full_bbox, full_shape),
+            ring_km=suhi_ring_km, exclude_lc=suhi_exclude_lc,
+        )
+        # unfilled LST: gap filling only runs inside the wards
+        rural_day, n_day = rural_reference(full_lst_day, ring)
+        rural_night, n_night = rural_reference(full_lst_night, ring)
+        print(f"SUHI rural ring: {int(ring.sum())} pixels "
+              f"(day {rural_day} C from {n_day}, night {rural_night} C from {n_night})")
+
+        suhi_reference = {
+            "ring_km": [float(k) for k in suhi_ring_km],
+            "exclude_lc": [int(k) for k in suhi_exclude_lc],
+            "ring_pixels": int(ring.sum()),
+            "rural_lst_day_C": rural_day,
+            "rural_lst_night_C": rural_night,
+            "rural_day_pixels": n_day,
+            "rural_night_pixels": n_night,
         }
 
 
+    # 5. Ward-level stats
+    def suhi(ward_mean, rural_mean):
+        if ward_mean is None or rural_mean is None:
+            return None
+        return ward_mean - rural_mean
+
+
+    # ward -> pixel runs, so each ward below costs O(ward pixels)
+    run_index = ward_run_index(ward_ids)
+
+    # fixed-edge histograms: one bincount per band over (ward, bin) indices
+    hist_inputs = {"ndvi": ndvi_filled, "lst_day": lst_day_filled, "lst_night": lst_night_filled}
+    ward_hists = {
+        band: ward_histograms(vals, ward_ids, run_index["ids"], HIST_EDGES[band])
+        for band, vals in hist_inputs.items()
+    }
+    histograms = {
+        "edges": {band: edges.tolist() for band, edges in HIST_EDGES.items()},
+        "city": {band: counts.sum(axis=0).tolist() for band, counts in ward_hists.items()},
+        "joint": {
+            f"ndvi_{band}": joint_histogram(ndvi_filled, hist_inputs[band],
+                                            HIST_EDGES["ndvi"], HIST_EDGES[band], inside_mask).tolist()
+            for band in ("lst_day", "lst_night")
+        },
+    }
+
     wards_output = []
-    unique_wards = sorted(int(i) for i in np.unique(ward_ids) if i > 0)
+    unique_wards = [int(i) for i in run_index["ids"]]
 
-    for wid in unique_wards:
+    for k, wid in enumerate(unique_wards):
         name = ward_names.get(wid, f"Ward {wid}")
 
-        mask = (ward_ids == wid)
-        rows, cols = np.where(mask)
+        pix = ward_pixel_indices(run_index, wid, W)
+        rows, cols = np.divmod(pix, W)
+        # the same pixels on the north-up map layers (Gi*, ranks)
+        map_pix = (H - 1 - rows) * W + cols
 
         def rc_to_lonlat(r, c):
             lon = MIN_LON + (c + 0.5) * (MAX_LON - MIN_LON) / W
@@ -284,15 +376,18 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
         lon_max, lat_max = rc_to_lonlat(min_r, max_c)  # top-right
         lon_cent, lat_cent = rc_to_lonlat(rows.mean(), cols.mean())
 
-        ndvi_stats = ward_stats(ndvi_filled, ward_ids, wid)
-        day_stats = ward_stats(lst_day_filled, ward_ids, wid)
-        night_stats = ward_stats(lst_night_filled, ward_ids, wid)
+        ndvi_stats = ward_stats(ndvi_filled.reshape(-1)[pix])
+        day_stats = ward_stats(lst_day_filled.reshape(-1)[pix])
+        night_stats = ward_stats(lst_night_filled.reshape(-1)[pix])
 
-        lc_mask = (ward_ids == wid)
-        lc_pix_vals = lc[lc_mask]
-        ward_lc = 0
-        if lc_pix_vals.size != 0:
-            ward_lc = common_lc(lc_pix_vals)
+        ward_lc = lc_mode(lc.reshape(-1)[pix]) or 0
+
+        ward_ranks = {
+            f"{key}_mean": float(np.mean(pct.reshape(-1)[map_pix])) for key, pct in pct_ranks.items()
+        }
+
+        hot_day = lst_day_gi.reshape(-1)[map_pix]
+        hot_night = lst_night_gi.reshape(-1)[map_pix]
 
         wards_output.append({
             "id": wid,
@@ -327,21 +422,42 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
             "lst_night_max": night_stats["max"],
             "lst_night_mean": night_stats["mean"],
             "lst_night_std": night_stats["std"],
+
+            **ward_ranks,
+
+            "suhi_day_C": suhi(day_stats["mean"], rural_day),
+            "suhi_night_C": suhi(night_stats["mean"], rural_night),
+
+            **{f"{band}_hist": counts[k].tolist() for band, counts in ward_hists.items()},
+
+            "lst_day_hotspot_frac": float(np.mean(hot_day >= gi_z)),
+            "lst_day_coldspot_frac": float(np.mean(hot_day <= -gi_z)),
+            "lst_night_hotspot_frac": float(np.mean(hot_night >= gi_z)),
+            "lst_night_coldspot_frac": float(np.mean(hot_night <= -gi_z)),
         })
 
 
+    # 6. Spatial autocorrelation of ward means (adjacency from ward_ids)
+    spatial_autocorrelation = add_ward_autocorrelation(wards_output, ward_ids)
+
+
     grid_out = {
         "city": city,
         "crs": "EPSG:102400",
         "width": int(W),
         "height": int(H),
         "bbox": [MIN_LON, MIN_LAT, MAX_LON, MAX_LAT],
-
-        "ward_ids": ward_ids.reshape(-1).astype(int).tolist(),
-        "ndvi": ndvi_grid.reshape(-1).astype(float).tolist(),
-        "lst_day_C": lst_day_grid.reshape(-1).astype(float).tolist(),
-        "lst_night_C": lst_night_grid.reshape(-1).astype(float).tolist(),
-        "lc": lc.reshape(-1).astype(int).tolist(),
+        "lc_sensor": lc_sensor,
+
+        "ward_ids": ward_ids.reshape(-1).astype(int),
+        "ndvi": ndvi_grid.reshape(-1).astype(float),
+        "lst_day_C": lst_day_grid.reshape(-1).astype(float),
+        "lst_night_C": lst_night_grid.reshape(-1).astype(float),
+        "lc": lc.reshape(-1).astype(int),
+        "lst_day_gi": lst_day_gi.reshape(-1).astype(float),
+        "lst_night_gi": lst_night_gi.reshape(-1).astype(float),
+        **{key: quantize_ranks(pct).reshape(-1) for key, pct in pct_ranks.items()},
+        "ward_runs": run_index_to_json(run_index),
 
         "ndvi_min": ndvi_min,
         "ndvi_max": ndvi_max,
@@ -349,25 +465,69 @@ def preprocess(city, NDVI_TIF, LST_TIF, LC_TIF, mult_json, BOUND_PATH, GRID_OUT,
         "lst_day_max": lst_day_max,
         "lst_night_min": lst_night_min,
         "lst_night_max": lst_night_max,
-        "lc_min": 0,
-        "lc_max": 17
+        "lc_min": int(lc_min),
+        "lc_max": int(lc_max),
+        "gi_radius": int(gi_radius),
+        "rank_scale": RANK_SCALE,
     }
 
-    with open(GRID_OUT, "w", encoding="utf-8") as f:
-        json.dump(grid_out, f)
+    # per-pixel SUHI intensity (only when a rural reference was found)
+    for key, filled, rural in (("suhi_day", lst_day_filled, rural_day),
+                               ("suhi_night", lst_night_filled, rural_night)):
+        if rural is None:
+            continue
+        layer = filled - rural
+        grid_out[f"{key}_C"] = layer.reshape(-1).astype(float)
+        grid_out[f"{key}_min"] = float(np.min(layer[inside_mask]))
+        grid_out[f"{key}_max"] = float(np.max(layer[inside_mask]))
+
+    if SAT_OUT:
+        save_sat_sidecar(SAT_OUT, {
+            key: summed_area_tables(grid_out[key].reshape(H, W), map_mask)
+            for key in SAT_LAYERS if key in grid_out
+        })
+        print("Wrote", SAT_OUT)
+
+    if TILES_OUT:
+        render_grid_tiles(
+            grid_out,
+            {key: np.asarray(grid_out[key]).reshape(H, W) for key in grid_layer_keys(grid_out)},
+            TILES_OUT,
+        )
+
+    if CONTOURS_OUT:
+        export_contours(
+            CONTOURS_OUT, city,
+            {"ndvi": ndvi_filled, "lst_day_C": lst_day_filled, "lst_night_C": lst_night_filled},
+            map_mask,
+            [MIN_LON, MIN_LAT, MAX_LON, MAX_LAT],
+            CONTOUR_LEVELS if contour_levels is None else contour_levels,
+        )
+
+    if sparse:
+        encode_sparse_grid(grid_out, map_mask)
+
+    # arrays are streamed to disk in chunks, never as Python lists
+    write_json_stream(GRID_OUT, grid_out)
     print("Wrote", GRID_OUT)
 
     wards_out = {
         "city": city,
         "crs": "EPSG:102400",
         "num_wards": len(wards_output),
+        "spatial_autocorrelation": spatial_autocorrelation,
+        "suhi_reference": suhi_reference,
+        "histograms": histograms,
+        "outliers_rejected": outliers_rejected,
         "wards": wards_output,
     }
 
-    with open(WARDS_OUT, "w", encoding="utf-8") as f:
-        json.dump(wards_out, f)
+    write_json_stream(WARDS_OUT, wards_out)
     print("Wrote", WARDS_OUT)
 
+    if TOPO_OUT:
+        export_topology(TOPO_OUT, geoms, ward_names, (MAX_LON - MIN_LON) / W)
+
 """
 TOKYO_NDVI = "data/tokyo/tokyo_NDVI.tif"
 TOKYO_LST  = "data/tokyo/tokyo_LST.tif"
@@ -375,8 +535,10 @@ TOKYO_LC = "data/tokyo/tokyo_LC.tif"
 TOKYO_WARDS_DIR = "data/tokyo_wards"
 TOKYO_GRID_OUT = "data/tokyo/tokyo_grid.json"
 TOKYO_WARDS_OUT = "data/tokyo/tokyo_wards.json"
+TOKYO_TOPO_OUT = "data/tokyo/tokyo_topo.json"
+TOKYO_SAT_OUT = "data/tokyo/tokyo_sat.npz"
 TOKYO_LAT_LONG = [139.3, 35.4, 140.2, 36.2]
-preprocess("Tokyo", TOKYO_NDVI, TOKYO_LST, TOKYO_LC, True, TOKYO_WARDS_DIR, TOKYO_GRID_OUT, TOKYO_WARDS_OUT, TOKYO_LAT_LONG)
+preprocess("Tokyo", TOKYO_NDVI, TOKYO_LST, TOKYO_LC, True, TOKYO_WARDS_DIR, TOKYO_GRID_OUT, TOKYO_WARDS_OUT, TOKYO_LAT_LONG, TOPO_OUT=TOKYO_TOPO_OUT, SAT_OUT=TOKYO_SAT_OUT)
 """
 
 """
@@ -386,8 +548,10 @@ LONDON_LC = "data/london/london_LC_2020.tif"
 LONDON_WARDS_DIR = "data/london/boundaries/london32.json"
 LONDON_GRID_OUT = "data/london/london_grid.json"
 LONDON_WARDS_OUT = "data/london/london_boroughs.json"
+LONDON_TOPO_OUT = "data/london/london_topo.json"
+LONDON_SAT_OUT = "data/london/london_sat.npz"
 LONDON_LAT_LONG = [-0.5, 51.3, 0.3, 51.7]
-preprocess("London", LONDON_NDVI, LONDON_LST, LONDON_LC, False, LONDON_WARDS_DIR, LONDON_GRID_OUT, LONDON_WARDS_OUT, LONDON_LAT_LONG)
+preprocess("London", LONDON_NDVI, LONDON_LST, LONDON_LC, False, LONDON_WARDS_DIR, LONDON_GRID_OUT, LONDON_WARDS_OUT, LONDON_LAT_LONG, TOPO_OUT=LONDON_TOPO_OUT, SAT_OUT=LONDON_SAT_OUT)
 """
 
 """
@@ -397,16 +561,24 @@ NYC_LC = "data/nyc/nyc_LC.tif"
 NYC_WARDS_DIR = "data/nyc/boundaries/nyc.json"
 NYC_GRID_OUT = "data/nyc/nyc_grid.json"
 NYC_WARDS_OUT = "data/nyc/nyc_boroughs.json"
+NYC_TOPO_OUT = "data/nyc/nyc_topo.json"
+NYC_SAT_OUT = "data/nyc/nyc_sat.npz"
 NYC_LAT_LONG = [-74.27, 40.49, -73.68, 40.92]
-preprocess("New York City", NYC_NDVI, NYC_LST, NYC_LC, False, NYC_WARDS_DIR, NYC_GRID_OUT, NYC_WARDS_OUT, NYC_LAT_LONG, "BoroName")
+preprocess("New York City", NYC_NDVI, NYC_LST, NYC_LC, False, NYC_WARDS_DIR, NYC_GRID_OUT, NYC_WARDS_OUT, NYC_LAT_LONG, "BoroName", TOPO_OUT=NYC_TOPO_OUT, SAT_OUT=NYC_SAT_OUT)
 """
 
 
-SD_NDVI = "data/san-diego/sandiego_NDVI.tif"
-SD_LST  = "data/san-diego/sandiego_LST.tif"
-SD_LC = "data/san-diego/sandiego_LC.tif"
-SD_WARDS_DIR = "data/san-diego/boundaries/san-diego.geojson"
-SD_GRID_OUT = "data/san-diego/sandiego_grid.json"
-SD_WARDS_OUT = "data/san-diego/sandiego_boroughs.json"
-SD_LAT_LONG = [-117.6, 32.53, -116.08, 33.49]
-preprocess("San Diego", SD_NDVI, SD_LST, SD_LC, False, SD_WARDS_DIR, SD_GRID_OUT, SD_WARDS_OUT, SD_LAT_LONG, "name")
+if __name__ == "__main__":
+    SD_NDVI = "data/san-diego/sandiego_NDVI.tif"
+    SD_LST  = "data/san-diego/sandiego_LST.tif"
+    SD_LC = "data/san-diego/sandiego_LC.tif"
+    SD_WARDS_DIR = "data/san-diego/boundaries/san-diego.geojson"
+    SD_GRID_OUT = "data/san-diego/sandiego_grid.json"
+    SD_WARDS_OUT = "data/san-diego/sandiego_boroughs.json"
+    SD_TOPO_OUT = "data/san-diego/sandiego_topo.json"
+    SD_SAT_OUT = "data/san-diego/sandiego_sat.npz"
+    SD_LAT_LONG = [-117.6, 32.53, -116.08, 33.49]
+    preprocess("San Diego", SD_NDVI, SD_LST, SD_LC, False, SD_WARDS_DIR, SD_GRID_OUT, SD_WARDS_OUT, SD_LAT_LONG, "name", TOPO_OUT=SD_TOPO_OUT, SAT_OUT=SD_SAT_OUT)
+
+    # refresh the merged ward stats read by the inter-city views
+    write_summary()
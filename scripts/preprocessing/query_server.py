@@ -0,0 +1,403 @@
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from city_config import CITY_CONFIGS
+from grid_index import ward_pixel_indices, ward_run_index
+from grid_io import load_grid
+from summed_area import load_sat_sidecar, sat_sidecar_path, window_stats
+from zonal import zonal_stats
+
+# Per-city layers are converted once to .npy files here and memory-mapped
+QUERY_CACHE_DIR = "data/.cache/query"
+QUERY_CACHE_VERSION = 1
+
+QUERY_HOST = "127.0.0.1"
+QUERY_PORT = 8765
+HISTOGRAM_BINS = 20
+
+# ---------------------------------------------------------
+# 1. Per-city .npy cache (built once per grid file version)
+# ---------------------------------------------------------
+
+def _source_stamp(grid_path):
+    st = os.stat(grid_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "version": QUERY_CACHE_VERSION}
+
+
+def _save_npy(path, arr):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def build_city_cache(grid_path, cache_dir):
+    """
+    Decode a *_grid.json (dense or sparse) into one .npy file per layer
+    plus the ward run index. meta.json is written last and records the
+    source file's size / mtime, so a changed grid triggers a rebuild.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    g, layers = load_grid(grid_path)
+
+    for key, arr in layers.items():
+        if np.issubdtype(arr.dtype, np.integer):
+            arr = arr.astype(np.int32)
+        else:
+            arr = arr.astype(np.float64)
+        _save_npy(os.path.join(cache_dir, f"{key}.npy"), arr)
+
+    index = ward_run_index(layers["ward_ids"])
+    for key, arr in index.items():
+        _save_npy(os.path.join(cache_dir, f"runs_{key}.npy"), arr)
+
+    meta = {
+        "source": _source_stamp(grid_path),
+        "city": g.get("city"),
+        "width": int(g["width"]),
+        "height": int(g["height"]),
+        "bbox": [float(v) for v in g["bbox"]],
+        "layers": sorted(layers),
+    }
+    with open(os.path.join(cache_dir, "meta.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(cache_dir, "meta.json.tmp"), os.path.join(cache_dir, "meta.json"))
+    return meta
+
+
+def open_city_cache(grid_path, cache_dir):
+    """
+    Memory-map a city's cached layers, (re)building the cache if it is
+    missing or older than the grid file.
+    Returns: (meta, layers dict of read-only (H, W) arrays, run index)
+    """
+    meta_path = os.path.join(cache_dir, "meta.json")
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("source") != _source_stamp(grid_path):
+            meta = None
+    if meta is None:
+        print(f"Building query cache for {grid_path}")
+        meta = build_city_cache(grid_path, cache_dir)
+
+    layers = {
+        key: np.load(os.path.join(cache_dir, f"{key}.npy"), mmap_mode="r")
+        for key in meta["layers"]
+    }
+    index = {
+        key: np.load(os.path.join(cache_dir, f"runs_{key}.npy"))
+        for key in ("ids", "offsets", "runs")
+    }
+    return meta, layers, index
+
+# ---------------------------------------------------------
+# 2. Query engine (no HTTP, usable / testable on its own)
+# ---------------------------------------------------------
+
+def summarize(values):
+    """Count / mean / std / min / median / max of the finite values."""
+    vals = np.asarray(values, dtype=float)
+    vals = vals[np.isfinite(vals)]
+    if vals.size == 0:
+        return {"count": 0, "mean": None, "std": None, "min": None, "median": None, "max": None}
+    return {
+        "count": int(vals.size),
+        "mean": float(np.mean(vals)),
+        "std": float(np.std(vals)),
+        "min": float(np.min(vals)),
+        "median": float(np.median(vals)),
+        "max": float(np.max(vals)),
+    }
+
+
+class QueryEngine:
+    """
+    Answers point / bbox / ward / zonal / histogram queries against every
+    city's grid. Each city is loaded (memory-mapped) on first use and kept
+    warm; a per-city lock means building one city's cache never blocks
+    queries on the others.
+
+    Data layers are stored north-up (like the GeoTIFFs) while ward_ids rows
+    run south -> north (as rasterized in preprocess()); geographic queries
+    flip ward_ids rows, ward queries use the run index so their pixels match
+    the per-ward stats in the *_wards.json files.
+
+    If preprocess() wrote a summed-area sidecar (*_sat.npz) next to the
+    grid, in-ward bbox queries on its layers are answered in O(1).
+    """
+
+    def __init__(self, cities=None, cache_dir=QUERY_CACHE_DIR):
+        self.cities = cities if cities is not None else CITY_CONFIGS
+        self.cache_dir = cache_dir
+        self._loaded = {}
+        self._sat = {}
+        self._locks = {cid: threading.Lock() for cid in self.cities}
+
+    def city(self, cid):
+        if cid not in self.cities:
+            raise LookupError(f"Unknown city {cid!r}")
+        loaded = self._loaded.get(cid)
+        if loaded is not None:
+            return loaded
+        with self._locks[cid]:
+            if cid not in self._loaded:
+                grid_path = str(self.cities[cid]["grid_path"])
+                loaded = open_city_cache(grid_path, os.path.join(self.cache_dir, cid))
+                # _sat first: a city is only visible in _loaded once complete
+                self._sat[cid] = self._load_sat(grid_path, loaded[0])
+                self._loaded[cid] = loaded
+            return self._loaded[cid]
+
+    def _load_sat(self, grid_path, meta):
+        """Summed-area tables of a city, or {} if missing or not matching the grid."""
+        sat = load_sat_sidecar(sat_sidecar_path(grid_path))
+        shape = (meta["height"] + 1, meta["width"] + 1)
+        if not sat or any(t["count"].shape != shape for t in sat.values()):
+            return {}
+        return sat
+
+    def warm(self):
+        """Load every city whose grid file exists."""
+        for cid, cfg in self.cities.items():
+            if os.path.exists(cfg["grid_path"]):
+                self.city(cid)
+            else:
+                print(f"[WARN] Grid file not found for {cid}: {cfg['grid_path']}")
+
+    def _layer(self, cid, layer):
+        meta, layers, _ = self.city(cid)
+        if layer not in layers:
+            raise ValueError(f"Unknown layer {layer!r} for {cid}, expected one of {meta['layers']}")
+        return layers[layer]
+
+    def _rc(self, meta, lon, lat):
+        """North-up (row, col) of a lon/lat, or None outside the grid."""
+        min_lon, min_lat, max_lon, max_lat = meta["bbox"]
+        H, W = meta["height"], meta["width"]
+        c = int(np.floor((lon - min_lon) / (max_lon - min_lon) * W))
+        r = int(np.floor((max_lat - lat) / (max_lat - min_lat) * H))
+        if not (0 <= r < H and 0 <= c < W):
+            return None
+        return r, c
+
+    def _window(self, meta, bbox):
+        """North-up (r0, r1, c0, c1) of the pixels whose centres fall in bbox."""
+        min_lon, min_lat, max_lon, max_lat = meta["bbox"]
+        H, W = meta["height"], meta["width"]
+        dx = (max_lon - min_lon) / W
+        dy = (max_lat - min_lat) / H
+        c0 = int(np.ceil((bbox[0] - min_lon) / dx - 0.5))
+        c1 = int(np.floor((bbox[2] - min_lon) / dx - 0.5)) + 1
+        r0 = int(np.ceil((max_lat - bbox[3]) / dy - 0.5))
+        r1 = int(np.floor((max_lat - bbox[1]) / dy - 0.5)) + 1
+        return max(r0, 0), min(r1, H), max(c0, 0), min(c1, W)
+
+    def _region_values(self, cid, layer, bbox=None, ward=None, inside=True):
+        """Flat values of one layer over a bbox, a ward or the whole city."""
+        meta, layers, index = self.city(cid)
+        arr = self._layer(cid, layer)
+        H = meta["height"]
+
+        if ward is not None:
+            pix = ward_pixel_indices(index, int(ward), meta["width"])
+            return arr.reshape(-1)[pix]
+
+        r0, r1, c0, c1 = (0, H, 0, meta["width"]) if bbox is None else self._window(meta, bbox)
+        if r0 >= r1 or c0 >= c1:
+            return np.zeros(0)
+        vals = arr[r0:r1, c0:c1]
+        if inside:
+            # ward_ids rows are flipped relative to the data layers
+            wid = layers["ward_ids"][H - r1:H - r0, c0:c1][::-1]
+            vals = vals[wid > 0]
+        return np.asarray(vals).reshape(-1)
+
+    def point(self, cid, lon, lat, layers=None):
+        meta, arrays, _ = self.city(cid)
+        rc = self._rc(meta, lon, lat)
+        if rc is None:
+            return {"city": cid, "lon": lon, "lat": lat, "inside_grid": False}
+
+        r, c = rc
+        keys = layers or [k for k in meta["layers"] if k != "ward_ids"]
+        values = {}
+        for key in keys:
+            v = self._layer(cid, key)[r, c]
+            values[key] = None if not np.isfinite(v) else v.item()
+        ward = int(arrays["ward_ids"][meta["height"] - 1 - r, c])
+        return {
+            "city": cid, "lon": lon, "lat": lat, "inside_grid": True,
+            "row": r, "col": c, "ward_id": ward, "values": values,
+        }
+
+    def bbox(self, cid, bbox, layer, inside=True, full=False):
+        """
+        Stats of one layer over a bbox. Uses the summed-area tables (count /
+        mean / std only) when available, unless full=True asks for the
+        min / median / max of a pixel scan.
+        """
+        meta, _, _ = self.city(cid)
+        out = {"city": cid, "bbox": list(bbox), "layer": layer, "inside_only": inside}
+
+        tables = self._sat[cid].get(layer)
+        if inside and not full and tables is not None:
+            st = window_stats(tables, self._window(meta, bbox))
+            std = None if st["var"] is None else float(np.sqrt(st["var"]))
+            return {**out, "method": "summed_area", "count": st["count"],
+                    "mean": st["mean"], "std": std}
+
+        vals = self._region_values(cid, layer, bbox=bbox, inside=inside)
+        return {**out, "method": "scan", **summarize(vals)}
+
+    def ward(self, cid, ward_id, layers=None):
+        meta, _, index = self.city(cid)
+        if int(ward_id) not in set(index["ids"].tolist()):
+            raise ValueError(f"Unknown ward {ward_id} for {cid}")
+        keys = layers or [k for k in meta["layers"] if k not in ("ward_ids", "lc")]
+        stats = {key: summarize(self._region_values(cid, key, ward=ward_id)) for key in keys}
+        return {"city": cid, "ward_id": int(ward_id), "stats": stats}
+
+    def zonal(self, cid, polygons, layers=None):
+        """zonal.zonal_stats() for any polygons on a city's cached grid."""
+        meta, arrays, _ = self.city(cid)
+        return {"city": cid, "zones": zonal_stats(arrays, meta["bbox"], polygons, layers)}
+
+    def histogram(self, cid, layer, bins=HISTOGRAM_BINS, value_range=None,
+                  bbox=None, ward=None, inside=True):
+        vals = self._region_values(cid, layer, bbox=bbox, ward=ward, inside=inside)
+        vals = np.asarray(vals, dtype=float)
+        vals = vals[np.isfinite(vals)]
+        if value_range is None:
+            value_range = (float(vals.min()), float(vals.max())) if vals.size else (0.0, 1.0)
+        counts, edges = np.histogram(vals, bins=int(bins), range=value_range)
+        return {"city": cid, "layer": layer, "count": int(vals.size),
+                "edges": edges.tolist(), "counts": counts.tolist()}
+
+    # -----------------------------------------------------
+    # Dispatch from a URL path + query string dict
+    # -----------------------------------------------------
+
+    def handle(self, path, params, body=None):
+        """
+        Run one query; params maps names to strings (first value of each
+        query-string field) and body is the parsed JSON of a POST request
+        (the polygons of /zonal). Returns the JSON-ready result, with timing.
+        """
+        t0 = time.perf_counter()
+
+        def floats(key, n):
+            vals = [float(v) for v in params[key].split(",")]
+            if len(vals) != n:
+                raise ValueError(f"{key} needs {n} comma-separated numbers")
+            return vals
+
+        def names(key):
+            return params[key].split(",") if params.get(key) else None
+
+        inside = params.get("inside", "1") not in ("0", "false")
+
+        if path == "/cities":
+            result = {"cities": {cid: cfg["label"] for cid, cfg in self.cities.items()}}
+        elif path == "/point":
+            result = self.point(params["city"], float(params["lon"]), float(params["lat"]),
+                                layers=names("layers"))
+        elif path == "/bbox":
+            result = self.bbox(params["city"], floats("bbox", 4), params["layer"], inside=inside,
+                               full=params.get("full", "0") not in ("0", "false"))
+        elif path == "/ward":
+            result = self.ward(params["city"], int(params["id"]), layers=names("layers"))
+        elif path == "/zonal":
+            if body is None:
+                raise ValueError("/zonal needs a POST body of GeoJSON polygons")
+            result = self.zonal(params["city"], body, layers=names("layers"))
+        elif path == "/histogram":
+            result = self.histogram(
+                params["city"], params["layer"],
+                bins=int(params.get("bins", HISTOGRAM_BINS)),
+                value_range=floats("range", 2) if params.get("range") else None,
+                bbox=floats("bbox", 4) if params.get("bbox") else None,
+                ward=int(params["ward"]) if params.get("ward") else None,
+                inside=inside,
+            )
+        else:
+            raise LookupError(f"Unknown endpoint {path}")
+
+        result["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+        return result
+
+# ---------------------------------------------------------
+# 3. HTTP server (stdlib, one thread per request)
+# ---------------------------------------------------------
+
+def make_handler(engine):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self._respond()
+
+        def do_POST(self):
+            self._respond(post=True)
+
+        def _respond(self, post=False):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                payload = None
+                if post:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length) or b"null")
+                status, body = 200, engine.handle(url.path, params, payload)
+            except KeyError as e:
+                status, body = 400, {"error": f"Missing parameter {e}"}
+            except LookupError as e:   # unknown endpoint / city
+                status, body = 404, {"error": str(e)}
+            except ValueError as e:    # includes malformed JSON bodies
+                status, body = 400, {"error": str(e)}
+            except Exception as e:     # anything else still answers in JSON
+                traceback.print_exc()
+                status, body = 500, {"error": f"Internal error: {type(e).__name__}: {e}"}
+
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if "elapsed_ms" in body:
+                self.send_header("Server-Timing", f"query;dur={body['elapsed_ms']:.3f}")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            print(f"{self.address_string()} {fmt % args}")
+
+    return QueryHandler
+
+
+def serve(host=QUERY_HOST, port=QUERY_PORT, engine=None):
+    engine = engine or QueryEngine()
+    engine.warm()
+    server = ThreadingHTTPServer((host, port), make_handler(engine))
+    print(f"Serving queries on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local zonal query server for the city grids")
+    parser.add_argument("--host", default=QUERY_HOST)
+    parser.add_argument("--port", type=int, default=QUERY_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Percentile ranks are stored as integers in [0, RANK_SCALE] (uint16)
+RANK_SCALE = 65535
+
+# grid layer -> rank layer written by preprocess()
+RANK_LAYERS = {
+    "ndvi": "ndvi_rank",
+    "lst_day_C": "lst_day_rank",
+    "lst_night_C": "lst_night_rank",
+}
+
+# ---------------------------------------------------------
+# Per-pixel percentile ranks within a city
+# ---------------------------------------------------------
+
+def percentile_ranks(values, mask):
+    """
+    Percentile rank in (0, 1) of every finite pixel inside mask, from one
+    argsort. Ties share their mid-rank; rank k of n maps to (k + 0.5) / n.
+    Pixels outside the mask (or not finite) get NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    mask = np.asarray(mask, dtype=bool) & np.isfinite(values)
+    vals = values[mask]
+    n = vals.size
+
+    out = np.full(values.shape, np.nan)
+    if n == 0:
+        return out
+
+    order = np.argsort(vals, kind="stable")
+    sorted_vals = vals[order]
+
+    # tie groups in sorted order, each ranked at the middle of its span
+    is_new = np.ones(n, dtype=bool)
+    is_new[1:] = sorted_vals[1:] != sorted_vals[:-1]
+    starts = np.flatnonzero(is_new)
+    ends = np.append(starts[1:], n)
+    mid = (starts + ends - 1) / 2
+
+    pct = np.empty(n)
+    pct[order] = (np.repeat(mid, ends - starts) + 0.5) / n
+    out[mask] = pct
+    return out
+
+
+def quantize_ranks(pct, scale=RANK_SCALE):
+    """
+    Ranks in [0, 1] -> uint16 in [1, scale]; NaN (outside wards) -> 0.
+    In-ward values are clamped to at least 1, so the lowest rank of a city
+    with more than 2 * scale pixels is not read back as outside.
+    """
+    pct = np.asarray(pct, dtype=float)
+    q = np.round(np.nan_to_num(pct, nan=0.0) * scale)
+    inside = np.isfinite(pct)
+    q[inside] = np.clip(q[inside], 1, scale)
+    return q.astype(np.uint16)
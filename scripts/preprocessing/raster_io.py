@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import shapely
+import tifffile
+
+# ---------------------------------------------------------
+# 1. Georeferencing from GeoTIFF tags
+# ---------------------------------------------------------
+
+def geotiff_bbox(path):
+    """
+    Read [min lon, min lat, max lon, max lat] and (H, W) from a GeoTIFF's
+    ModelPixelScale / ModelTiepoint tags (north-up rasters, tiepoint at the
+    top-left pixel corner).
+
+    Returns (bbox, (H, W)), or (None, (H, W)) if the tags are missing.
+    """
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        shape = (int(page.imagelength), int(page.imagewidth))
+        scale = page.tags.get("ModelPixelScaleTag")
+        tie = page.tags.get("ModelTiepointTag")
+
+        if scale is None or tie is None:
+            return None, shape
+
+        sx, sy = scale.value[0], scale.value[1]
+        i, j, _, x, y, _ = tie.value[:6]
+
+    min_lon = x - i * sx
+    max_lat = y + j * sy
+    max_lon = min_lon + shape[1] * sx
+    min_lat = max_lat - shape[0] * sy
+    return [float(min_lon), float(min_lat), float(max_lon), float(max_lat)], shape
+
+# ---------------------------------------------------------
+# 2. Concurrent input loading
+# ---------------------------------------------------------
+
+def load_inputs(tif_paths, boundary_task, max_workers=None):
+    """
+    Decode every GeoTIFF and run the boundary loading / preparation task
+    concurrently in one thread pool. TIFF decompression (zlib, LZW, ...)
+    releases the GIL, so wall time is roughly the slowest single input
+    rather than the sum, which matters most on network filesystems.
+
+    tif_paths: dict name -> GeoTIFF path
+    boundary_task: zero-argument callable, e.g. loads and prepares the wards
+
+    Returns: (dict name -> array, result of boundary_task)
+    """
+    workers = max_workers or len(tif_paths) + 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        boundary_future = pool.submit(boundary_task)
+        raster_futures = {
+            name: pool.submit(tifffile.imread, path)
+            for name, path in tif_paths.items()
+        }
+        rasters = {name: f.result() for name, f in raster_futures.items()}
+        return rasters, boundary_future.result()
+
+# ---------------------------------------------------------
+# 3. Area of interest: crop every band to the wards
+# ---------------------------------------------------------
+
+def ward_union_bounds(geoms):
+    """[min lon, min lat, max lon, max lat] of the union of all geometries."""
+    return [float(v) for v in shapely.total_bounds(np.asarray(geoms, dtype=object))]
+
+
+def aoi_window(bbox, shape, bounds, margin=2):
+    """
+    Pixel window covering `bounds` plus `margin` pixels on every side,
+    clipped to the raster.
+
+    bbox: raster [min lon, min lat, max lon, max lat]
+    shape: raster (H, W), rows run north -> south
+    bounds: area of interest in the same form as bbox
+
+    Returns:
+        window: (r0, r1, c0, c1) slice bounds in north-up row order
+        window_bbox: bbox of the window, snapped to pixel edges
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    H, W = shape
+    dx = (max_lon - min_lon) / W
+    dy = (max_lat - min_lat) / H
+
+    c0 = int(np.floor((bounds[0] - min_lon) / dx)) - margin
+    c1 = int(np.ceil((bounds[2] - min_lon) / dx)) + margin
+    r0 = int(np.floor((max_lat - bounds[3]) / dy)) - margin
+    r1 = int(np.ceil((max_lat - bounds[1]) / dy)) + margin
+
+    r0, r1 = max(r0, 0), min(r1, H)
+    c0, c1 = max(c0, 0), min(c1, W)
+
+    window_bbox = [
+        min_lon + c0 * dx,
+        max_lat - r1 * dy,
+        min_lon + c1 * dx,
+        max_lat - r0 * dy,
+    ]
+    return (r0, r1, c0, c1), window_bbox
+
+
+def crop(arr, window):
+    """Crop a 2D (H, W) band to a pixel window from aoi_window()."""
+    r0, r1, c0, c1 = window
+    return arr[r0:r1, c0:c1]
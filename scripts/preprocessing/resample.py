@@ -0,0 +1,195 @@
+import numpy as np
+
+# "auto" picks block aggregation when the target pixels are larger than the
+# source pixels and interpolation otherwise
+CONTINUOUS_METHODS = {"down": "mean", "up": "bilinear"}
+CATEGORICAL_METHODS = {"down": "mode", "up": "nearest"}
+
+# ---------------------------------------------------------
+# 1. Target grid
+# ---------------------------------------------------------
+
+def target_grid(bbox, shape, preview_scale=1):
+    """
+    (bbox, (H, W)) of the grid every band is aligned to. preview_scale > 1
+    keeps the extent but makes pixels preview_scale times larger.
+    """
+    H, W = shape
+    if preview_scale != 1:
+        H = max(1, int(round(H / preview_scale)))
+        W = max(1, int(round(W / preview_scale)))
+    return [float(v) for v in bbox], (int(H), int(W))
+
+
+def same_grid(src_bbox, src_shape, dst_bbox, dst_shape):
+    return tuple(src_shape) == tuple(dst_shape) and np.allclose(src_bbox, dst_bbox, rtol=0, atol=1e-9)
+
+
+def _pixel_size(bbox, shape):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    H, W = shape
+    return (max_lat - min_lat) / H, (max_lon - min_lon) / W
+
+
+def _auto_method(src_bbox, src_shape, dst_bbox, dst_shape, categorical):
+    sdy, sdx = _pixel_size(src_bbox, src_shape)
+    ddy, ddx = _pixel_size(dst_bbox, dst_shape)
+    direction = "down" if ddy * ddx >= sdy * sdx else "up"
+    return (CATEGORICAL_METHODS if categorical else CONTINUOUS_METHODS)[direction]
+
+# ---------------------------------------------------------
+# 2. Methods (rows run north -> south, like the GeoTIFFs)
+# ---------------------------------------------------------
+
+def _source_cells(src_bbox, src_shape, dst_bbox, dst_shape):
+    """Flat target cell of every source pixel centre (-1 if outside the target)."""
+    s_min_lon, s_min_lat, s_max_lon, s_max_lat = src_bbox
+    d_min_lon, d_min_lat, d_max_lon, d_max_lat = dst_bbox
+    sH, sW = src_shape
+    dH, dW = dst_shape
+    sdy, sdx = _pixel_size(src_bbox, src_shape)
+    ddy, ddx = _pixel_size(dst_bbox, dst_shape)
+
+    lat = s_max_lat - (np.arange(sH) + 0.5) * sdy
+    lon = s_min_lon + (np.arange(sW) + 0.5) * sdx
+    r = np.floor((d_max_lat - lat) / ddy).astype(np.int64)
+    c = np.floor((lon - d_min_lon) / ddx).astype(np.int64)
+    r[(r < 0) | (r >= dH)] = -1
+    c[(c < 0) | (c >= dW)] = -1
+
+    cells = r[:, None] * dW + c[None, :]
+    cells[(r[:, None] < 0) | (c[None, :] < 0)] = -1
+    return cells.reshape(-1)
+
+
+def block_mean(arr, src_bbox, dst_bbox, dst_shape):
+    """Mean of the finite source pixels whose centres fall in each target pixel."""
+    cells = _source_cells(src_bbox, arr.shape, dst_bbox, dst_shape)
+    vals = np.asarray(arr, dtype=float).reshape(-1)
+    keep = (cells >= 0) & np.isfinite(vals)
+
+    n = dst_shape[0] * dst_shape[1]
+    sums = np.bincount(cells[keep], weights=vals[keep], minlength=n)
+    counts = np.bincount(cells[keep], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = sums / counts
+    return out.reshape(dst_shape).astype("float32")
+
+
+def block_mode(arr, src_bbox, dst_bbox, dst_shape, fill=0):
+    """Most common class among the source pixels in each target pixel (ties -> lowest class)."""
+    cells = _source_cells(src_bbox, arr.shape, dst_bbox, dst_shape)
+    flat = np.asarray(arr).reshape(-1)
+    keep = cells >= 0
+
+    classes, codes = np.unique(flat[keep], return_inverse=True)
+    n = dst_shape[0] * dst_shape[1]
+    k = len(classes)
+    out = np.full(n, fill, dtype=np.asarray(arr).dtype)
+    if k == 0:
+        return out.reshape(dst_shape)
+
+    counts = np.bincount(cells[keep] * k + codes, minlength=n * k).reshape(n, k)
+    has = counts.sum(axis=1) > 0
+    out[has] = classes[counts[has].argmax(axis=1)]
+    return out.reshape(dst_shape)
+
+
+def _target_in_source(src_bbox, src_shape, dst_bbox, dst_shape):
+    """Target pixel centres in fractional source (row, col) pixel-centre coordinates."""
+    s_min_lon, s_min_lat, s_max_lon, s_max_lat = src_bbox
+    d_min_lon, d_min_lat, d_max_lon, d_max_lat = dst_bbox
+    sdy, sdx = _pixel_size(src_bbox, src_shape)
+    ddy, ddx = _pixel_size(dst_bbox, dst_shape)
+
+    lat = d_max_lat - (np.arange(dst_shape[0]) + 0.5) * ddy
+    lon = d_min_lon + (np.arange(dst_shape[1]) + 0.5) * ddx
+    return (s_max_lat - lat) / sdy - 0.5, (lon - s_min_lon) / sdx - 0.5
+
+
+def nearest(arr, src_bbox, dst_bbox, dst_shape, fill=np.nan):
+    """Source pixel containing each target pixel centre."""
+    arr = np.asarray(arr)
+    fr, fc = _target_in_source(src_bbox, arr.shape, dst_bbox, dst_shape)
+    r = np.floor(fr + 0.5).astype(np.int64)
+    c = np.floor(fc + 0.5).astype(np.int64)
+    r_ok = (r >= 0) & (r < arr.shape[0])
+    c_ok = (c >= 0) & (c < arr.shape[1])
+
+    out = arr[np.clip(r, 0, arr.shape[0] - 1)[:, None], np.clip(c, 0, arr.shape[1] - 1)[None, :]]
+    outside = ~(r_ok[:, None] & c_ok[None, :])
+    if outside.any():
+        out = out.astype(np.result_type(out.dtype, type(fill)))
+        out[outside] = fill
+    return out
+
+
+def bilinear(arr, src_bbox, dst_bbox, dst_shape):
+    """
+    Bilinear interpolation between source pixel centres (edges clamped).
+    NaN neighbours are dropped and the remaining weights renormalized.
+    """
+    arr = np.asarray(arr, dtype=float)
+    sH, sW = arr.shape
+    fr, fc = _target_in_source(src_bbox, arr.shape, dst_bbox, dst_shape)
+    outside_r = (fr < -0.5) | (fr > sH - 0.5)
+    outside_c = (fc < -0.5) | (fc > sW - 0.5)
+    fr = np.clip(fr, 0, sH - 1)
+    fc = np.clip(fc, 0, sW - 1)
+
+    r0 = np.minimum(np.floor(fr).astype(np.int64), max(sH - 2, 0))
+    c0 = np.minimum(np.floor(fc).astype(np.int64), max(sW - 2, 0))
+    r1 = np.minimum(r0 + 1, sH - 1)
+    c1 = np.minimum(c0 + 1, sW - 1)
+    wr = (fr - r0)[:, None]
+    wc = (fc - c0)[None, :]
+
+    total = np.zeros(dst_shape)
+    weight = np.zeros(dst_shape)
+    for rr, cc, w in (
+        (r0, c0, (1 - wr) * (1 - wc)),
+        (r0, c1, (1 - wr) * wc),
+        (r1, c0, wr * (1 - wc)),
+        (r1, c1, wr * wc),
+    ):
+        v = arr[rr[:, None], cc[None, :]]
+        ok = np.isfinite(v)
+        total += np.where(ok, v, 0.0) * w
+        weight += np.where(ok, w, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = total / weight
+    out[outside_r[:, None] | outside_c[None, :]] = np.nan
+    return out.astype("float32")
+
+
+RESAMPLERS = {
+    "mean": block_mean,
+    "mode": block_mode,
+    "nearest": nearest,
+    "bilinear": bilinear,
+}
+
+# ---------------------------------------------------------
+# 3. Align one band
+# ---------------------------------------------------------
+
+def align_band(arr, src_bbox, dst_bbox, dst_shape, method="auto", categorical=False):
+    """
+    Bring a 2D band from its own georeferencing onto the target grid.
+    Bands already on the target grid are returned unchanged.
+    """
+    arr = np.asarray(arr)
+    if same_grid(src_bbox, arr.shape, dst_bbox, dst_shape):
+        return arr
+
+    if method == "auto":
+        method = _auto_method(src_bbox, arr.shape, dst_bbox, dst_shape, categorical)
+    if method not in RESAMPLERS:
+        raise ValueError(f"Unknown resampling method {method!r}, expected one of {list(RESAMPLERS)}")
+    if categorical and method in ("mean", "bilinear"):
+        raise ValueError(f"Resampling method {method!r} does not apply to categorical bands")
+
+    if categorical and method == "nearest":
+        return nearest(arr, src_bbox, dst_bbox, dst_shape, fill=0)
+    return RESAMPLERS[method](arr, src_bbox, dst_bbox, dst_shape)
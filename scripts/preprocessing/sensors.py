@@ -0,0 +1,240 @@
+import numpy as np
+
+# ---------------------------------------------------------
+# 1. Class tables
+# ---------------------------------------------------------
+
+# MODIS MCD12Q1 LC_Type1 (IGBP)
+IGBP_CLASSES = {
+    0: "No Data",
+    1: "Evergreen Needleleaf Forests",
+    2: "Evergreen Broadleaf Forests",
+    3: "Deciduous Needleleaf Forests",
+    4: "Deciduous Broadleaf Forests",
+    5: "Mixed Forests",
+    6: "Closed Shrublands",
+    7: "Open Shrublands",
+    8: "Woody Savannas",
+    9: "Savannas",
+    10: "Grasslands",
+    11: "Permanent Wetlands",
+    12: "Croplands",
+    13: "Urban and Built-up Lands",
+    14: "Cropland/Natural Vegetation Mosaics",
+    15: "Permanent Snow and Ice",
+    16: "Barren",
+    17: "Water Bodies",
+}
+
+# ESA WorldCover (10 m)
+WORLDCOVER_CLASSES = {
+    0: "No Data",
+    10: "Tree cover",
+    20: "Shrubland",
+    30: "Grassland",
+    40: "Cropland",
+    50: "Built-up",
+    60: "Bare / sparse vegetation",
+    70: "Snow and ice",
+    80: "Permanent water bodies",
+    90: "Herbaceous wetland",
+    95: "Mangroves",
+    100: "Moss and lichen",
+}
+
+# Land-cover groups shared by every categorical sensor, in legend order; each
+# sensor maps its own class codes onto them ("groups" in SENSORS)
+LC_GROUPS = ["no_data", "forest", "shrub_grass", "wetland", "cropland", "urban", "water", "snow_barren"]
+
+# ---------------------------------------------------------
+# 2. Sensor registry
+# ---------------------------------------------------------
+
+# Every decoder declares:
+#   kind        - "continuous" or "categorical"
+#   layout      - "single": one band (H, W) or (1, H, W)
+#                 "day_night": 2 bands -> "day", "night"
+#                 "red_nir": 2 reflectance bands -> NDVI as "value"
+#   scale, offset - calibrated = raw * scale + offset
+#   nodata_values / nodata_le / nodata_ge - raw values treated as missing
+#   classes     - class table (categorical), rural_exclude - classes never
+#                 used as the SUHI rural reference, groups - LC_GROUPS name ->
+#                 class codes
+SENSORS = {
+    # MOD13 NDVI (250 m / 500 m / 1 km)
+    "modis_ndvi": {
+        "kind": "continuous",
+        "layout": "single",
+        "scale": 0.0001,
+        "offset": 0.0,
+        "nodata_values": [0],
+        "nodata_le": -2000,
+    },
+    # MOD11A2 LST_Day_1km / LST_Night_1km, Kelvin -> °C
+    "modis_lst": {
+        "kind": "continuous",
+        "layout": "day_night",
+        "scale": 0.02,
+        "offset": -273.15,
+        "nodata_le": 0,
+    },
+    # MCD12Q1 LC_Type1
+    "modis_lc": {
+        "kind": "categorical",
+        "layout": "single",
+        "classes": IGBP_CLASSES,
+        "rural_exclude": [0, 13, 15, 17],
+        "groups": {
+            "no_data": [0],
+            "forest": [1, 2, 3, 4, 5],
+            "shrub_grass": [6, 7, 8, 9, 10],
+            "wetland": [11],
+            "cropland": [12, 14],
+            "urban": [13],
+            "water": [17],
+            "snow_barren": [15, 16],
+        },
+    },
+    # Landsat 8/9 Collection 2 Level-2 surface reflectance (SR_B4, SR_B5)
+    "landsat_c2_ndvi": {
+        "kind": "continuous",
+        "layout": "red_nir",
+        "scale": 0.0000275,
+        "offset": -0.2,
+        "nodata_values": [0],
+    },
+    # Sentinel-2 L2A (B04, B08), processing baseline >= 04.00
+    "sentinel2_ndvi": {
+        "kind": "continuous",
+        "layout": "red_nir",
+        "scale": 0.0001,
+        "offset": -0.1,
+        "nodata_values": [0],
+    },
+    # ESA WorldCover
+    "esa_worldcover": {
+        "kind": "categorical",
+        "layout": "single",
+        "classes": WORLDCOVER_CLASSES,
+        "rural_exclude": [0, 50, 70, 80],
+        "groups": {
+            "no_data": [0],
+            "forest": [10, 95],
+            "shrub_grass": [20, 30, 100],
+            "wetland": [90],
+            "cropland": [40],
+            "urban": [50],
+            "water": [80],
+            "snow_barren": [60, 70],
+        },
+    },
+}
+
+
+def register_sensor(name, spec):
+    """Add (or replace) a decoder; see SENSORS for the fields."""
+    if spec.get("layout") not in BAND_NAMES:
+        raise ValueError(f"Unknown band layout {spec.get('layout')!r}, expected one of {list(BAND_NAMES)}")
+    SENSORS[name] = spec
+
+
+def get_sensor(name):
+    if name not in SENSORS:
+        raise ValueError(f"Unknown sensor {name!r}, expected one of {sorted(SENSORS)}")
+    return SENSORS[name]
+
+# ---------------------------------------------------------
+# 3. Decoding
+# ---------------------------------------------------------
+
+BAND_NAMES = {
+    "single": ["value"],
+    "day_night": ["day", "night"],
+    "red_nir": ["red", "nir"],
+}
+
+
+def split_bands(raw, n, label="raster"):
+    """(H, W), (1, H, W), (H, W, n) or (n, H, W) -> list of n (H, W) arrays."""
+    raw = np.asarray(raw)
+    if n == 1:
+        if raw.ndim == 3 and raw.shape[0] == 1:
+            return [raw[0]]
+        if raw.ndim == 2:
+            return [raw]
+    elif raw.ndim == 3 and raw.shape[2] == n:
+        # (H, W, bands)
+        return [raw[:, :, i] for i in range(n)]
+    elif raw.ndim == 3 and raw.shape[0] == n:
+        # (bands, H, W)
+        return [raw[i] for i in range(n)]
+
+    raise ValueError(f"Expected {label} GeoTIFF with {n} band(s) got shape {raw.shape}")
+
+
+def nodata_mask(raw, spec):
+    """Raw values the decoder treats as missing."""
+    mask = ~np.isfinite(raw) if np.issubdtype(raw.dtype, np.floating) else np.zeros(raw.shape, dtype=bool)
+    if spec.get("nodata_values"):
+        mask |= np.isin(raw, spec["nodata_values"])
+    if spec.get("nodata_le") is not None:
+        mask |= raw <= spec["nodata_le"]
+    if spec.get("nodata_ge") is not None:
+        mask |= raw >= spec["nodata_ge"]
+    return mask
+
+
+def calibrate(raw, spec):
+    """float32 raw * scale + offset with nodata set to NaN, computed in place."""
+    out = np.asarray(raw).astype("float32")
+    missing = nodata_mask(out, spec)
+    if spec.get("scale", 1.0) != 1.0:
+        np.multiply(out, spec["scale"], out=out)
+    if spec.get("offset", 0.0):
+        np.add(out, spec["offset"], out=out)
+    out[missing] = np.nan
+    return out
+
+
+def decode(sensor, raw, label=None):
+    """
+    Raw raster -> dict of calibrated bands.
+        single     -> {"value": float32 (or the raw classes if categorical)}
+        day_night  -> {"day": float32, "night": float32}
+        red_nir    -> {"value": NDVI from the two calibrated reflectances}
+    """
+    spec = get_sensor(sensor)
+    names = BAND_NAMES[spec["layout"]]
+    bands = split_bands(raw, len(names), label or sensor)
+
+    if spec["kind"] == "categorical":
+        return {"value": bands[0]}
+
+    decoded = {name: calibrate(band, spec) for name, band in zip(names, bands)}
+    if spec["layout"] == "red_nir":
+        red, nir = decoded["red"], decoded["nir"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ndvi = (nir - red) / (nir + red)
+        ndvi[~np.isfinite(ndvi)] = np.nan
+        return {"value": ndvi}
+    return decoded
+
+
+def class_range(sensor):
+    """(min, max) class code of a categorical sensor."""
+    classes = get_sensor(sensor)["classes"]
+    return min(classes), max(classes)
+
+
+def group_classes(sensor, group):
+    """Class codes of one LC_GROUPS group for a categorical sensor."""
+    return get_sensor(sensor).get("groups", {}).get(group, [])
+
+
+def class_groups(sensor, classes):
+    """Index into LC_GROUPS of every class code, -1 where the sensor has no group."""
+    classes = np.asarray(classes)
+    out = np.full(classes.shape, -1, dtype=np.int8)
+    for i, group in enumerate(LC_GROUPS):
+        out[np.isin(classes, group_classes(sensor, group))] = i
+    return out
@@ -0,0 +1,218 @@
+import numpy as np
+
+# ---------------------------------------------------------
+# 1. Ward adjacency straight from the label raster
+# ---------------------------------------------------------
+
+def ward_adjacency(ward_ids):
+    """
+    Rook-contiguity adjacency between wards, read off the ward_ids raster.
+
+    Every horizontally / vertically adjacent pixel pair whose labels differ
+    (and are both > 0) is one shared edge. All pairs are found in a single
+    vectorized pass, so no geometry intersection is needed.
+
+    Returns a CSR-style sparse matrix as a dict:
+        ids     - sorted ward ids (row / column order)
+        indptr  - row pointers, len(ids) + 1
+        indices - column positions into ids
+        weights - number of shared pixel edges between the two wards
+    """
+    ward_ids = np.asarray(ward_ids)
+    a = np.concatenate([ward_ids[:, :-1].ravel(), ward_ids[:-1, :].ravel()])
+    b = np.concatenate([ward_ids[:, 1:].ravel(), ward_ids[1:, :].ravel()])
+    keep = (a != b) & (a > 0) & (b > 0)
+
+    ids = np.unique(ward_ids[ward_ids > 0])
+    n = len(ids)
+    ia = np.searchsorted(ids, a[keep])
+    ib = np.searchsorted(ids, b[keep])
+
+    # symmetric: every transition counts for both wards
+    keys = np.concatenate([ia * n + ib, ib * n + ia])
+    pairs, counts = np.unique(keys, return_counts=True)
+    rows, cols = pairs // n, pairs % n
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+
+    return {
+        "ids": ids,
+        "indptr": indptr,
+        "indices": cols,
+        "weights": counts.astype(float),
+    }
+
+
+def _csr_rows(adj):
+    """Row position of every stored entry of a CSR adjacency."""
+    return np.repeat(np.arange(len(adj["ids"])), np.diff(adj["indptr"]))
+
+
+def row_standardize(adj):
+    """Copy of adj with each non-empty row's weights summing to 1."""
+    rows = _csr_rows(adj)
+    row_sums = np.bincount(rows, weights=adj["weights"], minlength=len(adj["ids"]))
+    out = dict(adj)
+    out["weights"] = adj["weights"] / row_sums[rows]
+    return out
+
+# ---------------------------------------------------------
+# 2. Moran's I (global + local)
+# ---------------------------------------------------------
+
+def morans_i(values, adj):
+    """
+    Global and local Moran's I for one value per ward.
+
+    values: 1D array aligned with adj["ids"]
+    adj: row-standardized adjacency from row_standardize(ward_adjacency(...))
+
+    Wards without neighbours (e.g. islands) get a zero spatial lag.
+    Inference for the global statistic uses the normality assumption.
+
+    Returns:
+        global_stats: dict with I, expected, variance, z
+        local_i: 1D array of local Moran's I_i
+        lag: 1D array of spatially lagged deviations (W z)
+    """
+    x = np.asarray(values, dtype=float)
+    n = len(x)
+    z = x - x.mean()
+    m2 = float(np.sum(z * z)) / n
+
+    rows = _csr_rows(adj)
+    cols = adj["indices"]
+    w = adj["weights"]
+    lag = np.bincount(rows, weights=w * z[cols], minlength=n)
+
+    s0 = float(w.sum())
+    if n < 3 or s0 == 0 or m2 == 0:
+        nan_stats = {"I": None, "expected": None, "variance": None, "z": None}
+        return nan_stats, np.zeros(n), lag
+
+    I = (n / s0) * float(np.sum(z * lag)) / (n * m2)
+    expected = -1.0 / (n - 1)
+
+    # S1 needs w_ij + w_ji; the structure is symmetric, so look up the
+    # transposed entry by sorting on (col, row)
+    key = rows * n + cols
+    key_t = cols * n + rows
+    order = np.argsort(key)
+    w_t = w[order][np.searchsorted(key[order], key_t)]
+    s1 = 0.5 * float(np.sum((w + w_t) ** 2))
+    row_sum = np.bincount(rows, weights=w, minlength=n)
+    col_sum = np.bincount(cols, weights=w, minlength=n)
+    s2 = float(np.sum((row_sum + col_sum) ** 2))
+
+    variance = (n * n * s1 - n * s2 + 3 * s0 * s0) / ((n * n - 1) * s0 * s0) - expected ** 2
+    z_score = (I - expected) / np.sqrt(variance) if variance > 0 else None
+
+    local_i = z / m2 * lag
+    global_stats = {
+        "I": float(I),
+        "expected": float(expected),
+        "variance": float(variance),
+        "z": None if z_score is None else float(z_score),
+    }
+    return global_stats, local_i, lag
+
+
+def lisa_quadrant(values, lag):
+    """HH / LL / HL / LH label per ward from deviation sign and lag sign."""
+    z = np.asarray(values, dtype=float)
+    z = z - z.mean()
+    hi = z >= 0
+    lag_hi = lag >= 0
+    return np.where(hi, np.where(lag_hi, "HH", "HL"), np.where(lag_hi, "LH", "LL"))
+
+
+def add_ward_autocorrelation(wards_output, ward_ids, keys=("ndvi", "lst_day", "lst_night")):
+    """
+    Attach neighbours and local Moran's I to each ward dict (in place)
+    and return the global summary for the wards JSON.
+
+    wards_output: list of ward dicts as built in preprocess(), with
+                  "<key>_mean" entries
+    """
+    adj = ward_adjacency(ward_ids)
+    adj_std = row_standardize(adj)
+    ids = adj["ids"]
+    by_id = {w["id"]: w for w in wards_output}
+
+    for pos, wid in enumerate(ids):
+        nbrs = adj["indices"][adj["indptr"][pos]:adj["indptr"][pos + 1]]
+        by_id[int(wid)]["neighbors"] = [int(ids[j]) for j in nbrs]
+
+    summary = {
+        "weights": "row-standardized rook contiguity from ward_ids",
+        "adjacency": {
+            "ids": ids.astype(int).tolist(),
+            "indptr": adj["indptr"].astype(int).tolist(),
+            "indices": adj["indices"].astype(int).tolist(),
+            "shared_edges": adj["weights"].astype(int).tolist(),
+        },
+    }
+
+    for key in keys:
+        vals = np.array([by_id[int(wid)][f"{key}_mean"] for wid in ids], dtype=float)
+        global_stats, local_i, lag = morans_i(vals, adj_std)
+        quadrants = lisa_quadrant(vals, lag)
+        summary[key] = global_stats
+
+        for pos, wid in enumerate(ids):
+            ward = by_id[int(wid)]
+            ward[f"{key}_local_moran"] = float(local_i[pos])
+            ward[f"{key}_lisa"] = str(quadrants[pos])
+
+    return summary
+
+# ---------------------------------------------------------
+# 3. Getis-Ord Gi* hot spots (pixel level)
+# ---------------------------------------------------------
+
+def box_sum(arr, radius):
+    """
+    Sum of arr over a (2r+1)x(2r+1) window around every pixel, using a
+    zero-padded integral image. Cost is O(pixels) for any radius.
+    """
+    arr = np.asarray(arr, dtype=float)
+    h, w = arr.shape
+    k = 2 * radius + 1
+
+    sat = np.zeros((h + k, w + k))
+    sat[1:, 1:] = np.pad(arr, radius).cumsum(0).cumsum(1)
+    return sat[k:, k:] - sat[:-k, k:] - sat[k:, :-k] + sat[:-k, :-k]
+
+
+def getis_ord_gi_star(values, inside_mask, radius=2):
+    """
+    Gi* z-score for every in-ward pixel with binary box weights.
+
+    Only pixels inside inside_mask enter the windows and the global mean /
+    standard deviation, so the score near ward edges uses fewer neighbours
+    rather than out-of-ward values. Pixels outside the mask get 0.
+
+    values: 2D array (gap-filled, finite inside the mask)
+    inside_mask: 2D bool array
+    radius: window half-width in pixels
+    """
+    mask = np.asarray(inside_mask, dtype=bool)
+    x = np.where(mask, values, 0.0).astype(float)
+
+    n = int(mask.sum())
+    if n < 2:
+        return np.zeros_like(x)
+
+    x_bar = x.sum() / n
+    s = np.sqrt((x * x).sum() / n - x_bar ** 2)
+
+    w_sum = box_sum(mask.astype(float), radius)   # sum w_ij == sum w_ij^2
+    wx_sum = box_sum(x, radius)
+
+    denom = s * np.sqrt(np.maximum(n * w_sum - w_sum ** 2, 0.0) / (n - 1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gi = (wx_sum - x_bar * w_sum) / denom
+
+    gi[~mask | ~np.isfinite(gi)] = 0.0
+    return gi
@@ -0,0 +1,141 @@
+import numpy as np
+
+# Rural reference ring (km from the ward union) and IGBP classes that never
+# count as rural: 0 unclassified, 13 urban / built-up, 15 snow / ice, 17 water
+SUHI_RING_KM = (2.0, 10.0)
+RURAL_EXCLUDE_LC = (0, 13, 15, 17)
+RURAL_MIN_PIXELS = 10
+
+KM_PER_DEG_LAT = 111.32
+
+# ---------------------------------------------------------
+# 1. Euclidean distance transform (exact, O(pixels))
+# ---------------------------------------------------------
+
+def pixel_size_km(bbox, shape):
+    """(row, col) pixel size in km at the bbox's centre latitude."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    H, W = shape
+    lat_mid = np.radians((min_lat + max_lat) / 2)
+    dy = (max_lat - min_lat) / H * KM_PER_DEG_LAT
+    dx = (max_lon - min_lon) / W * KM_PER_DEG_LAT * np.cos(lat_mid)
+    return float(dy), float(dx)
+
+
+def _column_distance(mask):
+    """Distance (in rows) from each pixel to the nearest True pixel in its column."""
+    H, W = mask.shape
+    d = np.full((H, W), np.inf)
+
+    # forward then backward scan, vectorized across columns
+    run = np.full(W, np.inf)
+    for r in range(H):
+        run = np.where(mask[r], 0.0, run + 1)
+        d[r] = run
+    run = np.full(W, np.inf)
+    for r in range(H - 1, -1, -1):
+        run = np.where(mask[r], 0.0, run + 1)
+        d[r] = np.minimum(d[r], run)
+    return d
+
+
+def _lower_envelope(f, x):
+    """
+    Row-wise 1D squared distance transform (Felzenszwalb & Huttenlocher):
+    min over p of (x[q] - x[p])^2 + f[r, p] for every row r, via the lower
+    envelope of parabolas. The envelopes of all rows are built in lockstep,
+    so the Python loop runs over columns only and every step is a numpy
+    operation across rows.
+    """
+    H, n = f.shape
+    out = np.full((H, n), np.inf)
+    g = f + x ** 2
+
+    # per row: v[r, :k+1] envelope sites, z[r, j] left boundary of site v[r, j]
+    v = np.zeros((H, n), dtype=np.intp)
+    z = np.full((H, n + 1), np.inf)
+    k = np.full(H, -1)
+    s = np.zeros(H)
+
+    for q in range(n):
+        active = np.isfinite(f[:, q])
+
+        # pop sites hidden by the new parabola (never the first one: z = -inf)
+        pending = np.flatnonzero(active & (k >= 0))
+        while pending.size:
+            top = k[pending]
+            p = v[pending, top]
+            s[pending] = (g[pending, q] - g[pending, p]) / (2 * (x[q] - x[p]))
+            hidden = s[pending] <= z[pending, top]
+            k[pending[hidden]] -= 1
+            pending = pending[hidden]
+
+        first = np.flatnonzero(active & (k < 0))
+        v[first, 0] = q
+        z[first, 0] = -np.inf
+        z[first, 1] = np.inf
+        k[first] = 0
+
+        rest = np.flatnonzero(active)
+        rest = rest[~np.isin(rest, first)]
+        k[rest] += 1
+        v[rest, k[rest]] = q
+        z[rest, k[rest]] = s[rest]
+        z[rest, k[rest] + 1] = np.inf
+
+    rows = np.flatnonzero(k >= 0)
+    j = np.zeros(rows.size, dtype=np.intp)
+    for q in range(n):
+        while True:
+            step = z[rows, j + 1] < x[q]
+            if not step.any():
+                break
+            j += step
+        p = v[rows, j]
+        out[rows, q] = (x[q] - x[p]) ** 2 + f[rows, p]
+    return out
+
+
+def distance_to_mask(mask, pixel_km=(1.0, 1.0)):
+    """
+    Exact Euclidean distance (km) from every pixel centre to the nearest
+    True pixel of `mask`, with separate row / column pixel sizes.
+    Two separable passes: column distances, then the row lower envelopes.
+    Both loop in Python over one axis only (rows, then columns) with numpy
+    work across the other, so a full uncropped raster of a few thousand
+    pixels a side takes a few seconds.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    dy, dx = pixel_km
+    f = (_column_distance(mask) * dy) ** 2
+    x = np.arange(mask.shape[1]) * dx
+    return np.sqrt(_lower_envelope(f, x))
+
+# ---------------------------------------------------------
+# 2. Rural reference and SUHI intensity
+# ---------------------------------------------------------
+
+def rural_ring_mask(urban_mask, lc, pixel_km, ring_km=SUHI_RING_KM,
+                    exclude_lc=RURAL_EXCLUDE_LC):
+    """
+    Pixels outside `urban_mask` whose distance to it lies in
+    (ring_km[0], ring_km[1]] and whose land cover is not excluded.
+    """
+    inner, outer = ring_km
+    dist = distance_to_mask(urban_mask, pixel_km)
+    ring = ~urban_mask & (dist > inner) & (dist <= outer)
+    if lc is not None:
+        ring &= ~np.isin(lc, exclude_lc)
+    return ring
+
+
+def rural_reference(lst, ring, min_pixels=RURAL_MIN_PIXELS):
+    """
+    Mean of the valid (unfilled) LST values in the rural ring.
+    Returns (mean or None if fewer than min_pixels, pixel count).
+    """
+    vals = lst[ring]
+    vals = vals[np.isfinite(vals)]
+    if vals.size < min_pixels:
+        return None, int(vals.size)
+    return float(np.mean(vals)), int(vals.size)
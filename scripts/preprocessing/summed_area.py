@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+
+# Layers of the grid that get summed-area tables
+SAT_LAYERS = ["ndvi", "lst_day_C", "lst_night_C", "suhi_day_C", "suhi_night_C"]
+
+# ---------------------------------------------------------
+# 1. Summed-area tables
+# ---------------------------------------------------------
+
+def summed_area_tables(values, mask):
+    """
+    Integral images of one layer over a mask: sum and sum of squares
+    (float64) and the count of valid pixels (int64), each zero-padded to
+    (H + 1, W + 1) so table[r, c] covers values[:r, :c].
+    Pixels outside the mask or not finite are left out.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.asarray(mask, dtype=bool) & np.isfinite(values)
+    v = np.where(valid, values, 0.0)
+    H, W = values.shape
+
+    tables = {
+        "sum": np.zeros((H + 1, W + 1), dtype=np.float64),
+        "sumsq": np.zeros((H + 1, W + 1), dtype=np.float64),
+        "count": np.zeros((H + 1, W + 1), dtype=np.int64),
+    }
+    tables["sum"][1:, 1:] = v.cumsum(0).cumsum(1)
+    tables["sumsq"][1:, 1:] = (v * v).cumsum(0).cumsum(1)
+    tables["count"][1:, 1:] = valid.cumsum(0, dtype=np.int64).cumsum(1)
+    return tables
+
+
+def _rect(table, r0, r1, c0, c1):
+    return table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+
+
+def window_stats(tables, window):
+    """
+    Count, mean and (population) variance of a pixel window
+    (r0, r1, c0, c1) in O(1), from summed_area_tables().
+    """
+    H, W = tables["count"].shape[0] - 1, tables["count"].shape[1] - 1
+    r0, r1, c0, c1 = window
+    r0, r1 = max(r0, 0), min(r1, H)
+    c0, c1 = max(c0, 0), min(c1, W)
+    if r0 >= r1 or c0 >= c1:
+        return {"count": 0, "mean": None, "var": None}
+
+    n = int(_rect(tables["count"], r0, r1, c0, c1))
+    if n == 0:
+        return {"count": 0, "mean": None, "var": None}
+
+    mean = float(_rect(tables["sum"], r0, r1, c0, c1)) / n
+    var = float(_rect(tables["sumsq"], r0, r1, c0, c1)) / n - mean * mean
+    return {"count": n, "mean": mean, "var": max(var, 0.0)}
+
+# ---------------------------------------------------------
+# 2. Binary sidecar (.npz next to the grid)
+# ---------------------------------------------------------
+
+def sat_sidecar_path(grid_path):
+    """data/<city>/<city>_grid.json -> data/<city>/<city>_sat.npz"""
+    grid_path = str(grid_path)
+    base = grid_path[:-len("_grid.json")] if grid_path.endswith("_grid.json") else os.path.splitext(grid_path)[0]
+    return base + "_sat.npz"
+
+
+def save_sat_sidecar(path, layer_tables):
+    """Store {layer: tables} as <layer>__sum / __sumsq / __count arrays."""
+    arrays = {
+        f"{layer}__{kind}": table
+        for layer, tables in layer_tables.items()
+        for kind, table in tables.items()
+    }
+    arrays["layers"] = np.array(list(layer_tables), dtype=str)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_sat_sidecar(path):
+    """Inverse of save_sat_sidecar, or None if the file is missing."""
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as z:
+        return {
+            str(layer): {kind: z[f"{layer}__{kind}"] for kind in ("sum", "sumsq", "count")}
+            for layer in z["layers"]
+        }
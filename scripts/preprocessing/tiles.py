@@ -0,0 +1,256 @@
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from city_config import CITY_CONFIGS
+from grid_io import LEGACY_LC_SENSOR, grid_lc_sensor, load_grid
+from sensors import group_classes
+
+# Pixels per tile side; tiles are written as <out_dir>/<layer>/<row>_<col>.png
+TILE_SIZE = 256
+
+# ---------------------------------------------------------
+# 1. Colour ramps (same as the map: d3-scale-chromatic)
+# ---------------------------------------------------------
+
+# d3.schemeYlGn[9], sampled by d3.interpolateYlGn as a uniform RGB B-spline
+YLGN_HEX = "ffffe5f7fcb9d9f0a3addd8e78c67941ab5d238443006837004529"
+
+# d3.interpolateInferno / d3.interpolateMagma: 256 colours each
+INFERNO_HEX = (
+    "00000401000501010601010802010a02020c02020e030210040312040314050417060419"
+    "07051b08051d09061f0a07220b07240c08260d08290e092b10092d110a30120a32140b34"
+    "150b37160b39180c3c190c3e1b0c411c0c431e0c451f0c48210c4a230c4c240c4f260c51"
+    "280b53290b552b0b572d0b592f0a5b310a5c320a5e340a5f3609613809623909633b0964"
+    "3d09653e0966400a67420a68440a68450a69470b6a490b6a4a0c6b4c0c6b4d0d6c4f0d6c"
+    "510e6c520e6d540f6d550f6d57106e59106e5a116e5c126e5d126e5f136e61136e62146e"
+    "64156e65156e67166e69166e6a176e6c186e6d186e6f196e71196e721a6e741a6e751b6e"
+    "771c6d781c6d7a1d6d7c1d6d7d1e6d7f1e6c801f6c82206c84206b85216b87216b88226a"
+    "8a226a8c23698d23698f24699025689225689326679526679727669827669a28659b2964"
+    "9d29649f2a63a02a63a22b62a32c61a52c60a62d60a82e5fa92e5eab2f5ead305dae305c"
+    "b0315bb1325ab3325ab43359b63458b73557b93556ba3655bc3754bd3853bf3952c03a51"
+    "c13a50c33b4fc43c4ec63d4dc73e4cc83f4bca404acb4149cc4248ce4347cf4446d04545"
+    "d24644d34743d44842d54a41d74b3fd84c3ed94d3dda4e3cdb503bdd513ade5238df5337"
+    "e05536e15635e25734e35933e45a31e55c30e65d2fe75e2ee8602de9612bea632aeb6429"
+    "eb6628ec6726ed6925ee6a24ef6c23ef6e21f06f20f1711ff1731df2741cf3761bf37819"
+    "f47918f57b17f57d15f67e14f68013f78212f78410f8850ff8870ef8890cf98b0bf98c0a"
+    "f98e09fa9008fa9207fa9407fb9606fb9706fb9906fb9b06fb9d07fc9f07fca108fca309"
+    "fca50afca60cfca80dfcaa0ffcac11fcae12fcb014fcb216fcb418fbb61afbb81dfbba1f"
+    "fbbc21fbbe23fac026fac228fac42afac62df9c72ff9c932f9cb35f8cd37f8cf3af7d13d"
+    "f7d340f6d543f6d746f5d949f5db4cf4dd4ff4df53f4e156f3e35af3e55df2e661f2e865"
+    "f2ea69f1ec6df1ed71f1ef75f1f179f2f27df2f482f3f586f3f68af4f88ef5f992f6fa96"
+    "f8fb9af9fc9dfafda1fcffa4"
+)
+MAGMA_HEX = (
+    "00000401000501010601010802010902020b02020d03030f030312040414050416060518"
+    "06051a07061c08071e0907200a08220b09240c09260d0a290e0b2b100b2d110c2f120d31"
+    "130d34140e36150e38160f3b180f3d19103f1a10421c10441d11471e114920114b21114e"
+    "22115024125325125527125829115a2a115c2c115f2d11612f1163311165331067341069"
+    "36106b38106c390f6e3b0f703d0f713f0f72400f74420f75440f76451077471078491078"
+    "4a10794c117a4e117b4f127b51127c52137c54137d56147d57157e59157e5a167e5c167f"
+    "5d177f5f187f601880621980641a80651a80671b80681c816a1c816b1d816d1d816e1e81"
+    "701f81721f817320817521817621817822817922827b23827c23827e2482802582812581"
+    "8326818426818627818827818928818b29818c29818e2a81902a81912b81932b80942c80"
+    "962c80982d80992d809b2e7f9c2e7f9e2f7fa02f7fa1307ea3307ea5317ea6317da8327d"
+    "aa337dab337cad347cae347bb0357bb2357bb3367ab5367ab73779b83779ba3878bc3978"
+    "bd3977bf3a77c03a76c23b75c43c75c53c74c73d73c83e73ca3e72cc3f71cd4071cf4070"
+    "d0416fd2426fd3436ed5446dd6456cd8456cd9466bdb476adc4869de4968df4a68e04c67"
+    "e24d66e34e65e44f64e55064e75263e85362e95462ea5661eb5760ec5860ed5a5fee5b5e"
+    "ef5d5ef05f5ef1605df2625df2645cf3655cf4675cf4695cf56b5cf66c5cf66e5cf7705c"
+    "f7725cf8745cf8765cf9785df9795df97b5dfa7d5efa7f5efa815ffb835ffb8560fb8761"
+    "fc8961fc8a62fc8c63fc8e64fc9065fd9266fd9467fd9668fd9869fd9a6afd9b6bfe9d6c"
+    "fe9f6dfea16efea36ffea571fea772fea973feaa74feac76feae77feb078feb27afeb47b"
+    "feb67cfeb77efeb97ffebb81febd82febf84fec185fec287fec488fec68afec88cfeca8d"
+    "fecc8ffecd90fecf92fed194fed395fed597fed799fed89afdda9cfddc9efddea0fde0a1"
+    "fde2a3fde3a5fde5a7fde7a9fde9aafdebacfcecaefceeb0fcf0b2fcf2b4fcf4b6fcf6b8"
+    "fcf7b9fcf9bbfcfbbdfcfdbf"
+)
+
+# Land cover group colours of genericMap.js; the classes of each group come
+# from the grid's LC sensor (sensors.SENSORS "groups")
+LC_GROUP_COLORS = {
+    "no_data": "000000",
+    "forest": "1c861c",
+    "shrub_grass": "6ab51a",
+    "wetland": "46987a",
+    "cropland": "ffd700",
+    "urban": "808080",
+    "water": "246bb2",
+    "snow_barren": "de8124",
+}
+
+# layer -> (ramp, header min key, header max key); "lc" is categorical
+TILE_LAYERS = {
+    "ndvi": ("YlGn", "ndvi_min", "ndvi_max"),
+    "lst_day_C": ("Inferno", "lst_day_min", "lst_day_max"),
+    "lst_night_C": ("Magma", "lst_night_min", "lst_night_max"),
+    "lc": ("LandCover", "lc_min", "lc_max"),
+}
+
+
+def _hex_colors(hex_str):
+    return np.frombuffer(bytes.fromhex(hex_str), dtype=np.uint8).reshape(-1, 3)
+
+
+def _rgb_basis(colors, t):
+    """d3.interpolateRgbBasis: uniform B-spline through the colours, per channel."""
+    values = colors.astype(float)
+    n = len(values) - 1
+    t = np.clip(t, 0, 1)
+    i = np.minimum(np.floor(t * n).astype(int), n - 1)
+
+    v1, v2 = values[i], values[i + 1]
+    v0 = np.where((i > 0)[:, None], values[np.maximum(i - 1, 0)], 2 * v1 - v2)
+    v3 = np.where((i < n - 1)[:, None], values[np.minimum(i + 2, n)], 2 * v2 - v1)
+
+    t1 = ((t - i / n) * n)[:, None]
+    t2, t3 = t1 * t1, t1 * t1 * t1
+    out = ((1 - 3 * t1 + 3 * t2 - t3) * v0 + (4 - 6 * t2 + 3 * t3) * v1
+           + (1 + 3 * t1 + 3 * t2 - 3 * t3) * v2 + t3 * v3) / 6
+    return np.clip(np.round(out), 0, 255).astype(np.uint8)
+
+
+def ramp_colors(name, t):
+    """RGB (uint8) of a named ramp at positions t in [0, 1]."""
+    t = np.asarray(t, dtype=float)
+    if name == "YlGn":
+        return _rgb_basis(_hex_colors(YLGN_HEX), t)
+    table = _hex_colors({"Inferno": INFERNO_HEX, "Magma": MAGMA_HEX}[name])
+    # d3 ramp(): colours[floor(t * n)], clamped
+    return table[np.clip(np.floor(t * len(table)).astype(int), 0, len(table) - 1)]
+
+
+def continuous_palette(name):
+    """256-entry palette: index 0 transparent (no data), 1..255 the ramp."""
+    pal = np.zeros((256, 3), dtype=np.uint8)
+    pal[1:] = ramp_colors(name, np.arange(255) / 254)
+    return pal
+
+
+def lc_palette(sensor=LEGACY_LC_SENSOR):
+    """256-entry palette: index = class + 1, index 0 transparent."""
+    pal = np.zeros((256, 3), dtype=np.uint8)
+    for group, color in LC_GROUP_COLORS.items():
+        classes = np.asarray(group_classes(sensor, group), dtype=int)
+        pal[classes + 1] = _hex_colors(color)[0]
+    return pal
+
+# ---------------------------------------------------------
+# 2. Vectorized value -> palette index
+# ---------------------------------------------------------
+
+def continuous_indices(values, vmin, vmax, visible):
+    """1..255 along [vmin, vmax] (clamped), 0 where not visible / not finite."""
+    values = np.asarray(values, dtype=float)
+    span = (vmax - vmin) or 1.0
+    t = np.clip((np.nan_to_num(values, nan=vmin) - vmin) / span, 0, 1)
+    idx = (np.round(t * 254) + 1).astype(np.uint8)
+    idx[~(visible & np.isfinite(values))] = 0
+    return idx
+
+
+def class_indices(classes, visible):
+    idx = (np.clip(np.asarray(classes), 0, 254) + 1).astype(np.uint8)
+    idx[~visible] = 0
+    return idx
+
+# ---------------------------------------------------------
+# 3. Indexed PNG writer (stdlib zlib only)
+# ---------------------------------------------------------
+
+def _chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+
+def encode_indexed_png(indices, palette, transparent=(0,)):
+    """8-bit palette PNG bytes; palette entries in `transparent` get alpha 0."""
+    h, w = indices.shape
+    n_colors = int(indices.max()) + 1 if indices.size else 1
+
+    # every scanline gets filter type 0 (None)
+    raw = np.zeros((h, w + 1), dtype=np.uint8)
+    raw[:, 1:] = indices
+
+    alpha = np.full(max(transparent) + 1, 255, dtype=np.uint8)
+    alpha[list(transparent)] = 0
+
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3, 0, 0, 0)),
+        _chunk(b"PLTE", palette[:max(n_colors, len(alpha))].tobytes()),
+        _chunk(b"tRNS", alpha.tobytes()),
+        _chunk(b"IDAT", zlib.compress(raw.tobytes(), 9)),
+        _chunk(b"IEND", b""),
+    ])
+
+# ---------------------------------------------------------
+# 4. Tiles per layer
+# ---------------------------------------------------------
+
+def layer_indices(g, layers, key, mask_outside=True):
+    """Palette indices (H, W) and palette of one grid layer."""
+    # ward_ids rows run south -> north; flip to match the north-up layers
+    visible = layers["ward_ids"][::-1] > 0 if mask_outside else np.ones(layers[key].shape, dtype=bool)
+    ramp, min_key, max_key = TILE_LAYERS[key]
+    if ramp == "LandCover":
+        return class_indices(layers[key], visible), lc_palette(grid_lc_sensor(g))
+    return continuous_indices(layers[key], g[min_key], g[max_key], visible), continuous_palette(ramp)
+
+
+def render_grid_tiles(g, layers, out_dir, tile_size=TILE_SIZE, mask_outside=True):
+    """
+    Write <out_dir>/<layer>/<row>_<col>.png for every TILE_LAYERS layer in
+    the grid, plus <out_dir>/tiles.json describing the tiling and ramps.
+
+    g: grid dict (header fields), layers: dict of (H, W) arrays
+    """
+    H, W = int(g["height"]), int(g["width"])
+    index = {
+        "city": g.get("city"),
+        "bbox": g["bbox"],
+        "width": W,
+        "height": H,
+        "tile_size": tile_size,
+        "tile_rows": -(-H // tile_size),
+        "tile_cols": -(-W // tile_size),
+        "layers": {},
+    }
+
+    for key, (ramp, min_key, max_key) in TILE_LAYERS.items():
+        if key not in layers:
+            continue
+        idx, palette = layer_indices(g, layers, key, mask_outside)
+
+        os.makedirs(os.path.join(out_dir, key), exist_ok=True)
+        for tr in range(index["tile_rows"]):
+            for tc in range(index["tile_cols"]):
+                tile = idx[tr * tile_size:(tr + 1) * tile_size, tc * tile_size:(tc + 1) * tile_size]
+                with open(os.path.join(out_dir, key, f"{tr}_{tc}.png"), "wb") as f:
+                    f.write(encode_indexed_png(tile, palette))
+
+        index["layers"][key] = {"ramp": ramp, "min": g[min_key], "max": g[max_key]}
+
+    with open(os.path.join(out_dir, "tiles.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    print("Wrote tiles to", out_dir)
+    return index
+
+
+def render_city_tiles(grid_path, out_dir=None, tile_size=TILE_SIZE):
+    """Tiles for a *_grid.json (dense or sparse), by default in a tiles/ folder next to it."""
+    g, layers = load_grid(grid_path)
+    if out_dir is None:
+        out_dir = os.path.join(os.path.dirname(str(grid_path)), "tiles")
+    return render_grid_tiles(g, layers, out_dir, tile_size)
+
+
+if __name__ == "__main__":
+    for cid, cfg in CITY_CONFIGS.items():
+        if cfg["grid_path"].exists():
+            render_city_tiles(cfg["grid_path"])
+        else:
+            print(f"[WARN] Grid file not found for {cid}: {cfg['grid_path']}")
@@ -0,0 +1,190 @@
+import os
+from collections import defaultdict
+
+import numpy as np
+from shapely.geometry import LineString
+
+from grid_io import write_json_stream
+
+# Simplification tolerance and coordinate quantum, as fractions of one
+# grid pixel: outlines finer than the MODIS grid are never visible on the map
+SIMPLIFY_TOLERANCE_PX = 0.25
+QUANTUM_PX = 0.01
+
+# ---------------------------------------------------------
+# 1. Rings from shapely geometries (quantized)
+# ---------------------------------------------------------
+
+def polygon_parts(geom):
+    """Flatten a (Multi)Polygon / GeometryCollection into its Polygons."""
+    if geom.is_empty:
+        return []
+    if geom.geom_type == "Polygon":
+        return [geom]
+    if geom.geom_type in ("MultiPolygon", "GeometryCollection"):
+        out = []
+        for g in geom.geoms:
+            out.extend(polygon_parts(g))
+        return out
+    return []
+
+
+def quantize_ring(coords, origin, quantum):
+    """
+    Snap ring coordinates to the integer grid and drop repeated points.
+    Returns an open ring (list of (x, y) int tuples) or None if degenerate.
+    """
+    q = np.round((np.asarray(coords)[:, :2] - origin) / quantum).astype(np.int64)
+    keep = np.ones(len(q), dtype=bool)
+    keep[1:] = np.any(q[1:] != q[:-1], axis=1)
+    q = q[keep]
+    if len(q) > 1 and (q[0] == q[-1]).all():
+        q = q[:-1]
+    if len(q) < 3:
+        return None
+    return list(map(tuple, q.tolist()))
+
+# ---------------------------------------------------------
+# 2. Shared-arc topology
+# ---------------------------------------------------------
+
+def find_junctions(rings):
+    """
+    Points where rings stop sharing a boundary: a vertex is a junction if
+    it has more than two distinct neighbours across all rings using it.
+    """
+    neighbours = defaultdict(set)
+    for ring in rings:
+        n = len(ring)
+        for i, p in enumerate(ring):
+            neighbours[p].add(ring[i - 1])
+            neighbours[p].add(ring[(i + 1) % n])
+    return {p for p, s in neighbours.items() if len(s) > 2}
+
+
+def split_ring(ring, junctions):
+    """Cut an open ring into arcs at its junctions (closed arc if none)."""
+    cuts = [i for i, p in enumerate(ring) if p in junctions]
+
+    if not cuts:
+        # canonical start so identical junction-free rings dedupe
+        start = ring.index(min(ring))
+        ring = ring[start:] + ring[:start]
+        return [ring + [ring[0]]]
+
+    ring = ring[cuts[0]:] + ring[:cuts[0]]
+    cuts = [c - cuts[0] for c in cuts] + [len(ring)]
+    ring = ring + [ring[0]]
+    return [ring[a:b + 1] for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def build_topology(geoms, ward_names, pixel_size,
+                   tolerance_px=SIMPLIFY_TOLERANCE_PX, quantum_px=QUANTUM_PX):
+    """
+    Build a TopoJSON topology for the wards.
+
+    Rings are quantized, cut into arcs at junctions and shared arcs are
+    stored once, so neighbouring wards simplify their common edge
+    identically and never open gaps or overlaps. Each arc is simplified
+    (Douglas-Peucker, endpoints fixed) with a tolerance derived from the
+    grid's pixel size.
+
+    geoms: list of shapely geometries, ward id i + 1 is geoms[i]
+    ward_names: dict ward id -> name
+    pixel_size: grid pixel size in degrees
+    """
+    quantum = pixel_size * quantum_px
+    tolerance = tolerance_px / quantum_px   # in quantized units
+    bounds = np.array([g.bounds for g in geoms if not g.is_empty])
+    origin = bounds[:, :2].min(axis=0)
+
+    # ward -> polygons -> rings
+    ward_rings = []
+    all_rings = []
+    for geom in geoms:
+        polys = []
+        for poly in polygon_parts(geom):
+            rings = [quantize_ring(poly.exterior.coords, origin, quantum)]
+            if rings[0] is None:
+                continue
+            for hole in poly.interiors:
+                r = quantize_ring(hole.coords, origin, quantum)
+                if r is not None:
+                    rings.append(r)
+            polys.append(rings)
+            all_rings.extend(rings)
+        ward_rings.append(polys)
+
+    junctions = find_junctions(all_rings)
+
+    arcs = []
+    arc_index = {}
+
+    def arc_ref(arc):
+        key = tuple(arc)
+        if key in arc_index:
+            return arc_index[key]
+        rkey = key[::-1]
+        if rkey in arc_index:
+            return ~arc_index[rkey]
+        arc_index[key] = len(arcs)
+        arcs.append(arc)
+        return arc_index[key]
+
+    geometries = []
+    for wid, polys in enumerate(ward_rings, start=1):
+        poly_arcs = [
+            [[arc_ref(arc) for arc in split_ring(ring, junctions)] for ring in rings]
+            for rings in polys
+        ]
+        props = {"id": wid, "name": ward_names.get(wid, f"Ward {wid}")}
+        if not poly_arcs:
+            geometries.append({"type": None, "properties": props})
+        elif len(poly_arcs) == 1:
+            geometries.append({"type": "Polygon", "arcs": poly_arcs[0], "properties": props})
+        else:
+            geometries.append({"type": "MultiPolygon", "arcs": poly_arcs, "properties": props})
+
+    encoded = [delta_encode(simplify_arc(arc, tolerance)) for arc in arcs]
+
+    return {
+        "type": "Topology",
+        "transform": {
+            "scale": [quantum, quantum],
+            "translate": [float(origin[0]), float(origin[1])],
+        },
+        "objects": {"wards": {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded,
+    }
+
+
+def simplify_arc(arc, tolerance):
+    """Douglas-Peucker on one arc, keeping its endpoints (and closed rings open)."""
+    if len(arc) <= 2:
+        return np.asarray(arc, dtype=np.int64)
+
+    simple = np.asarray(LineString(arc).simplify(tolerance, preserve_topology=False).coords)
+    closed = arc[0] == arc[-1]
+    if len(simple) < (4 if closed else 2):
+        return np.asarray(arc, dtype=np.int64)
+    return np.round(simple).astype(np.int64)
+
+
+def delta_encode(points):
+    """TopoJSON delta encoding: first point absolute, then differences."""
+    out = points.copy()
+    out[1:] = points[1:] - points[:-1]
+    return out.tolist()
+
+# ---------------------------------------------------------
+# 3. Export
+# ---------------------------------------------------------
+
+def export_topology(TOPO_OUT, geoms, ward_names, pixel_size, **kwargs):
+    """Write the simplified ward topology for one city next to its grid."""
+    topo = build_topology(geoms, ward_names, pixel_size, **kwargs)
+
+    os.makedirs(os.path.dirname(TOPO_OUT) or ".", exist_ok=True)
+    write_json_stream(TOPO_OUT, topo)
+    print("Wrote", TOPO_OUT)
+    return topo
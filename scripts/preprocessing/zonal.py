@@ -0,0 +1,192 @@
+import json
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+# ---------------------------------------------------------
+# 1. Stat block (shared with the per-ward stats in preprocess())
+# ---------------------------------------------------------
+
+def ward_stats(pix_vals):
+    pix_vals = pix_vals[np.isfinite(pix_vals)]
+
+    if pix_vals.size == 0:
+        return {
+            "pixel_count": 0,
+            "min": None,
+            "q1": None,
+            "median": None,
+            "q3": None,
+            "max": None,
+            "mean": None,
+            "std": None,
+        }
+
+    q1, med, q3 = np.percentile(pix_vals, [25, 50, 75])
+    return {
+        "pixel_count": int(pix_vals.size),
+        "min": float(np.min(pix_vals)),
+        "q1": float(q1),
+        "median": float(med),
+        "q3": float(q3),
+        "max": float(np.max(pix_vals)),
+        "mean": float(np.mean(pix_vals)),
+        "std": float(np.std(pix_vals)),
+    }
+
+def lc_mode(lc_vals):
+    """
+    Most common land-cover class of a set of pixels, None if empty. Ties go
+    to the class seen first (row-major), as the per-ward stats always have.
+    """
+    vals = np.asarray(lc_vals).reshape(-1)
+    if vals.size == 0:
+        return None
+    classes, first, counts = np.unique(vals, return_index=True, return_counts=True)
+    tied = np.flatnonzero(counts == counts.max())
+    return int(classes[tied[np.argmin(first[tied])]])
+
+# ---------------------------------------------------------
+# 2. Polygon input (GeoJSON / WKB / shapely)
+# ---------------------------------------------------------
+
+def parse_polygons(polygons):
+    """
+    Normalize the accepted inputs to (geoms, names):
+    shapely geometries, WKB bytes, GeoJSON geometry / Feature /
+    FeatureCollection dicts or their JSON text, or a list of any of these.
+    """
+    if isinstance(polygons, (str, bytes, dict)) or hasattr(polygons, "geom_type"):
+        polygons = [polygons]
+
+    geoms, names = [], []
+    for item in polygons:
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            geoms.append(shapely.from_wkb(bytes(item)))
+            names.append(None)
+            continue
+        if isinstance(item, str):
+            item = json.loads(item)
+        if hasattr(item, "geom_type"):
+            geoms.append(item)
+            names.append(None)
+        elif item.get("type") == "FeatureCollection":
+            sub_geoms, sub_names = parse_polygons(item["features"])
+            geoms.extend(sub_geoms)
+            names.extend(sub_names)
+        elif item.get("type") == "Feature":
+            geoms.append(shape(item["geometry"]))
+            names.append((item.get("properties") or {}).get("name"))
+        else:
+            geoms.append(shape(item))
+            names.append(None)
+    return geoms, names
+
+# ---------------------------------------------------------
+# 3. Batched rasterization within each polygon's bbox window
+# ---------------------------------------------------------
+
+def polygon_windows(geoms, bbox, shape_hw):
+    """
+    North-up pixel window (r0, r1, c0, c1) of each geometry's bounds,
+    clipped to the grid (empty windows have r0 == r1 or c0 == c1).
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    H, W = shape_hw
+    dx = (max_lon - min_lon) / W
+    dy = (max_lat - min_lat) / H
+
+    b = shapely.bounds(np.asarray(geoms, dtype=object))
+    c0 = np.floor((b[:, 0] - min_lon) / dx)
+    c1 = np.ceil((b[:, 2] - min_lon) / dx)
+    r0 = np.floor((max_lat - b[:, 3]) / dy)
+    r1 = np.ceil((max_lat - b[:, 1]) / dy)
+
+    win = np.stack([r0, r1, c0, c1], axis=1)
+    win = np.nan_to_num(win, nan=0.0)   # empty geometries
+    win[:, :2] = np.clip(win[:, :2], 0, H)
+    win[:, 2:] = np.clip(win[:, 2:], 0, W)
+    win[:, 1] = np.maximum(win[:, 0], win[:, 1])
+    win[:, 3] = np.maximum(win[:, 2], win[:, 3])
+    return win.astype(np.int64)
+
+
+def rasterize_polygons(geoms, bbox, shape_hw):
+    """
+    Pixels whose centre lies in each polygon, tested only inside the
+    polygon's own window. All polygons are tested in one vectorized
+    contains_xy call over the concatenated windows.
+
+    Returns: list of flat (row-major, north-up) pixel indices per polygon
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    H, W = shape_hw
+    dx = (max_lon - min_lon) / W
+    dy = (max_lat - min_lat) / H
+
+    windows = polygon_windows(geoms, bbox, shape_hw)
+    heights = windows[:, 1] - windows[:, 0]
+    widths = windows[:, 3] - windows[:, 2]
+    sizes = heights * widths
+    total = int(sizes.sum())
+
+    # (polygon, row, col) of every window pixel, without per-polygon loops
+    owner = np.repeat(np.arange(len(geoms)), sizes)
+    first = np.cumsum(sizes) - sizes
+    within = np.arange(total) - np.repeat(first, sizes)
+    w_own = widths[owner]
+    rows = windows[owner, 0] + within // np.maximum(w_own, 1)
+    cols = windows[owner, 2] + within % np.maximum(w_own, 1)
+
+    arr = np.asarray(geoms, dtype=object)
+    shapely.prepare(arr)
+    hit = shapely.contains_xy(
+        arr[owner],
+        min_lon + (cols + 0.5) * dx,
+        max_lat - (rows + 0.5) * dy,
+    )
+
+    flat = rows * W + cols
+    bounds = np.append(first, total)
+    return [flat[bounds[i]:bounds[i + 1]][hit[bounds[i]:bounds[i + 1]]] for i in range(len(geoms))]
+
+# ---------------------------------------------------------
+# 4. Zonal statistics over (H, W) layers
+# ---------------------------------------------------------
+
+def zonal_stats(arrays, bbox, polygons, layers=None):
+    """
+    ward_stats() blocks for any polygons on a city's grid.
+
+    arrays: dict of north-up (H, W) layers, e.g. from grid_io.load_grid or
+            the query server's memory-mapped cache
+    bbox: [min_lon, min_lat, max_lon, max_lat] of the grid
+    polygons: see parse_polygons()
+    layers: layers to summarize (default: every layer but ward_ids / lc);
+            land cover is reported as its most common class
+
+    Returns a list with one dict per polygon:
+        {"index", "name", "pixel_count", "lc_mode", "stats": {layer: block}}
+    """
+    if layers is None:
+        layers = [k for k in arrays if k not in ("ward_ids", "lc")]
+
+    geoms, names = parse_polygons(polygons)
+    if not geoms:
+        return []
+    pixels = rasterize_polygons(geoms, bbox, arrays["ward_ids"].shape)
+
+    results = []
+    for i, (name, pix) in enumerate(zip(names, pixels)):
+        stats = {key: ward_stats(np.asarray(arrays[key].reshape(-1)[pix], dtype=float))
+                 for key in layers}
+        mode = lc_mode(arrays["lc"].reshape(-1)[pix]) if "lc" in arrays else None
+        results.append({
+            "index": i,
+            "name": name,
+            "pixel_count": int(pix.size),
+            "lc_mode": mode,
+            "stats": stats,
+        })
+    return results
@@ -292,6 +292,7 @@ async function initMainMap() {
         label: "Tokyo",
         gridPath: "data/tokyo/tokyo_grid.json",
         wardStatsPath: "data/tokyo/tokyo_wards.json",
+        topoPath: "data/tokyo/tokyo_topo.json",
         cityName: "Tokyo",
         subunit: "Ward",
         enableNdviPainting: true,
@@ -341,6 +342,7 @@ async function initMainMap() {
         label: "London",
         gridPath: "data/london/london_grid.json",
         wardStatsPath: "data/london/london_boroughs.json",
+        topoPath: "data/london/london_topo.json",
         cityName: "London",
         subunit: "Borough",
         enableNdviPainting: true,
@@ -391,6 +393,7 @@ async function initMainMap() {
         label: "New York City",
         gridPath: "data/nyc/nyc_grid.json",
         wardStatsPath: "data/nyc/nyc_boroughs.json",
+        topoPath: "data/nyc/nyc_topo.json",
         cityName: "New York City",
         subunit: "Borough",
         enableNdviPainting: true,
@@ -0,0 +1,39 @@
+import numpy as np
+
+from distribution_distance import distance_matrices, ks_statistic, wasserstein_1
+
+
+def _w1_brute(a, b):
+    # repeat each value so both samples have len(a) * len(b) points; W1 is
+    # then the mean gap between matching order statistics
+    a_rep = np.sort(np.repeat(a, len(b)))
+    b_rep = np.sort(np.repeat(b, len(a)))
+    return np.mean(np.abs(a_rep - b_rep))
+
+
+def _ks_brute(a, b):
+    x = np.concatenate([a, b])
+    fa = (a[None, :] <= x[:, None]).mean(axis=1)
+    fb = (b[None, :] <= x[:, None]).mean(axis=1)
+    return np.max(np.abs(fa - fb))
+
+
+def test_w1_and_ks_match_brute_force():
+    rng = np.random.default_rng(3)
+    for n, m in ((1, 1), (5, 9), (40, 13), (100, 100)):
+        for draw in (rng.normal, lambda loc, scale, size: np.round(rng.normal(loc, scale, size))):
+            a = np.sort(draw(0.0, 2.0, size=n))
+            b = np.sort(draw(0.5, 1.5, size=m))   # the rounded draws have ties
+            assert np.isclose(wasserstein_1(a, b), _w1_brute(a, b))
+            assert np.isclose(ks_statistic(a, b), _ks_brute(a, b))
+
+
+def test_distance_matrices_are_symmetric_with_empty_samples_as_nan():
+    rng = np.random.default_rng(4)
+    samples = [rng.normal(size=30), rng.normal(1.0, size=20), []]
+    w1, ks = distance_matrices(samples)
+
+    np.testing.assert_array_equal(w1, w1.T)
+    np.testing.assert_array_equal(ks, ks.T)
+    assert np.isclose(w1[0, 1], _w1_brute(np.sort(samples[0]), np.sort(samples[1])))
+    assert np.isnan(w1[0, 2]) and np.isnan(ks[1, 2])
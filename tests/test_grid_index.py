@@ -0,0 +1,19 @@
+import json
+
+import numpy as np
+
+from grid_index import run_index_from_json, run_index_to_json, ward_pixel_indices, ward_run_index
+
+
+def test_run_index_round_trips_through_json():
+    rng = np.random.default_rng(1)
+    ward_ids = rng.integers(0, 4, size=(9, 13))
+    index = ward_run_index(ward_ids)
+    back = run_index_from_json(json.loads(json.dumps(run_index_to_json(index))))
+
+    for key in ("ids", "offsets", "runs"):
+        np.testing.assert_array_equal(back[key], index[key])
+    for wid in range(1, 4):
+        np.testing.assert_array_equal(
+            ward_pixel_indices(back, wid, ward_ids.shape[1]), np.flatnonzero(ward_ids.ravel() == wid)
+        )
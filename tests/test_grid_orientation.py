@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import shapely
+import tifffile
+from shapely.geometry import Polygon, mapping
+
+from grid_io import decode_layer, encode_sparse_grid, grid_inside_mask, load_grid, read_grid
+from preprocessing import preprocess
+from query_server import QueryEngine
+
+# Small synthetic city: 0.01 degree pixels, NDVI / LST gradients running
+# north -> south, and wards placed asymmetrically so that a row flip of the
+# ward mask changes which pixels (and values) are "inside"
+BBOX = [10.0, 50.0, 10.24, 50.2]
+H, W = 20, 24
+WARDS = {
+    "North West": Polygon([(10.03, 50.18), (10.15, 50.18), (10.03, 50.10)]),
+    "South East": Polygon([(10.12, 50.03), (10.20, 50.03), (10.20, 50.08), (10.12, 50.08)]),
+}
+
+
+def _write_inputs(folder):
+    rows = np.arange(H)[:, None] / (H - 1)
+    cols = np.arange(W)[None, :] / (W - 1)
+    ndvi = 0.2 + 0.6 * rows + 0.05 * cols
+    day = 35.0 - 8.0 * rows + cols
+    night = 22.0 - 4.0 * rows + 0.5 * cols
+
+    paths = {key: os.path.join(folder, f"{key}.tif") for key in ("ndvi", "lst", "lc")}
+    tifffile.imwrite(paths["ndvi"], np.round(ndvi * 10000).astype(np.int16))
+    tifffile.imwrite(paths["lst"], np.round((np.stack([day, night]) + 273.15) / 0.02).astype(np.uint16))
+    tifffile.imwrite(paths["lc"], np.where(rows < 0.5, 13, 10).repeat(W, axis=1).astype(np.uint8))
+
+    paths["wards"] = os.path.join(folder, "wards.json")
+    with open(paths["wards"], "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"name": name}, "geometry": mapping(geom)}
+            for name, geom in WARDS.items()
+        ]}, f)
+    return paths
+
+
+@pytest.fixture(scope="module")
+def city(tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("city"))
+    paths = _write_inputs(folder)
+    cwd = os.getcwd()
+    os.chdir(folder)   # boundary cache lives under ./data/.cache
+    try:
+        for name, sparse in (("dense", False), ("sparse", True)):
+            preprocess(
+                "Test", paths["ndvi"], paths["lst"], paths["lc"], False, paths["wards"],
+                os.path.join(folder, f"{name}_grid.json"), os.path.join(folder, f"{name}_wards.json"),
+                BBOX, sparse=sparse, SAT_OUT=os.path.join(folder, f"{name}_sat.npz"),
+            )
+    finally:
+        os.chdir(cwd)
+    return folder
+
+
+def _map_mask(g):
+    """Pixels whose centre lies in a ward, rows north -> south like the map."""
+    min_lon, min_lat, max_lon, max_lat = g["bbox"]
+    h, w = int(g["height"]), int(g["width"])
+    lat = max_lat - (np.arange(h) + 0.5) * (max_lat - min_lat) / h
+    lon = min_lon + (np.arange(w) + 0.5) * (max_lon - min_lon) / w
+    lon, lat = np.meshgrid(lon, lat)
+    return np.any([shapely.contains_xy(geom, lon, lat) for geom in WARDS.values()], axis=0)
+
+
+def test_inside_mask_is_the_map_mask(city):
+    g, layers = load_grid(os.path.join(city, "dense_grid.json"))
+    mask = _map_mask(g)
+    # ward_ids keep their stored rows, south -> north
+    np.testing.assert_array_equal(layers["ward_ids"][::-1] > 0, mask)
+    np.testing.assert_array_equal(grid_inside_mask(g), mask.reshape(-1))
+
+
+def test_sparse_round_trip_matches_dense_under_map_mask(city):
+    g_dense, dense = load_grid(os.path.join(city, "dense_grid.json"))
+    g_sparse, sparse = load_grid(os.path.join(city, "sparse_grid.json"))
+    assert read_grid(os.path.join(city, "sparse_grid.json"))["encoding"] == "sparse"
+    mask = _map_mask(g_dense)
+
+    np.testing.assert_array_equal(sparse["ward_ids"], dense["ward_ids"])
+    for key in ("ndvi", "lst_day_C", "lst_night_C", "lst_day_gi", "ndvi_rank"):
+        np.testing.assert_allclose(sparse[key][mask], dense[key][mask])
+        if np.issubdtype(sparse[key].dtype, np.floating):
+            assert np.isnan(sparse[key][~mask]).all()
+        assert np.isfinite(sparse[key][mask].astype(float)).all()
+
+
+def test_hot_spots_and_ranks_stay_inside_the_wards(city):
+    g, layers = load_grid(os.path.join(city, "dense_grid.json"))
+    mask = _map_mask(g)
+    for key in ("lst_day_gi", "lst_night_gi", "ndvi_rank", "lst_day_rank", "lst_night_rank"):
+        assert not np.any(layers[key][~mask]), key
+    for key in ("ndvi_rank", "lst_day_rank", "lst_night_rank"):
+        assert np.all(layers[key][mask] > 0), key
+
+
+@pytest.mark.parametrize("name", ["dense", "sparse"])
+def test_bbox_scan_matches_summed_area(city, name, tmp_path):
+    grid_path = os.path.join(city, f"{name}_grid.json")
+    engine = QueryEngine({"test": {"label": "Test", "grid_path": grid_path}}, cache_dir=str(tmp_path))
+    g = read_grid(grid_path)
+    min_lon, min_lat, max_lon, max_lat = g["bbox"]
+
+    for bbox in (g["bbox"], [min_lon, (min_lat + max_lat) / 2, max_lon, max_lat]):
+        for layer in ("ndvi", "lst_day_C"):
+            sat = engine.bbox("test", bbox, layer)
+            scan = engine.bbox("test", bbox, layer, full=True)
+            assert sat["method"] == "summed_area" and scan["method"] == "scan"
+            assert sat["count"] == scan["count"] > 0
+            assert sat["mean"] == pytest.approx(scan["mean"])
+            assert sat["std"] == pytest.approx(scan["std"], abs=1e-6)
+
+
+def test_sparse_encoding_keeps_stored_ward_rows():
+    # stored ward_ids rows run south -> north; the map mask is north-up
+    g = {"width": 3, "height": 2, "ward_ids": [1, 1, 0, 0, 0, 2], "ndvi": [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]}
+    map_mask = np.asarray(g["ward_ids"]).reshape(2, 3)[::-1] > 0
+    np.testing.assert_array_equal(grid_inside_mask(g), map_mask.reshape(-1))
+
+    encode_sparse_grid(g, map_mask)
+    np.testing.assert_array_equal(g["ndvi"], [0.3, 0.4, 0.5])
+    np.testing.assert_array_equal(decode_layer(g, "ward_ids"), [1, 1, 0, 0, 0, 2])
+    np.testing.assert_array_equal(grid_inside_mask(g), map_mask.reshape(-1))
@@ -0,0 +1,62 @@
+import numpy as np
+
+from greenness_model_experiments import (
+    PIXEL_MODEL_LC_GROUPS, PIXEL_MODEL_LC_REFERENCE, fit_pixel_model, pixel_feature_names,
+    pixel_features, predict_pixel_model,
+)
+from sensors import LC_GROUPS, SENSORS, class_groups
+
+
+def test_design_matrix_has_full_column_rank():
+    # one pixel block per (city, land-cover group), so every dummy varies
+    rng = np.random.default_rng(0)
+    groups = [LC_GROUPS.index(g) for g in PIXEL_MODEL_LC_GROUPS]
+    lc = np.tile(np.repeat(groups, 20), 2)
+    city = np.repeat([0, 1], lc.size // 2)
+    n = lc.size
+
+    blocks = [
+        pixel_features(rng.uniform(-0.1, 0.9, (city == c).sum()), lc[city == c],
+                       rng.uniform(0, 0.8, (city == c).sum()), rng.uniform(0, 1, (city == c).sum()), c, 2)
+        for c in (0, 1)
+    ]
+    X = np.vstack(blocks)
+
+    names = pixel_feature_names(["a", "b"])
+    assert X.shape == (n, len(names))
+    assert f"lc_{PIXEL_MODEL_LC_REFERENCE}" not in names
+    assert np.linalg.matrix_rank(X) == X.shape[1]
+
+
+def test_no_data_pixels_are_left_out_of_the_fit():
+    rng = np.random.default_rng(1)
+    shape = (12, 12)
+    ndvi = rng.uniform(0.0, 0.8, shape)
+    lc = rng.choice([1, 10, 12, 13], size=shape)
+    layers = {
+        "ndvi": ndvi,
+        "lst_day": 30.0 - 5.0 * ndvi,
+        "lst_night": 18.0 - 2.0 * ndvi,
+        "ward_ids": np.ones(shape, dtype=int),
+        "lc": lc,
+        "lc_group": class_groups("modis_lc", lc),
+    }
+    model = fit_pixel_model({"a": layers})
+
+    # the same city with a band of no-data pixels carrying absurd LST
+    noisy = {k: v.copy() for k, v in layers.items()}
+    noisy["lc"][:3] = 0
+    noisy["lc_group"][:3] = LC_GROUPS.index("no_data")
+    noisy["lst_day"][:3] = 99.0
+    noisy_model = fit_pixel_model({"a": noisy})
+
+    assert noisy_model["n_pixels"] == model["n_pixels"] - 36
+    pred_day, _ = predict_pixel_model(noisy_model, "a", noisy)
+    assert np.isnan(pred_day[:3]).all() and np.isfinite(pred_day[3:]).all()
+    np.testing.assert_allclose(pred_day[3:], noisy["lst_day"][3:], atol=0.05)
+
+
+def test_every_lc_class_has_a_group():
+    for name, spec in SENSORS.items():
+        if spec["kind"] == "categorical":
+            assert (class_groups(name, list(spec["classes"])) >= 0).all(), name
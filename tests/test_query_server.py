@@ -0,0 +1,89 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from grid_io import write_json_stream
+from query_server import QueryEngine, make_handler
+
+# 4 x 6 grid over [0, 0, 6, 4]: one degree pixels, ward 1 on the west half
+H, W = 4, 6
+BBOX = [0.0, 0.0, 6.0, 4.0]
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("query")
+    ward_ids = np.zeros((H, W), dtype=int)
+    ward_ids[:, :3] = 1
+    grid_path = folder / "test_grid.json"
+    write_json_stream(str(grid_path), {
+        "city": "Test", "width": W, "height": H, "bbox": BBOX,
+        "ward_ids": ward_ids.reshape(-1),
+        "ndvi": np.arange(H * W, dtype=float),
+        "lc": np.full(H * W, 13),
+    })
+
+    engine = QueryEngine({"test": {"label": "Test", "grid_path": str(grid_path)}},
+                         cache_dir=str(folder / "cache"))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(engine))
+    httpd.RequestHandlerClass.log_message = lambda *args: None
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield engine, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(url, body=None):
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_get_queries(server):
+    _, base = server
+    status, body = _request(f"{base}/cities")
+    assert status == 200 and body["cities"] == {"test": "Test"}
+
+    status, body = _request(f"{base}/point?city=test&lon=0.5&lat=3.5")
+    assert status == 200 and body["row"] == 0 and body["col"] == 0
+    assert body["ward_id"] == 1 and body["values"]["ndvi"] == 0.0
+
+    status, body = _request(f"{base}/bbox?city=test&bbox=0,0,6,4&layer=ndvi")
+    assert status == 200 and body["count"] == 12
+
+
+def test_zonal_post(server):
+    _, base = server
+    square = {"type": "Polygon", "coordinates": [[[0, 2], [2, 2], [2, 4], [0, 4], [0, 2]]]}
+    feature = {"type": "Feature", "properties": {"name": "north west"}, "geometry": square}
+    status, body = _request(f"{base}/zonal?city=test&layers=ndvi",
+                            {"type": "FeatureCollection", "features": [feature]})
+
+    assert status == 200
+    [zone] = body["zones"]
+    assert zone["name"] == "north west" and zone["pixel_count"] == 4 and zone["lc_mode"] == 13
+    assert zone["stats"]["ndvi"]["mean"] == pytest.approx(np.mean([0, 1, 6, 7]))
+
+
+def test_errors_are_json(server, monkeypatch):
+    engine, base = server
+    assert _request(f"{base}/nope")[0] == 404
+    assert _request(f"{base}/point?city=elsewhere&lon=0&lat=0")[0] == 404
+    assert _request(f"{base}/point?city=test&lon=0")[0] == 400
+    assert _request(f"{base}/zonal?city=test")[0] == 400
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(engine, "point", broken)
+    status, body = _request(f"{base}/point?city=test&lon=0.5&lat=0.5")
+    assert status == 500 and "boom" in body["error"]
@@ -0,0 +1,24 @@
+import numpy as np
+
+from ranks import RANK_SCALE, percentile_ranks, quantize_ranks
+
+
+def test_percentile_ranks_share_mid_rank_on_ties():
+    vals = np.array([[3.0, 1.0, 1.0], [np.nan, 2.0, 5.0]])
+    mask = np.array([[True, True, True], [True, True, False]])
+    pct = percentile_ranks(vals, mask)
+
+    np.testing.assert_allclose(pct[0], [3.5 / 4, 1.0 / 4, 1.0 / 4])
+    assert pct[1, 1] == 2.5 / 4
+    assert np.isnan(pct[1, 0]) and np.isnan(pct[1, 2])
+
+
+def test_quantized_ranks_keep_large_wards_inside():
+    # more than 2 * RANK_SCALE pixels: the lowest rank rounds to 0 unclamped
+    n = 2 * RANK_SCALE + 10
+    pct = percentile_ranks(np.arange(n, dtype=float), np.ones(n, dtype=bool))
+    q = quantize_ranks(np.append(pct, np.nan))
+
+    assert q.dtype == np.uint16
+    assert q[:n].min() == 1 and q[:n].max() == RANK_SCALE
+    assert q[n] == 0
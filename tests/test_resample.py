@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from resample import align_band, bilinear, block_mean, block_mode, nearest
+
+SRC_BBOX = [0.0, 0.0, 6.0, 4.0]   # 4 x 6 source pixels of 1 degree
+
+
+def test_bands_on_the_target_grid_are_returned_unchanged():
+    arr = np.arange(24.0).reshape(4, 6)
+    assert align_band(arr, SRC_BBOX, list(SRC_BBOX), (4, 6)) is arr
+
+
+def test_block_mean_and_mode_match_direct_2x2_blocks():
+    rng = np.random.default_rng(5)
+    arr = rng.normal(size=(4, 6))
+    arr[0, 0] = np.nan
+    lc = rng.integers(1, 4, size=(4, 6))
+
+    mean = block_mean(arr, SRC_BBOX, SRC_BBOX, (2, 3))
+    mode = block_mode(lc, SRC_BBOX, SRC_BBOX, (2, 3))
+    for r in range(2):
+        for c in range(3):
+            block = arr[2 * r:2 * r + 2, 2 * c:2 * c + 2]
+            assert mean[r, c] == pytest.approx(np.nanmean(block), rel=1e-6)
+            counts = np.bincount(lc[2 * r:2 * r + 2, 2 * c:2 * c + 2].ravel())
+            assert mode[r, c] == counts.argmax()   # ties -> lowest class
+
+    np.testing.assert_array_equal(align_band(arr, SRC_BBOX, SRC_BBOX, (2, 3)), mean)
+
+
+def test_upsampling_keeps_rows_north_up():
+    arr = np.arange(24.0).reshape(4, 6)
+    up = nearest(arr, SRC_BBOX, SRC_BBOX, (8, 12))
+    np.testing.assert_array_equal(up, arr.repeat(2, axis=0).repeat(2, axis=1))
+
+    # a linear field is reproduced exactly between source pixel centres
+    lin = bilinear(arr, SRC_BBOX, SRC_BBOX, (8, 12))
+    np.testing.assert_allclose(lin[1:-1, 1:-1], (np.arange(1, 7)[:, None] * 0.5 - 0.25) * 6
+                               + np.arange(1, 11)[None, :] * 0.5 - 0.25, rtol=1e-6)
+    np.testing.assert_array_equal(align_band(arr, SRC_BBOX, SRC_BBOX, (8, 12)), lin)
+
+
+def test_categorical_bands_reject_averaging():
+    with pytest.raises(ValueError):
+        align_band(np.ones((4, 6), dtype=int), SRC_BBOX, SRC_BBOX, (2, 3), method="mean", categorical=True)
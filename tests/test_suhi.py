@@ -0,0 +1,44 @@
+import numpy as np
+
+from suhi import distance_to_mask, rural_ring_mask
+
+
+def _brute_force(mask, pixel_km):
+    dy, dx = pixel_km
+    rr, cc = np.nonzero(mask)
+    r, c = np.indices(mask.shape)
+    if rr.size == 0:
+        return np.full(mask.shape, np.inf)
+    d2 = ((r[..., None] - rr) * dy) ** 2 + ((c[..., None] - cc) * dx) ** 2
+    return np.sqrt(d2.min(axis=-1))
+
+
+def test_distance_transform_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for density, shape, pixel_km in ((0.02, (30, 41), (1.0, 1.0)),
+                                     (0.2, (17, 9), (0.9, 0.7)),
+                                     (0.005, (40, 60), (0.46, 0.38))):
+        mask = rng.random(shape) < density
+        np.testing.assert_allclose(distance_to_mask(mask, pixel_km), _brute_force(mask, pixel_km))
+
+
+def test_distance_transform_handles_empty_rows_and_masks():
+    mask = np.zeros((5, 7), dtype=bool)
+    assert np.isinf(distance_to_mask(mask)).all()
+
+    mask[2, 3] = True
+    d = distance_to_mask(mask, (2.0, 1.0))
+    np.testing.assert_allclose(d, _brute_force(mask, (2.0, 1.0)))
+    assert d[2, 3] == 0.0
+
+
+def test_rural_ring_excludes_urban_and_water():
+    urban = np.zeros((21, 21), dtype=bool)
+    urban[8:13, 8:13] = True
+    lc = np.full(urban.shape, 10)
+    lc[0] = 17
+    ring = rural_ring_mask(urban, lc, (1.0, 1.0), ring_km=(2.0, 6.0))
+    dist = _brute_force(urban, (1.0, 1.0))
+
+    assert not (ring & urban).any() and not ring[0].any()
+    np.testing.assert_array_equal(ring[1:], ((dist > 2.0) & (dist <= 6.0))[1:])
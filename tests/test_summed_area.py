@@ -0,0 +1,28 @@
+import numpy as np
+
+from summed_area import load_sat_sidecar, save_sat_sidecar, summed_area_tables, window_stats
+
+
+def test_window_stats_match_a_direct_sum(tmp_path):
+    rng = np.random.default_rng(2)
+    values = rng.normal(25.0, 4.0, size=(17, 23))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    mask = rng.random(values.shape) < 0.7
+
+    path = str(tmp_path / "city_sat.npz")
+    save_sat_sidecar(path, {"lst_day_C": summed_area_tables(values, mask)})
+    tables = load_sat_sidecar(path)["lst_day_C"]
+
+    windows = [(0, 17, 0, 23), (-3, 40, -1, 99), (5, 6, 7, 8), (4, 4, 0, 23)]
+    windows += [tuple(rng.integers(0, 24, 4)) for _ in range(50)]
+    for r0, r1, c0, c1 in windows:
+        got = window_stats(tables, (r0, r1, c0, c1))
+        win = values[max(r0, 0):max(r1, 0), max(c0, 0):max(c1, 0)]
+        keep = mask[max(r0, 0):max(r1, 0), max(c0, 0):max(c1, 0)] & np.isfinite(win)
+
+        assert got["count"] == keep.sum()
+        if keep.any():
+            assert np.isclose(got["mean"], win[keep].mean())
+            assert np.isclose(got["var"], win[keep].var(), atol=1e-8)
+        else:
+            assert got["mean"] is None and got["var"] is None
@@ -0,0 +1,26 @@
+import numpy as np
+
+from zonal import lc_mode, zonal_stats
+
+
+def test_lc_mode_breaks_ties_by_first_occurrence():
+    assert lc_mode([17, 13, 13, 17, 5]) == 17
+    assert lc_mode(np.array([[4, 2], [2, 4]])) == 4
+    assert lc_mode([12]) == 12
+    assert lc_mode([]) is None
+
+
+def test_zonal_stats_on_a_small_grid():
+    # 2 x 4 grid over [0, 0, 4, 2], one degree pixels, rows north -> south
+    arrays = {
+        "ward_ids": np.ones((2, 4), dtype=int),
+        "ndvi": np.arange(8, dtype=float).reshape(2, 4),
+        "lc": np.array([[13, 10, 10, 13], [1, 1, 1, 1]]),
+    }
+    square = {"type": "Polygon", "coordinates": [[[0, 1], [4, 1], [4, 2], [0, 2], [0, 1]]]}
+    [zone] = zonal_stats(arrays, [0.0, 0.0, 4.0, 2.0], square)
+
+    assert zone["pixel_count"] == 4
+    assert zone["lc_mode"] == 13
+    assert zone["stats"]["ndvi"]["mean"] == 1.5
+    assert set(zone["stats"]) == {"ndvi"}